@@ -1,6 +1,13 @@
-from flask import Blueprint, jsonify, request
-from ..models import Team, Match, Prediction, League, FavouriteTeam, User
-from utils.thirdparty.FootballDataOrgScraper import FootballDataOrgScraper
+from flask import Blueprint, jsonify, request, url_for
+from ..models import Team, Match, Prediction, League, FavouriteTeam, User, ScrapeJob, parse_kickoff
+from ..jobs import enqueue_scrape, job_dict, JobQueueFull
+from ..pagination import paginate
+from ..leaderboard import ALL_LEAGUES, ALL_TIME, get_rank_index, rollup_page
+from ..serializers import MATCH, PREDICTION, TEAM
+from ..search import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX, autocomplete, relevance, team_filter
+from ..team_resolver import get_resolver
+from utils.SingleFlight import SingleFlight
+from utils.thirdparty.HttpClient import default_client
 from sqlalchemy.exc import IntegrityError
 from app import db
 import jwt
@@ -8,8 +15,9 @@ import datetime
 from flask import current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
-from sqlalchemy import func
+from sqlalchemy import case, func, insert, select, union_all
 import random
+import re
 
 api_v1 = Blueprint('api_v1', __name__)
 
@@ -34,38 +42,58 @@ def jwt_required(f):
         return f(user_id, *args, **kwargs)
     return decorated
 
+# Concurrent requests for the same expensive read share one computation
+flights = SingleFlight()
+
+def coalesced(key, compute):
+    """
+    Result of compute(), shared with any identical request already in flight
+    in this worker. Clients opt out with `Cache-Control: no-cache` or
+    `?coalesce=0`. compute() must return plain JSON-able data, not ORM objects.
+    """
+    if request.args.get('coalesce') == '0' or 'no-cache' in request.headers.get('Cache-Control', ''):
+        return compute()
+    return flights.do(key, compute)[0]
+
 @api_v1.route('/teams', methods=['GET'])
 @jwt_required
 def api_teams(user_id):
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
     league_id = request.args.get('league_id')
     query = Team.query
     if league_id:
         query = query.filter_by(league_id=league_id)
     search = request.args.get('search', '').strip()
+    keys = [(Team.name, False)]
     if search:
-        query = query.filter(Team.name.ilike(f'%{search}%'))
-    pagination = query.order_by(Team.name).paginate(page=page, per_page=per_page, error_out=False)
-    teams = pagination.items
+        query = query.filter(team_filter(search))
+        keys = relevance(search)
+    try:
+        page = paginate(TEAM.query(query), keys + [(Team.id, False)], request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    teams = page.items
     # Get all favourited team ids for this user
-    fav_team_ids = set(ft.team_id for ft in FavouriteTeam.query.filter_by(user_id=user_id).all())
+    fav_team_ids = set(db.session.scalars(select(FavouriteTeam.team_id).filter_by(user_id=user_id)))
     return jsonify({
-        'teams': [
-            {'id': t.id, 'name': t.name, 'logo_url': t.logo_url, 'stadium': t.stadium, 'favourite': t.id in fav_team_ids, 'league_id': t.league_id}
-            for t in teams
-        ],
-        'total': pagination.total,
-        'page': pagination.page,
-        'per_page': pagination.per_page,
-        'pages': pagination.pages
+        'teams': [TEAM.dump(t, favourite=t.id in fav_team_ids) for t in teams],
+        **page.envelope()
     })
 
+@api_v1.route('/teams/autocomplete', methods=['GET'])
+@jwt_required
+def api_teams_autocomplete(user_id):
+    league_id = request.args.get('league_id', type=int)
+    try:
+        limit = min(int(request.args.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX)
+    except ValueError:
+        return jsonify({'error': 'limit must be an integer'}), 400
+    if limit < 1:
+        return jsonify({'error': 'limit must be at least 1'}), 400
+    return jsonify({'teams': autocomplete(request.args.get('q', ''), limit=limit, league_id=league_id)})
+
 @api_v1.route('/matches', methods=['GET'])
 @jwt_required
 def api_matches(user_id):
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 10))
     league_id = request.args.get('league_id')
     team_id = request.args.get('team_id')
     query = Match.query
@@ -73,40 +101,66 @@ def api_matches(user_id):
         query = query.join(Team, Match.home_team_id == Team.id).filter(Team.league_id == league_id)
     if team_id:
         query = query.filter((Match.home_team_id == team_id) | (Match.away_team_id == team_id))
-    pagination = query.order_by(Match.date.asc()).paginate(page=page, per_page=per_page, error_out=False)
-    matches = pagination.items
+    try:
+        query = filter_by_kickoff(query, request.args)
+        page = paginate(MATCH.query(query), kickoff_keys(request.args), request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     return jsonify({
-        'matches': [
-            {
-                'id': m.id,
-                'home_team': m.home_team.name if m.home_team else None,
-                'away_team': m.away_team.name if m.away_team else None,
-                'date': m.date,
-                'result': m.result
-            } for m in matches
-        ],
-        'total': pagination.total,
-        'page': pagination.page,
-        'per_page': pagination.per_page,
-        'pages': pagination.pages
+        'matches': MATCH.dump_all(page.items),
+        **page.envelope()
     })
 
 # New endpoint: fetch matches for a given team
 @api_v1.route('/teams/<int:team_id>/matches', methods=['GET'])
 @jwt_required
 def api_team_matches(user_id, team_id):
-    matches = Match.query.filter(
+    query = MATCH.query(Match.query).filter(
         (Match.home_team_id == team_id) | (Match.away_team_id == team_id)
-    ).all()
-    return jsonify([
-        {
-            'id': m.id,
-            'home_team': m.home_team.name if m.home_team else None,
-            'away_team': m.away_team.name if m.away_team else None,
-            'date': m.date,
-            'result': m.result
-        } for m in matches
-    ])
+    )
+    try:
+        matches = filter_by_kickoff(query, request.args).all()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(MATCH.dump_all(matches))
+
+def filter_by_kickoff(query, args):
+    """
+    Apply the `from`/`to`/`upcoming`/`finished` filters shared by the match
+    listings and order by kickoff, all on the indexed kickoff column. `from`
+    and `to` take an ISO date or UTC timestamp; a bare `to` date includes
+    that whole day. Finished matches list most recent first. Raises
+    ValueError for a malformed bound.
+    """
+    start, end = kickoff_arg(args, 'from'), kickoff_arg(args, 'to')
+    if start:
+        query = query.filter(Match.kickoff >= start)
+    if end and len(args['to'].strip()) == 10:
+        query = query.filter(Match.kickoff < end + datetime.timedelta(days=1))
+    elif end:
+        query = query.filter(Match.kickoff <= end)
+    upcoming = args.get('upcoming') in ('1', 'true')
+    finished = args.get('finished') in ('1', 'true')
+    if upcoming:
+        now = datetime.datetime.now(datetime.timezone.utc)
+        query = query.filter(Match.kickoff >= now, Match.home_score.is_(None))
+    if finished:
+        query = query.filter(Match.home_score.isnot(None))
+    return query.order_by(*(key.desc() if descending else key for key, descending in kickoff_keys(args)))
+
+def kickoff_keys(args):
+    """filter_by_kickoff's order as paginate() keys: kickoff, then id."""
+    finished = args.get('finished') in ('1', 'true') and args.get('upcoming') not in ('1', 'true')
+    return [(Match.kickoff, finished), (Match.id, False)]
+
+def kickoff_arg(args, name):
+    value = args.get(name, '').strip()
+    if not value:
+        return None
+    kickoff = parse_kickoff(value)
+    if kickoff is None:
+        raise ValueError(f"'{name}' must be an ISO date or timestamp, e.g. 2025-01-04 or 2025-01-04T15:00:00Z")
+    return kickoff
 
 @api_v1.route('/teams/search', methods=['POST'])
 @jwt_required
@@ -120,7 +174,7 @@ def api_search_and_add_team(user_id):
     if existing:
         # Check if favourited by this user
         fav = FavouriteTeam.query.filter_by(user_id=user_id, team_id=existing.id).first()
-        return jsonify({'team': {'id': existing.id, 'name': existing.name, 'logo_url': existing.logo_url, 'stadium': existing.stadium, 'favourite': bool(fav)}, 'added': False})
+        return jsonify({'team': TEAM.dump(existing, favourite=bool(fav)), 'added': False})
 
     # For user-added teams, generate a unique ID (negative to avoid conflicts with Football-Data.org IDs)
     while True:
@@ -136,7 +190,7 @@ def api_search_and_add_team(user_id):
         db.session.rollback()
         return jsonify({'error': 'Team already exists'}), 409
 
-    return jsonify({'team': {'id': new_team.id, 'name': new_team.name, 'logo_url': new_team.logo_url, 'stadium': new_team.stadium, 'favourite': False}, 'added': True})
+    return jsonify({'team': TEAM.dump(new_team, favourite=False), 'added': True})
 
 @api_v1.route('/teams/<int:team_id>/favourite', methods=['POST'])
 @jwt_required
@@ -147,7 +201,11 @@ def api_favourite_team(user_id, team_id):
         return jsonify({'id': team_id, 'favourite': True})
     fav = FavouriteTeam(user_id=user_id, team_id=team_id)
     db.session.add(fav)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request favourited it first
+        db.session.rollback()
     return jsonify({'id': team_id, 'favourite': True})
 
 @api_v1.route('/teams/<int:team_id>/favourite', methods=['DELETE'])
@@ -162,24 +220,23 @@ def api_unfavourite_team(user_id, team_id):
 @api_v1.route('/matches/relevant', methods=['GET'])
 @jwt_required
 def api_relevant_matches(user_id):
-    # Get all team IDs in DB
-    team_ids = [t.id for t in Team.query.all()]
-    # Get all matches where both teams are in DB and not yet predicted
-    predicted_match_ids = [p.match_id for p in Prediction.query.all()]
-    matches = Match.query.filter(
-        Match.home_team_id.in_(team_ids),
-        Match.away_team_id.in_(team_ids),
-        ~Match.id.in_(predicted_match_ids)
-    ).all()
-    return jsonify([
-        {
-            'id': m.id,
-            'home_team': m.home_team.name if m.home_team else None,
-            'away_team': m.away_team.name if m.away_team else None,
-            'date': m.date,
-            'result': m.result
-        } for m in matches
-    ])
+    # Upcoming matches between teams we have that this user hasn't predicted
+    # yet, soonest first, paginated like /matches. The NOT EXISTS is answered
+    # from the (user_id, match_id) index, whatever other users have predicted.
+    args = request.args.copy()
+    args['upcoming'] = '1'
+    args.pop('finished', None)
+    predicted = select(Prediction.id).where(Prediction.user_id == user_id, Prediction.match_id == Match.id)
+    query = Match.query.filter(Match.home_team.has(), Match.away_team.has(), ~predicted.exists())
+    try:
+        query = filter_by_kickoff(query, args)
+        page = paginate(MATCH.query(query), kickoff_keys(args), args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'matches': MATCH.dump_all(page.items),
+        **page.envelope()
+    })
 
 @api_v1.route('/predictions', methods=['POST'])
 @jwt_required
@@ -195,35 +252,122 @@ def api_add_prediction(user_id):
     match = Match.query.get(match_id)
     if not match:
         return jsonify({'error': 'Invalid match_id'}), 400
+    if match_started(match.kickoff, match.home_score):
+        return jsonify({'error': 'Predictions close at kickoff'}), 400
     # Check for duplicate prediction
     existing = Prediction.query.filter_by(user_id=user_id, match_id=match_id).first()
     if existing:
         return jsonify({'error': 'Prediction already exists for this match'}), 400
     predicted_result = f"{home_score}-{away_score}"
-    prediction = Prediction(user_id=user_id, match_id=match_id, predicted_result=predicted_result)
+    prediction = Prediction(user_id=user_id, match_id=match_id, predicted_result=predicted_result,
+                            created_at=datetime.datetime.now(datetime.timezone.utc))
     db.session.add(prediction)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent request saved this user's prediction first
+        db.session.rollback()
+        return jsonify({'error': 'Prediction already exists for this match'}), 400
     return jsonify({'success': True, 'prediction_id': prediction.id})
 
+def match_started(kickoff, home_score):
+    # A match with a result has been played even if its kickoff is missing or wrong
+    if home_score is not None:
+        return True
+    if kickoff is None:
+        return False
+    if kickoff.tzinfo is None:
+        # SQLite returns the stored UTC value without its offset
+        kickoff = kickoff.replace(tzinfo=datetime.timezone.utc)
+    return kickoff <= datetime.datetime.now(datetime.timezone.utc)
+
+# Most predictions one batch may carry: a few matchweeks' worth
+PREDICTION_BATCH_MAX = 100
+
+@api_v1.route('/predictions/batch', methods=['POST'])
+@jwt_required
+def api_add_predictions_batch(user_id):
+    # Many predictions in one transaction: one query checks the match ids,
+    # one finds this user's existing predictions, the new rows go in as a
+    # single INSERT. Each item gets its own result, in request order;
+    # invalid items don't stop the valid ones.
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with a predictions list'}), 400
+    items = data.get('predictions')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'predictions must be a non-empty list'}), 400
+    if len(items) > PREDICTION_BATCH_MAX:
+        return jsonify({'error': f'At most {PREDICTION_BATCH_MAX} predictions per batch'}), 400
+    results, wanted = [], {}
+    for index, item in enumerate(items):
+        match_id, score, error = batch_item(item)
+        if error is None and match_id in wanted:
+            error = 'Duplicate match_id in batch'
+        results.append({'index': index, 'match_id': match_id, 'success': False, 'error': error})
+        if error is None:
+            wanted[match_id] = (index, score)
+    # A concurrent request may save one of these first; the retry finds it
+    for attempt in range(2):
+        try:
+            created = save_batch(user_id, wanted, results)
+            break
+        except IntegrityError:
+            db.session.rollback()
+            if attempt:
+                raise
+    return jsonify({'created': created, 'results': results})
+
+def batch_item(item):
+    """(match_id, (home, away), None) for a valid batch item, else (match_id, None, error)."""
+    if not isinstance(item, dict):
+        return None, None, 'Each prediction must be an object'
+    match_id, home, away = item.get('match_id'), item.get('home_score'), item.get('away_score')
+    if match_id is None or home is None or away is None:
+        return match_id, None, 'match_id, home_score, and away_score are required'
+    # JSON integers only: int() would quietly turn 1.7 or true into 1
+    if any(not isinstance(v, int) or isinstance(v, bool) for v in (match_id, home, away)):
+        return match_id, None, 'match_id, home_score, and away_score must be integers'
+    if home < 0 or away < 0:
+        return match_id, None, 'Scores cannot be negative'
+    return match_id, (home, away), None
+
+def save_batch(user_id, wanted, results):
+    ids = list(wanted)
+    matches = {row.id: row for row in db.session.execute(
+        select(Match.id, Match.kickoff, Match.home_score).where(Match.id.in_(ids))
+    )}
+    existing = set(db.session.scalars(
+        select(Prediction.match_id).where(Prediction.user_id == user_id, Prediction.match_id.in_(ids))
+    ))
+    rows = []
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for match_id, (index, (home, away)) in wanted.items():
+        if match_id not in matches:
+            results[index]['error'] = 'Invalid match_id'
+        elif match_started(matches[match_id].kickoff, matches[match_id].home_score):
+            results[index]['error'] = 'Predictions close at kickoff'
+        elif match_id in existing:
+            results[index]['error'] = 'Prediction already exists for this match'
+        else:
+            rows.append({'user_id': user_id, 'match_id': match_id, 'predicted_result': f"{home}-{away}",
+                         'predicted_home': home, 'predicted_away': away, 'created_at': now})
+    # One multi-row INSERT; the ids come back by match_id, in no particular order
+    created = {}
+    if rows:
+        created = dict(db.session.execute(
+            insert(Prediction).returning(Prediction.match_id, Prediction.id), rows
+        ).all())
+    db.session.commit()
+    for match_id, prediction_id in created.items():
+        results[wanted[match_id][0]].update(success=True, error=None, prediction_id=prediction_id)
+    return len(created)
+
 @api_v1.route('/predictions', methods=['GET'])
 @jwt_required
 def api_get_predictions(user_id):
-    predictions = Prediction.query.filter_by(user_id=user_id).all()
-    results = []
-    for p in predictions:
-        match = Match.query.get(p.match_id)
-        print(match.home_team.name)
-        results.append({
-            'id': p.id,
-            'match_id': p.match_id,
-            'home_team': match.home_team.name if match and match.home_team else None,
-            'away_team': match.away_team.name if match and match.away_team else None,
-            'date': match.date if match else None,
-            'predicted_result': p.predicted_result,
-            'actual_result': match.result if match else None,
-            'correct': (match.result is not None and match.result == p.predicted_result) if match else False
-        })
-    return jsonify(results)
+    predictions = PREDICTION.query(Prediction.query).filter_by(user_id=user_id).order_by(Prediction.id).all()
+    return jsonify(PREDICTION.dump_all(predictions))
 
 @api_v1.route('/matches/scrape', methods=['POST'])
 @jwt_required
@@ -232,32 +376,24 @@ def api_scrape_matches(user_id):
     team_name = data.get('team_name')
     if not team_name:
         return jsonify({'error': 'team_name is required'}), 400
-    db_teams = Team.query.all()
-    db_team_names = [t.name for t in db_teams]
-    scraper = FootballDataOrgScraper()
-    matches = scraper.fetch_matches_for_team(team_name)
-    print(f"Scraping for: {team_name}")
-    print(f"Scraped matches: {matches}")
-    inserted = 0
-    from sqlalchemy import or_
-    for m in matches:
-        print(f"Trying to match: {m['home_team']} vs {m['away_team']} on {m['date']}")
-        home_team = Team.query.filter(Team.name.ilike(f"%{m['home_team']}%") | Team.name.ilike(f"%{m['home_team'].replace(' ', '')}%")).first()
-        away_team = Team.query.filter(Team.name.ilike(f"%{m['away_team']}%") | Team.name.ilike(f"%{m['away_team'].replace(' ', '')}%")).first()
-        print(f"Matched home_team: {home_team}")
-        print(f"Matched away_team: {away_team}")
-        if not home_team or not away_team:
-            continue
-        exists = Match.query.filter_by(home_team_id=home_team.id, away_team_id=away_team.id, date=m['date']).first()
-        if exists:
-            continue
-        match = Match(home_team_id=home_team.id, away_team_id=away_team.id, date=m['date'], result=m['result'])
-        db.session.add(match)
-        inserted += 1
-    db.session.commit()
-    msg = f"Inserted {inserted} new matches for {team_name}. Scraped {len(matches)} matches."
-    print(msg)
-    return jsonify({'inserted': inserted, 'total_found': len(matches), 'message': msg})
+    team_id = get_resolver().resolve(team_name)
+    if not team_id:
+        return jsonify({'error': f'Unknown team: {team_name}'}), 404
+    try:
+        job, merged = enqueue_scrape(team_id, user_id)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    body = job_dict(job)
+    body['merged'] = merged
+    return jsonify(body), 202, {'Location': url_for('api_v1.api_job', job_id=job.id)}
+
+@api_v1.route('/jobs/<int:job_id>', methods=['GET'])
+@jwt_required
+def api_job(user_id, job_id):
+    job = db.session.get(ScrapeJob, job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_dict(job))
 
 @api_v1.route('/register', methods=['POST'])
 def register():
@@ -300,49 +436,125 @@ def api_leagues(user_id):
         print('Error in /api/v1/leagues:', traceback.format_exc())
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
+@api_v1.route('/upstream/stats', methods=['GET'])
+@jwt_required
+def api_upstream_stats(user_id):
+    # Call, retry and latency counters of the shared Football-Data.org client
+    return jsonify(default_client().stats())
+
 @api_v1.route('/leaderboard', methods=['GET'])
 @jwt_required
 def api_leaderboard(user_id):
-    users = db.session.query(
-        User.id, User.username, func.sum(Prediction.points_awarded).label('score')
-    ).outerjoin(Prediction).group_by(User.id).order_by(func.sum(Prediction.points_awarded).desc().nullslast()).all()
-    return jsonify([
-        {'id': u.id, 'username': u.username, 'score': u.score or 0}
-        for u in users
-    ])
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        per_page = min(max(int(request.args.get('per_page', 50)), 1), 200)
+    except ValueError:
+        return jsonify({'error': 'page and per_page must be integers'}), 400
+    league_id = request.args.get('league_id', type=int)
+    week = request.args.get('week')
+    if league_id is None and not week:
+        # Served from the in-process rank index; concurrent rebuilds are already collapsed into one
+        index = get_rank_index()
+        users, total = index.page(page, per_page), len(index)
+    else:
+        # League and weekly boards read only the precomputed leaderboard_rollups rows
+        if week and not re.fullmatch(r'\d{4}-W\d{2}', week):
+            return jsonify({'error': "week must be an ISO week such as '2025-W03'"}), 400
+        users, total = rollup_page(ALL_LEAGUES if league_id is None else league_id, week or ALL_TIME, page, per_page)
+    return jsonify({
+        'users': users,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': (total + per_page - 1) // per_page,
+        'league_id': league_id,
+        'week': week
+    })
+
+@api_v1.route('/leaderboard/me', methods=['GET'])
+@jwt_required
+def api_leaderboard_me(user_id):
+    try:
+        around = min(max(int(request.args.get('around', 2)), 0), 25)
+    except ValueError:
+        return jsonify({'error': 'around must be an integer'}), 400
+    index = get_rank_index()
+    neighbours = index.around(user_id, around)
+    if not neighbours:
+        # Registered through another worker since this index was built: add them from the database
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
+        index.update(user.id, user.score, user.username)
+        neighbours = index.around(user_id, around)
+    me = next(u for u in neighbours if u['id'] == user_id)
+    return jsonify(dict(me, total=len(index), neighbours=neighbours))
 
 @api_v1.route('/user/<int:uid>/stats', methods=['GET'])
 @jwt_required
 def api_user_stats(user_id, uid):
-    preds = Prediction.query.filter_by(user_id=uid).all()
-    total = len(preds)
-    correct = sum(1 for p in preds if p.match and p.match.result == p.predicted_result)
-    return jsonify({'user_id': uid, 'total_predictions': total, 'correct_predictions': correct})
+    total, correct, points = db.session.query(
+        func.count(Prediction.id),
+        func.count(case((Prediction.exact.is_(True), 1))),
+        func.coalesce(func.sum(Prediction.points_awarded), 0),
+    ).filter(Prediction.user_id == uid).one()
+    return jsonify({'user_id': uid, 'total_predictions': total, 'correct_predictions': correct, 'points': points})
 
 @api_v1.route('/team/<int:tid>/stats', methods=['GET'])
 @jwt_required
 def api_team_stats(user_id, tid):
-    matches = Match.query.filter((Match.home_team_id == tid) | (Match.away_team_id == tid)).all()
-    played = len(matches)
-    wins = 0
-    losses = 0
-    draws = 0
-    for m in matches:
-        if not m.result:
-            continue
-        home_score, away_score = map(int, m.result.split('-'))
-        if m.home_team_id == tid:
-            if home_score > away_score:
-                wins += 1
-            elif home_score < away_score:
-                losses += 1
-            else:
-                draws += 1
-        elif m.away_team_id == tid:
-            if away_score > home_score:
-                wins += 1
-            elif away_score < home_score:
-                losses += 1
-            else:
-                draws += 1
-    return jsonify({'team_id': tid, 'played': played, 'wins': wins, 'losses': losses, 'draws': draws}) 
\ No newline at end of file
+    return jsonify(coalesced(f'team-stats:{tid}', lambda: team_stats(tid)))
+
+def team_stats(tid):
+    # One aggregate over the team's matches, seen from the team's side
+    is_home = Match.home_team_id == tid
+    goals_for = case((is_home, Match.home_score), else_=Match.away_score)
+    goals_against = case((is_home, Match.away_score), else_=Match.home_score)
+    played, wins, losses, draws, scored, conceded = db.session.query(
+        func.count(Match.id),
+        func.count(case((goals_for > goals_against, 1))),
+        func.count(case((goals_for < goals_against, 1))),
+        func.count(case((goals_for == goals_against, 1))),
+        func.coalesce(func.sum(goals_for), 0),
+        func.coalesce(func.sum(goals_against), 0),
+    ).filter(is_home | (Match.away_team_id == tid)).one()
+    return {'team_id': tid, 'played': played, 'wins': wins, 'losses': losses, 'draws': draws,
+            'goals_for': scored, 'goals_against': conceded}
+
+@api_v1.route('/leagues/<int:league_id>/standings', methods=['GET'])
+@jwt_required
+def api_league_standings(user_id, league_id):
+    if not db.session.get(League, league_id):
+        return jsonify({'error': 'League not found'}), 404
+    return jsonify(coalesced(f'standings:{league_id}', lambda: league_standings(league_id)))
+
+def league_standings(league_id):
+    """League table from finished matches between the league's teams: 3 points a win, 1 a draw."""
+    league_teams = select(Team.id).where(Team.league_id == league_id)
+    finished = (
+        Match.home_score.isnot(None), Match.away_score.isnot(None),
+        Match.home_team_id.in_(league_teams), Match.away_team_id.in_(league_teams),
+    )
+    # Every finished match twice, once from each side
+    sides = union_all(
+        select(Match.home_team_id.label('team_id'), Match.home_score.label('gf'), Match.away_score.label('ga')).where(*finished),
+        select(Match.away_team_id.label('team_id'), Match.away_score.label('gf'), Match.home_score.label('ga')).where(*finished),
+    ).subquery()
+    won = func.count(case((sides.c.gf > sides.c.ga, 1)))
+    drawn = func.count(case((sides.c.gf == sides.c.ga, 1)))
+    lost = func.count(case((sides.c.gf < sides.c.ga, 1)))
+    goals_for = func.coalesce(func.sum(sides.c.gf), 0)
+    goals_against = func.coalesce(func.sum(sides.c.ga), 0)
+    points = 3 * won + drawn
+    rows = db.session.execute(
+        select(Team.id, Team.name, func.count(sides.c.team_id), won, drawn, lost, goals_for, goals_against, points)
+        .outerjoin(sides, sides.c.team_id == Team.id)
+        .where(Team.league_id == league_id)
+        .group_by(Team.id, Team.name)
+        .order_by(points.desc(), (goals_for - goals_against).desc(), goals_for.desc(), Team.name)
+    ).all()
+    return [
+        {'position': position, 'team_id': team_id, 'team_name': name, 'played': played, 'won': w, 'drawn': d,
+         'lost': l, 'goals_for': gf, 'goals_against': ga, 'goal_difference': gf - ga, 'points': pts}
+        for position, (team_id, name, played, w, d, l, gf, ga, pts) in enumerate(rows, 1)
+    ]
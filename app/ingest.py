@@ -0,0 +1,413 @@
+import datetime
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+
+from . import db
+from .models import League, Team, Match, SyncState, IngestRun, IngestUnit, parse_kickoff
+from .scoring import score_matches, unscored_match_ids
+from .team_resolver import get_resolver, invalidate as invalidate_teams
+from .upsert import bulk_upsert, UpsertResult
+
+
+class PhaseTimer:
+    """
+    Records, per phase, how many calls ran, the summed busy time and the
+    wall-clock span from the first call starting to the last one finishing.
+    Phases overlap when ingestion runs in parallel, so the span is what
+    tells you how long a phase actually held up the run.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    @contextmanager
+    def track(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                stats = self._phases.setdefault(phase, {'calls': 0, 'busy': 0.0, 'first': start, 'last': end})
+                stats['calls'] += 1
+                stats['busy'] += end - start
+                stats['first'] = min(stats['first'], start)
+                stats['last'] = max(stats['last'], end)
+
+    def summary(self):
+        lines = []
+        with self._lock:
+            for phase, stats in self._phases.items():
+                lines.append(
+                    f"{phase:<14} calls={stats['calls']:<5} "
+                    f"wall={stats['last'] - stats['first']:.2f}s busy={stats['busy']:.2f}s"
+                )
+        return "\n".join(lines)
+
+
+class Ingestor:
+    """
+    Seeds leagues, teams and matches from Football-Data.org.
+
+    HTTP fetches run on a bounded worker pool: each competition fetch schedules
+    its team-list fetch, which in turn schedules the match fetch, so different
+    competitions are at different stages at the same time. By default matches
+    are fetched once per competition; match_source='team' falls back to one
+    fetch per team, where every fixture shows up twice. Pacing is
+    left to the client's shared quota governor. Every DB write goes through a queue to a
+    single writer thread, which keeps the session single-threaded and writes
+    each league before its teams and each team before its matches.
+
+    Every successful match write records a SyncState watermark for its
+    competition (or team, in team mode). With incremental=True, anything that
+    already has a watermark skips the competition and team-list fetches and
+    only asks for fixtures dated from just before the watermark up to a short
+    lookahead, so a nightly refresh costs one request per competition.
+
+    Each run is recorded in ingest_runs, and each unit of work (competition,
+    team list, competition matches or team matches) is checkpointed in
+    ingest_units in the same transaction as the rows it wrote. With
+    resume=True the latest unfinished run is picked up again: finished units
+    are rebuilt from the database instead of being downloaded again.
+    """
+
+    MATCH_SOURCES = ('competition', 'team')
+    # Results can be corrected after the final whistle, so re-read the day before the watermark
+    INCREMENTAL_LOOKBACK = datetime.timedelta(days=1)
+    # Pick up kickoff changes for the coming week
+    INCREMENTAL_LOOKAHEAD = datetime.timedelta(days=7)
+
+    def __init__(self, app, client, workers=4, match_source='competition', season=None, incremental=False,
+                 resume=False):
+        if match_source not in self.MATCH_SOURCES:
+            raise ValueError(f"match_source must be one of {self.MATCH_SOURCES}")
+        self.app = app
+        self.client = client
+        self.workers = max(1, workers)
+        self.match_source = match_source
+        self.season = season
+        self.incremental = incremental
+        self.resume = resume
+        self.timer = PhaseTimer()
+        self.failures = []
+        self.elapsed = 0.0
+        self.run_id = None
+        self.resumed = False
+        # Upsert counts per table, only touched by the writer thread
+        self.counts = {}
+        self._writes = queue.Queue()
+        # Match ids already written during this run (only touched by the writer)
+        self._seen_matches = set()
+        # Fixtures dropped because a side isn't in the teams table (e.g. cup opponents in team mode)
+        self.skipped_matches = 0
+        # Predictions (re)scored because their match got a result
+        self.scored_predictions = 0
+        # Loaded before the pool starts; read-only while fetches run
+        self._watermarks = {}
+        self._leagues = {}
+        self._known_teams = {}
+        self._done_units = set()
+        self.sync_started = None
+
+    def run(self, competitions):
+        started = time.perf_counter()
+        self.sync_started = datetime.datetime.utcnow()
+        self._begin_run()
+        self._load_sync_state(competitions)
+        writer = threading.Thread(target=self._writer, name='ingest-writer', daemon=True)
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest') as pool:
+                pending = {pool.submit(task, *args) for code in competitions for task, *args in self._start(code)}
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        try:
+                            follow_ups = future.result()
+                        except Exception as e:
+                            self._fail(f"Fetch task crashed: {e}")
+                            continue
+                        for task, *args in follow_ups:
+                            pending.add(pool.submit(task, *args))
+        finally:
+            self._writes.put(None)
+            writer.join()
+            self._finish_run()
+        self.elapsed = time.perf_counter() - started
+        return self
+
+    def summary(self):
+        lines = [self.timer.summary(), f"{'total':<14} wall={self.elapsed:.2f}s failures={len(self.failures)}"
+                 f" skipped_matches={self.skipped_matches} scored_predictions={self.scored_predictions}"]
+        for kind, result in self.counts.items():
+            lines.append(
+                f"{kind:<14} inserted={result.inserted} updated={result.updated} unchanged={result.unchanged}"
+            )
+        if self.run_id:
+            resumed = f" (resumed, {len(self._done_units)} units already done)" if self.resumed else ""
+            lines.append(f"run #{self.run_id}{resumed}")
+        return "\n".join(lines)
+
+    def _fail(self, message, unit=None):
+        print(message)
+        self.failures.append(message)
+        if unit:
+            self._writes.put((None, message, unit))
+
+    # Run bookkeeping, done on the calling thread before and after the pool runs
+
+    def _begin_run(self):
+        with self.app.app_context():
+            run = None
+            if self.resume:
+                run = (IngestRun.query.filter(IngestRun.status != 'done')
+                       .order_by(IngestRun.id.desc()).first())
+                if run:
+                    self._done_units = {
+                        (u.kind, u.key) for u in IngestUnit.query.filter_by(run_id=run.id, status='done')
+                    }
+                    run.status = 'running'
+                    self.resumed = True
+                else:
+                    print("No unfinished ingestion run to resume, starting a new one")
+            if not run:
+                run = IngestRun(status='running', started_at=self.sync_started)
+                db.session.add(run)
+            db.session.commit()
+            self.run_id = run.id
+
+    def _finish_run(self):
+        with self.app.app_context():
+            run = IngestRun.query.get(self.run_id)
+            run.status = 'failed' if self.failures else 'done'
+            run.finished_at = datetime.datetime.utcnow()
+            db.session.commit()
+
+    def _load_sync_state(self, competitions):
+        with self.app.app_context():
+            self._watermarks = {(s.scope, s.key): s.last_synced_at for s in SyncState.query.all()}
+            for league in League.query.filter(League.fd_competition.in_(competitions)):
+                self._leagues[league.fd_competition] = league.id
+                self._known_teams[league.fd_competition] = [t.id for t in league.teams]
+
+    def _is_done(self, kind, key):
+        return (kind, str(key)) in self._done_units
+
+    def _start(self, code):
+        # Competitions synced before can skip straight to the match fetch in incremental mode
+        if self.incremental and ('competition', code) in self._watermarks and code in self._known_teams:
+            return self._match_tasks(code, self._known_teams[code])
+        if self._is_done('competition', code) and code in self._leagues:
+            return self._team_tasks(code, self._leagues[code])
+        return [(self._fetch_competition, code)]
+
+    def _team_tasks(self, code, league_id):
+        if self._is_done('teams', code) and code in self._known_teams:
+            return self._match_tasks(code, self._known_teams[code])
+        return [(self._fetch_teams, code, league_id)]
+
+    def _match_tasks(self, code, team_ids):
+        if self.match_source == 'competition':
+            if self._is_done('competition_matches', code):
+                return []
+            return [(self._fetch_competition_matches, code)]
+        return [(self._fetch_team_matches, team_id) for team_id in team_ids
+                if not self._is_done('team_matches', team_id)]
+
+    def _window(self, scope, key):
+        """dateFrom/dateTo for an incremental fetch, or (None, None) for a full one."""
+        since = self._watermarks.get((scope, str(key))) if self.incremental else None
+        if since is None:
+            return None, None
+        return (
+            (since - self.INCREMENTAL_LOOKBACK).date().isoformat(),
+            (self.sync_started + self.INCREMENTAL_LOOKAHEAD).date().isoformat(),
+        )
+
+    # Fetch tasks run on the pool. Each returns the follow-up tasks to schedule.
+
+    def _fetch(self, phase, fetch, *args, **kwargs):
+        # Quota errors and network blips fail the unit instead of the whole run
+        try:
+            with self.timer.track(phase):
+                return fetch(*args, **kwargs)
+        except Exception as e:
+            print(f"{phase} fetch raised {e!r}")
+            return None
+
+    def _fetch_competition(self, code):
+        unit = ('competition', code)
+        comp = self._fetch('competitions', self.client.fetch_competition, code)
+        if not comp:
+            self._fail(f"Failed to fetch competition {code}", unit)
+            return []
+        self._writes.put((self._write_league, (code, comp), unit))
+        return self._team_tasks(code, comp['id'])
+
+    def _fetch_teams(self, code, league_id):
+        unit = ('teams', code)
+        teams = self._fetch('teams', self.client.fetch_teams_for_competition, code)
+        if teams is None:
+            self._fail(f"Failed to fetch teams for {code}", unit)
+            return []
+        self._writes.put((self._write_teams, (code, league_id, teams), unit))
+        return self._match_tasks(code, [t['id'] for t in teams])
+
+    def _fetch_competition_matches(self, code):
+        unit = ('competition_matches', code)
+        date_from, date_to = self._window('competition', code)
+        matches = self._fetch(
+            'matches', self.client.fetch_matches_for_competition,
+            code, season=None if date_from else self.season, date_from=date_from, date_to=date_to
+        )
+        if matches is None:
+            self._fail(f"Failed to fetch matches for {code}", unit)
+            return []
+        self._writes.put((self._write_matches, ('competition', code, matches), unit))
+        return []
+
+    def _fetch_team_matches(self, team_id):
+        unit = ('team_matches', team_id)
+        date_from, date_to = self._window('team', team_id)
+        matches = self._fetch(
+            'matches', self.client.fetch_matches_for_team, team_id, date_from=date_from, date_to=date_to
+        )
+        if matches is None:
+            self._fail(f"Failed to fetch matches for team {team_id}", unit)
+            return []
+        self._writes.put((self._write_matches, ('team', team_id, matches), unit))
+        return []
+
+    # Writer thread
+
+    def _writer(self):
+        with self.app.app_context():
+            while True:
+                item = self._writes.get()
+                if item is None:
+                    break
+                write, payload, unit = item
+                if write is None:
+                    # A fetch failed: payload is the error message
+                    self._checkpoint(unit, 'failed', payload)
+                    db.session.commit()
+                    continue
+                try:
+                    with self.timer.track('write'):
+                        write(payload)
+                        # Checkpoint in the same transaction as the rows the unit wrote
+                        self._checkpoint(unit, 'done')
+                        db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    self._fail(f"Write failed: {e}")
+                    self._checkpoint(unit, 'failed', str(e))
+                    db.session.commit()
+            # Catch up on predictions for finished matches that were never scored
+            try:
+                self.scored_predictions += score_matches(unscored_match_ids())
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                self._fail(f"Scoring failed: {e}")
+            db.session.remove()
+
+    def _checkpoint(self, unit, status, error=None):
+        kind, key = unit
+        record = IngestUnit.query.filter_by(run_id=self.run_id, kind=kind, key=str(key)).first()
+        if not record:
+            record = IngestUnit(run_id=self.run_id, kind=kind, key=str(key))
+            db.session.add(record)
+        record.status = status
+        record.error = error[:255] if error else None
+        record.finished_at = datetime.datetime.utcnow()
+
+    def _write_league(self, payload):
+        code, comp = payload
+        self._record('leagues', bulk_upsert(League, [league_row(code, comp)]))
+
+    def _write_teams(self, payload):
+        code, league_id, teams = payload
+        self._record('teams', bulk_upsert(Team, [team_row(t, league_id) for t in teams]))
+        # Core upserts bypass the ORM events that keep the name index current
+        invalidate_teams()
+        if self.match_source == 'team':
+            # In team mode the competition watermark only vouches for the team list
+            self._mark_synced('competition', code)
+
+    def _write_matches(self, payload):
+        scope, key, matches = payload
+        resolver = get_resolver()
+        rows = []
+        for m in matches:
+            match_id = m.get('id')
+            if not match_id or match_id in self._seen_matches:
+                continue
+            self._seen_matches.add(match_id)
+            row = match_row(m)
+            row['home_team_id'] = resolver.resolve(m['homeTeam'].get('name'), row['home_team_id'])
+            row['away_team_id'] = resolver.resolve(m['awayTeam'].get('name'), row['away_team_id'])
+            if row['home_team_id'] is None or row['away_team_id'] is None:
+                self.skipped_matches += 1
+                continue
+            rows.append(row)
+        result = bulk_upsert(Match, rows)
+        self._record('matches', result)
+        # New or corrected results rescore their predictions in the same transaction
+        changed = set(result.changed)
+        self.scored_predictions += score_matches(r['id'] for r in rows if r['result'] and r['id'] in changed)
+        self._mark_synced(scope, key)
+
+    def _mark_synced(self, scope, key):
+        # Use the run's start time so changes made while it ran are picked up next time
+        state = SyncState.query.filter_by(scope=scope, key=str(key)).first()
+        if not state:
+            state = SyncState(scope=scope, key=str(key))
+            db.session.add(state)
+        state.last_synced_at = self.sync_started
+
+    def _record(self, kind, result):
+        self.counts[kind] = self.counts.get(kind, UpsertResult()) + result
+
+
+def league_row(code, comp):
+    return {
+        'id': comp['id'],
+        'name': comp['name'],
+        'website': comp.get('emblem'),
+        'country': comp.get('area', {}).get('name'),
+        'fd_competition': code,
+    }
+
+
+def team_row(t, league_id):
+    return {
+        'id': t['id'],
+        'name': t['name'],
+        'logo_url': t.get('crest'),
+        'stadium': t.get('venue'),
+        'league_id': league_id,
+    }
+
+
+def match_row(m):
+    """Convert a Football-Data.org match payload into a matches table row."""
+    result = home_score = away_score = None
+    score = (m.get('score') or {}).get('fullTime') or {}
+    if score.get('home') is not None and score.get('away') is not None:
+        home_score, away_score = score['home'], score['away']
+        result = f"{home_score}-{away_score}"
+    return {
+        'id': m['id'],
+        'home_team_id': m['homeTeam']['id'],
+        'away_team_id': m['awayTeam']['id'],
+        'date': m['utcDate'][:10],
+        'kickoff': parse_kickoff(m['utcDate']),
+        'result': result,
+        'home_score': home_score,
+        'away_score': away_score,
+    }
@@ -0,0 +1,186 @@
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .models import Match, ScrapeJob, parse_kickoff, parse_score
+from .scoring import score_matches
+from .team_resolver import get_resolver
+from .upsert import bulk_upsert
+from settings import SCRAPE_JOB_WORKERS, SCRAPE_JOB_QUEUE_SIZE, SCRAPE_JOB_TIMEOUT
+from utils.thirdparty.FootballDataOrgScraper import FootballDataOrgScraper
+from utils.thirdparty.HttpClient import UpstreamError
+
+IN_FLIGHT = ('queued', 'running')
+
+
+class JobQueueFull(Exception):
+    """Raised when every worker is busy and the wait queue is full."""
+
+
+class ScrapeJobRunner:
+    """
+    Runs scrape jobs off the request thread on a fixed pool of workers.
+
+    At most `workers + queue_size` jobs are accepted at a time; beyond that
+    submit() refuses instead of queueing unbounded work in memory. Job state
+    lives in the scrape_jobs table, so any worker process can report on it.
+    With inline=True (testing) jobs run synchronously inside submit().
+    """
+
+    def __init__(self, app, workers=SCRAPE_JOB_WORKERS, queue_size=SCRAPE_JOB_QUEUE_SIZE, inline=False,
+                 scraper_factory=FootballDataOrgScraper):
+        self.app = app
+        self.inline = inline
+        self.scraper_factory = scraper_factory
+        self._executor = None if inline else ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scrape-job')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def submit(self, job_id):
+        """Start the job, or return False if the runner is at capacity."""
+        if self.inline:
+            run_scrape_job(job_id, self.scraper_factory())
+            return True
+        if not self._slots.acquire(blocking=False):
+            return False
+        future = self._executor.submit(self._run, job_id)
+        future.add_done_callback(lambda f: self._slots.release())
+        return True
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                run_scrape_job(job_id, self.scraper_factory())
+            finally:
+                db.session.remove()
+
+
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    """The current app's ScrapeJobRunner, created on first use."""
+    app = current_app._get_current_object()
+    with _runner_lock:
+        if 'scrape_jobs' not in app.extensions:
+            app.extensions['scrape_jobs'] = ScrapeJobRunner(app, inline=app.config.get('SCRAPE_JOBS_INLINE', app.testing))
+        return app.extensions['scrape_jobs']
+
+
+def enqueue_scrape(team_id, user_id=None):
+    """
+    Queue a scrape of `team_id`'s fixtures. Returns (job, merged): when a job
+    for the team is already queued or running, that job is returned with
+    merged=True instead of starting a second one.
+    """
+    job = in_flight_job(team_id)
+    if job:
+        return job, True
+    job = ScrapeJob(team_id=team_id, user_id=user_id, status='queued', created_at=datetime.datetime.utcnow())
+    db.session.add(job)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another request (or process) queued the same team first
+        db.session.rollback()
+        job = in_flight_job(team_id)
+        if job:
+            return job, True
+        raise
+    if not get_runner().submit(job.id):
+        _finish(job, 'failed', error='Scrape queue is full')
+        db.session.commit()
+        raise JobQueueFull("Too many scrape jobs queued, try again shortly")
+    return job, False
+
+
+def in_flight_job(team_id):
+    job = ScrapeJob.query.filter(ScrapeJob.team_id == team_id, ScrapeJob.status.in_(IN_FLIGHT)).first()
+    if job is None:
+        return None
+    # A worker that died mid-job would otherwise block the team forever
+    since = job.started_at or job.created_at
+    if datetime.datetime.utcnow() - since > datetime.timedelta(seconds=SCRAPE_JOB_TIMEOUT):
+        _finish(job, 'failed', error='Abandoned: no progress before the job timeout')
+        db.session.commit()
+        return None
+    return job
+
+
+def run_scrape_job(job_id, scraper):
+    job = db.session.get(ScrapeJob, job_id)
+    if not job or job.status != 'queued':
+        return
+    job.status = 'running'
+    job.started_at = datetime.datetime.utcnow()
+    db.session.commit()
+    try:
+        found, result, stale = scrape_team(scraper, job.team.name)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Scrape job {job_id} failed: {e}")
+        _finish(job, 'failed', error=str(e))
+    else:
+        job.found = found
+        job.inserted, job.updated, job.unchanged = result.inserted, result.updated, result.unchanged
+        job.stale = stale
+        _finish(job, 'done')
+    db.session.commit()
+
+
+def scrape_team(scraper, team_name):
+    """Fetch a team's fixtures and upsert them. Returns (matches found, UpsertResult, stale)."""
+    matches = scraper.fetch_matches_for_team(team_name)
+    if not matches and not scraper.upstream_available:
+        raise UpstreamError("Football-Data.org is unavailable and nothing is cached for this team")
+    resolver = get_resolver()
+    rows = []
+    for m in matches:
+        home_team_id = resolver.resolve(m['home_team'], m.get('home_team_id'))
+        away_team_id = resolver.resolve(m['away_team'], m.get('away_team_id'))
+        if not home_team_id or not away_team_id:
+            print(f"Skipping {m['home_team']} vs {m['away_team']} on {m['date']}: unknown team")
+            continue
+        home_score, away_score = parse_score(m['result']) or (None, None)
+        rows.append({
+            'id': m['id'], 'home_team_id': home_team_id, 'away_team_id': away_team_id, 'date': m['date'],
+            'kickoff': parse_kickoff(m.get('kickoff') or m['date']),
+            'result': m['result'], 'home_score': home_score, 'away_score': away_score,
+        })
+    # The caller commits, together with the job's final state
+    result = bulk_upsert(Match, rows)
+    changed = set(result.changed)
+    score_matches(r['id'] for r in rows if r['result'] and r['id'] in changed)
+    return len(matches), result, scraper.stale
+
+
+def _finish(job, status, error=None):
+    job.status = status
+    job.error = error[:255] if error else None
+    job.finished_at = datetime.datetime.utcnow()
+
+
+def job_dict(job):
+    def seconds(start, end):
+        return round((end - start).total_seconds(), 3) if start and end else None
+
+    return {
+        'id': job.id,
+        'team_id': job.team_id,
+        'team_name': job.team.name if job.team else None,
+        'status': job.status,
+        'found': job.found,
+        'inserted': job.inserted,
+        'updated': job.updated,
+        'unchanged': job.unchanged,
+        'stale': job.stale,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() + 'Z',
+        'started_at': job.started_at.isoformat() + 'Z' if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() + 'Z' if job.finished_at else None,
+        'queued_seconds': seconds(job.created_at, job.started_at),
+        'run_seconds': seconds(job.started_at, job.finished_at),
+    }
@@ -0,0 +1,202 @@
+import bisect
+import datetime
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session, object_session
+
+from . import db
+from .models import User, LeaderboardRollup
+
+# Rebuild from users.score at least this often, to pick up scoring done by other processes
+RANK_INDEX_TTL = 60
+# Rollup keys for "every league" and "all time"
+ALL_LEAGUES = 0
+ALL_TIME = 'all'
+
+
+class RankIndex:
+    """
+    Users ordered by score, held in a sorted array of (-score, user_id) keys.
+
+    rank() and position() are a bisect, O(log n). Moving a user after a
+    score change is a bisect plus a list insert/delete, which is a memmove
+    and stays cheap well past the user counts we have. Tied users share a
+    rank (1, 2, 2, 4) and are listed by id.
+    """
+
+    def __init__(self, users):
+        # users: iterable of (id, username, score)
+        self._users = {}
+        for user_id, username, score in users:
+            self._users[user_id] = (score or 0, username)
+        self._keys = sorted((-score, user_id) for user_id, (score, _) in self._users.items())
+        self.built_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls):
+        return cls(db.session.execute(select(User.id, User.username, User.score)).all())
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, user_id, score, username=None):
+        """Insert a user or move one to a new score."""
+        score = score or 0
+        with self._lock:
+            current = self._users.get(user_id)
+            if current is not None:
+                if current[0] == score:
+                    return
+                i = bisect.bisect_left(self._keys, (-current[0], user_id))
+                del self._keys[i]
+                username = username or current[1]
+            self._users[user_id] = (score, username)
+            bisect.insort(self._keys, (-score, user_id))
+
+    def position(self, user_id):
+        """0-based index of the user in leaderboard order, or None if unknown."""
+        current = self._users.get(user_id)
+        if current is None:
+            return None
+        return bisect.bisect_left(self._keys, (-current[0], user_id))
+
+    def rank(self, user_id):
+        """1-based competition rank: one more than the number of users with a higher score."""
+        current = self._users.get(user_id)
+        if current is None:
+            return None
+        return bisect.bisect_left(self._keys, (-current[0], float('-inf'))) + 1
+
+    def slice(self, start, stop):
+        """Leaderboard entries for positions [start, stop)."""
+        with self._lock:
+            return self._slice(start, stop)
+
+    def page(self, page, per_page):
+        start = (max(page, 1) - 1) * per_page
+        return self.slice(start, start + per_page)
+
+    def around(self, user_id, count):
+        """The user's entry plus up to `count` neighbours on each side, or [] if unknown."""
+        # One lock for both steps, so an update can't move the user out of the slice
+        with self._lock:
+            position = self.position(user_id)
+            if position is None:
+                return []
+            return self._slice(position - count, position + count + 1)
+
+    def _slice(self, start, stop):
+        keys = self._keys[max(start, 0):max(stop, 0)]
+        return [self._entry(user_id) for _, user_id in keys]
+
+    def _entry(self, user_id):
+        score, username = self._users[user_id]
+        return {
+            'id': user_id,
+            'username': username,
+            'score': score,
+            'rank': bisect.bisect_left(self._keys, (-score, float('-inf'))) + 1,
+        }
+
+
+_lock = threading.Lock()
+
+
+def get_rank_index():
+    """The current app's RankIndex, rebuilt when stale or RANK_INDEX_TTL old."""
+    state = current_app.extensions.setdefault('rank_index', {'index': None})
+    index = state['index']
+    if index is None or time.monotonic() - index.built_at > RANK_INDEX_TTL:
+        # One rebuild at a time; everyone else waits for it and reuses it
+        with _lock:
+            index = state['index']
+            if index is None or time.monotonic() - index.built_at > RANK_INDEX_TTL:
+                index = state['index'] = RankIndex.from_db()
+    return index
+
+
+def note_scores(rows):
+    """Queue (user_id, new score) pairs for the rank index; applied when the transaction commits."""
+    updates = db.session.info.setdefault('rank_updates', {})
+    for user_id, score in rows:
+        updates[user_id] = (score, updates.get(user_id, (None, None))[1])
+
+
+def note_stale():
+    """Scores changed in a way we can't track row by row: rebuild after commit."""
+    db.session.info['rank_stale'] = True
+
+def match_week(date):
+    """ISO week ('2025-W03') of a 'YYYY-MM-DD' match date, or None if it isn't one."""
+    try:
+        year, week, _ = datetime.date.fromisoformat(date[:10]).isocalendar()
+    except (TypeError, ValueError):
+        return None
+    return f'{year}-W{week:02d}'
+
+
+def rollup_page(league_id, period, page, per_page):
+    """
+    One page of a league and/or weekly leaderboard, read from
+    leaderboard_rollups alone. Returns (entries, total).
+    """
+    board = (
+        LeaderboardRollup.league_id == league_id,
+        LeaderboardRollup.period == period,
+        LeaderboardRollup.predictions > 0,
+    )
+    total = db.session.execute(select(func.count()).select_from(LeaderboardRollup).where(*board)).scalar()
+    rows = db.session.execute(
+        select(
+            LeaderboardRollup.user_id, User.username, LeaderboardRollup.points,
+            LeaderboardRollup.predictions, LeaderboardRollup.exact,
+            func.rank().over(order_by=LeaderboardRollup.points.desc()),
+        )
+        .join(User, User.id == LeaderboardRollup.user_id)
+        .where(*board)
+        .order_by(LeaderboardRollup.points.desc(), LeaderboardRollup.user_id)
+        .offset((max(page, 1) - 1) * per_page)
+        .limit(per_page)
+    ).all()
+    entries = [
+        {'id': user_id, 'username': username, 'score': points, 'rank': rank, 'predictions': predictions, 'exact': exact}
+        for user_id, username, points, predictions, exact, rank in rows
+    ]
+    return entries, total
+
+
+def _current_index():
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('rank_index', {}).get('index')
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_rank_updates(session):
+    updates = session.info.pop('rank_updates', None)
+    stale = session.info.pop('rank_stale', False)
+    index = _current_index()
+    if index is None:
+        return
+    if stale:
+        current_app.extensions['rank_index']['index'] = None
+        return
+    for user_id, (score, username) in (updates or {}).items():
+        index.update(user_id, score, username)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_rank_updates(session):
+    session.info.pop('rank_updates', None)
+    session.info.pop('rank_stale', None)
+
+
+@event.listens_for(User, 'after_insert')
+def _user_registered(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('rank_updates', {})[target.id] = (target.score or 0, target.username)
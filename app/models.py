@@ -1,12 +1,33 @@
+import datetime
+
 from . import db
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
+
+def parse_score(result):
+    """(home, away) goals from a 'H-A' result string, or None if it isn't one."""
+    try:
+        home, away = result.split('-')
+        return int(home), int(away)
+    except (AttributeError, ValueError):
+        return None
+
+def parse_kickoff(value):
+    """UTC datetime from an ISO date ('2025-01-04', midnight UTC) or timestamp ('2025-01-04T15:00:00Z'), or None."""
+    try:
+        kickoff = datetime.datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except (AttributeError, ValueError):
+        return None
+    if kickoff.tzinfo is None:
+        return kickoff.replace(tzinfo=datetime.timezone.utc)
+    return kickoff.astimezone(datetime.timezone.utc)
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     password_hash = db.Column(db.String(512), nullable=False)
-    score = db.Column(db.Integer, default=0)
+    score = db.Column(db.Integer, default=0, index=True)  # Sum of scored prediction points, kept by app.scoring
 
 class League(db.Model):
     __tablename__ = 'leagues'
@@ -24,7 +45,11 @@ class Team(db.Model):
     logo_url = db.Column(db.String(255))
     stadium = db.Column(db.String(100))
     favourite = db.Column(db.Boolean, default=False)
-    league_id = db.Column(db.Integer, db.ForeignKey('leagues.id'))
+    league_id = db.Column(db.Integer, db.ForeignKey('leagues.id'), index=True)
+    # Prefix search for autocomplete terms too short for the trigram index (app/search.py)
+    __table_args__ = (
+        db.Index('ix_teams_name_lower', db.func.lower(name)),
+    )
 
 class Match(db.Model):
     __tablename__ = 'matches'
@@ -32,19 +57,58 @@ class Match(db.Model):
     home_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'))
     away_team_id = db.Column(db.Integer, db.ForeignKey('teams.id'))
     date = db.Column(db.String(50))
+    # Kickoff in UTC; ingest stores the exact time, ORM writes follow date
+    kickoff = db.Column(db.DateTime(timezone=True), index=True)
     result = db.Column(db.String(20))
+    # Full-time goals, kept in step with result so stats and scoring can aggregate in SQL
+    home_score = db.Column(db.Integer)
+    away_score = db.Column(db.Integer)
     home_team = db.relationship('Team', foreign_keys=[home_team_id], backref='home_matches')
     away_team = db.relationship('Team', foreign_keys=[away_team_id], backref='away_matches')
 
+    # A team's fixtures: home_team_id = ? OR away_team_id = ?, ordered by kickoff
+    __table_args__ = (
+        db.Index('ix_matches_home_team_kickoff', 'home_team_id', 'kickoff'),
+        db.Index('ix_matches_away_team_kickoff', 'away_team_id', 'kickoff'),
+    )
+
+    @validates('result')
+    def _split_result(self, key, value):
+        self.home_score, self.away_score = parse_score(value) or (None, None)
+        return value
+
+    @validates('date')
+    def _parse_date(self, key, value):
+        self.kickoff = parse_kickoff(value)
+        return value
+
 class Prediction(db.Model):
     __tablename__ = 'predictions'
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
-    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'))
+    match_id = db.Column(db.Integer, db.ForeignKey('matches.id'), index=True)
     predicted_result = db.Column(db.String(20))
+    # Goals parsed from predicted_result, so scoring can compare in SQL
+    predicted_home = db.Column(db.Integer)
+    predicted_away = db.Column(db.Integer)
     points_awarded = db.Column(db.Integer, default=0)
+    # Whether the scored prediction hit the exact score, whatever the scoring rules award for it
+    exact = db.Column(db.Boolean)
+    scored_at = db.Column(db.DateTime)  # Set once the match result has been scored
+    # Leaderboard rollup buckets the points were counted in, so a rescore retracts from the same ones
+    scored_league_id = db.Column(db.Integer)
+    scored_week = db.Column(db.String(10))
+    # When a user submitted the prediction; scoring skips those made after kickoff
+    created_at = db.Column(db.DateTime(timezone=True))
     user = db.relationship('User', backref='predictions')
     match = db.relationship('Match', backref='predictions')
+    # One prediction per user and match; also serves a user's prediction list
+    __table_args__ = (db.Index('uq_predictions_user_match', 'user_id', 'match_id', unique=True),)
+
+    @validates('predicted_result')
+    def _split_predicted_result(self, key, value):
+        self.predicted_home, self.predicted_away = parse_score(value) or (None, None)
+        return value
 
 class FavouriteTeam(db.Model):
     __tablename__ = 'favourite_teams'
@@ -52,4 +116,72 @@ class FavouriteTeam(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
     user = db.relationship('User', backref='favourite_teams')
-    team = db.relationship('Team', backref='favourited_by') 
\ No newline at end of file
+    team = db.relationship('Team', backref='favourited_by')
+    __table_args__ = (db.Index('uq_favourite_teams_user_team', 'user_id', 'team_id', unique=True),)
+
+class SyncState(db.Model):
+    __tablename__ = 'sync_state'
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # 'competition' or 'team'
+    key = db.Column(db.String(50), nullable=False)  # Competition code or team ID
+    last_synced_at = db.Column(db.DateTime, nullable=False)
+    __table_args__ = (db.UniqueConstraint('scope', 'key', name='uq_sync_state_scope_key'),)
+
+class IngestRun(db.Model):
+    __tablename__ = 'ingest_runs'
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='running')  # 'running', 'failed' or 'done'
+    started_at = db.Column(db.DateTime, nullable=False)
+    finished_at = db.Column(db.DateTime)
+    units = db.relationship('IngestUnit', backref='run', lazy=True)
+
+class IngestUnit(db.Model):
+    __tablename__ = 'ingest_units'
+    id = db.Column(db.Integer, primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('ingest_runs.id'), nullable=False)
+    kind = db.Column(db.String(30), nullable=False)  # 'competition', 'teams', 'competition_matches' or 'team_matches'
+    key = db.Column(db.String(50), nullable=False)  # Competition code or team ID
+    status = db.Column(db.String(20), nullable=False)  # 'done' or 'failed'
+    error = db.Column(db.String(255))
+    finished_at = db.Column(db.DateTime)
+    __table_args__ = (db.UniqueConstraint('run_id', 'kind', 'key', name='uq_ingest_units_run_kind_key'),)
+
+class LeaderboardRollup(db.Model):
+    __tablename__ = 'leaderboard_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    league_id = db.Column(db.Integer, nullable=False)  # League ID, or 0 for every league
+    period = db.Column(db.String(10), nullable=False)  # ISO week ('2025-W03') or 'all'
+    points = db.Column(db.Integer, nullable=False, default=0)
+    predictions = db.Column(db.Integer, nullable=False, default=0)  # Scored predictions counted
+    exact = db.Column(db.Integer, nullable=False, default=0)  # Of which exact scores
+    user = db.relationship('User')
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'league_id', 'period', name='uq_leaderboard_rollups_user_league_period'),
+        db.Index('ix_leaderboard_rollups_board', 'league_id', 'period', 'points'),
+    )
+
+class ScrapeJob(db.Model):
+    __tablename__ = 'scrape_jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey('teams.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))  # Who asked first; merged requests share the job
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'done' or 'failed'
+    found = db.Column(db.Integer)
+    inserted = db.Column(db.Integer)
+    updated = db.Column(db.Integer)
+    unchanged = db.Column(db.Integer)
+    stale = db.Column(db.Boolean)
+    error = db.Column(db.String(255))
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    team = db.relationship('Team')
+    # At most one queued or running job per team, across every worker process
+    __table_args__ = (
+        db.Index(
+            'uq_scrape_jobs_team_in_flight', 'team_id', unique=True,
+            postgresql_where=db.text("status IN ('queued', 'running')"),
+            sqlite_where=db.text("status IN ('queued', 'running')"),
+        ),
+    )
@@ -0,0 +1,186 @@
+import base64
+import binascii
+import datetime
+import json
+import math
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import DateTime, and_, false, literal, or_
+
+from . import db
+
+# Largest page a client may ask for
+MAX_PER_PAGE = 100
+# How long an exact total is reused for the same query, and how many are kept
+COUNT_TTL = 30
+COUNT_CACHE_SIZE = 1000
+
+
+class Page:
+    """
+    One page of a keyset-paginated listing.
+
+    `items` are the rows; `next_cursor`/`prev_cursor` are opaque strings for
+    the neighbouring pages, or None at either end. `total` is the cached
+    exact count, or None when it wasn't asked for.
+    """
+
+    def __init__(self, items, page, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return math.ceil(self.total / self.per_page)
+
+    def envelope(self):
+        """The paging keys of a JSON response; total and pages only when counted."""
+        envelope = {'page': self.page, 'per_page': self.per_page,
+                    'next_cursor': self.next_cursor, 'prev_cursor': self.prev_cursor}
+        if self.total is not None:
+            envelope.update(total=self.total, pages=self.pages)
+        return envelope
+
+
+def paginate(query, keys, args, per_page=10):
+    """
+    Keyset-paginate `query` in the order given by `keys`, a list of
+    (expression, descending) pairs ending in a unique column, usually the id.
+    Any ORDER BY already on the query is replaced.
+
+    Reads `cursor`, `per_page`, `page` and `count` from `args`. A cursor
+    seeks straight to its page with WHERE (keys) > (last row's keys), so
+    every page costs the same as the first. Without one, `page` is the old
+    page number: deep pages then fall back to OFFSET, but their cursors lead
+    on from there. The exact total is included on the first request (or with
+    `count=1`, never with `count=0`) and reused for COUNT_TTL seconds.
+    Raises ValueError for a malformed cursor or page.
+    """
+    try:
+        per_page = max(1, min(int(args.get('per_page', per_page)), MAX_PER_PAGE))
+        number = max(1, int(args.get('page', 1)))
+    except ValueError:
+        raise ValueError('page and per_page must be integers')
+    cursor = args.get('cursor')
+    counted = query
+    nulls_low = _nulls_low()
+    query = query.order_by(None).add_columns(*(expr.label(f'_key{i}') for i, (expr, _) in enumerate(keys)))
+    if cursor:
+        values, backwards, number = decode_cursor(cursor, keys)
+        order = [(expr, descending != backwards) for expr, descending in keys]
+        query = query.filter(_after(order, values, nulls_low)).order_by(*_order_by(order))
+        rows = query.limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if backwards:
+            rows.reverse()
+        has_prev, has_next = (more, True) if backwards else (True, more)
+    else:
+        query = query.order_by(*_order_by(keys))
+        rows = query.offset((number - 1) * per_page).limit(per_page + 1).all()
+        has_prev, has_next = number > 1, len(rows) > per_page
+        rows = rows[:per_page]
+    count = args.get('count')
+    total = cached_count(counted) if count == '1' or (count != '0' and not cursor) else None
+    width = len(keys)
+    return Page(
+        [row[0] if len(row) == width + 1 else tuple(row[:-width]) for row in rows],
+        number,
+        per_page,
+        next_cursor=encode_cursor(rows[-1][-width:], number + 1) if rows and has_next else None,
+        # Rows inserted ahead of page 1 leave more to go back to; they count as page 1 too
+        prev_cursor=encode_cursor(rows[0][-width:], max(number - 1, 1), backwards=True) if rows and has_prev else None,
+        total=total,
+    )
+
+
+def encode_cursor(values, page, backwards=False):
+    """Opaque cursor for the rows after (or, backwards, before) a row's key values."""
+    values = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    payload = json.dumps({'k': values, 'p': page, 'b': backwards}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, keys):
+    """(key values, backwards, page number) from encode_cursor(); ValueError if it isn't one."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values, page, backwards = data['k'], int(data['p']), bool(data['b'])
+        if not isinstance(values, list) or len(values) != len(keys) or page < 1:
+            raise ValueError
+        values = [
+            datetime.datetime.fromisoformat(value) if value is not None and isinstance(expr.type, DateTime) else value
+            for value, (expr, _) in zip(values, keys)
+        ]
+    except (binascii.Error, UnicodeDecodeError, KeyError, TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+    return values, backwards, page
+
+
+def _after(order, values, nulls_low):
+    # (k1, k2, ...) strictly after the cursor row in this order, spelled out
+    # as k1 > v1 OR (k1 = v1 AND k2 > v2) OR ... so columns can differ in
+    # direction and hold NULLs. The redundant k1 >= v1 in front is what lets
+    # the database seek the index to the cursor instead of scanning up to it.
+    clauses, equal, bound = [], [], None
+    for (expr, descending), value in zip(order, values):
+        if value is not None:
+            # Bound, so booleans compare like any other value
+            value = literal(value, expr.type)
+            if bound is None and not equal:
+                bound = expr <= value if descending else expr >= value
+                if nulls_low == descending:
+                    bound = or_(bound, expr.is_(None))
+        clauses.append(and_(*equal, _beyond(expr, value, descending, nulls_low)))
+        equal.append(expr.is_(None) if value is None else expr == value)
+    if bound is None:
+        return or_(*clauses)
+    return and_(bound, or_(*clauses))
+
+
+def _beyond(expr, value, descending, nulls_low):
+    # NULLs sort as the lowest value (SQLite) or the highest (PostgreSQL);
+    # ORDER BY keeps that default so the indexes stay usable
+    if value is None:
+        return expr.isnot(None) if nulls_low != descending else false()
+    beyond = expr < value if descending else expr > value
+    if nulls_low == descending:
+        return or_(beyond, expr.is_(None))
+    return beyond
+
+
+def _order_by(order):
+    return [expr.desc() if descending else expr.asc() for expr, descending in order]
+
+
+def _nulls_low():
+    return db.session.get_bind().dialect.name != 'postgresql'
+
+
+_count_lock = threading.Lock()
+
+
+def cached_count(query):
+    """COUNT(*) of `query`, reused for COUNT_TTL seconds per statement and parameters."""
+    compiled = query.statement.compile(dialect=db.session.get_bind().dialect)
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    cache = current_app.extensions.setdefault('count_cache', {})
+    now = time.monotonic()
+    hit = cache.get(key)
+    if hit and now - hit[0] < COUNT_TTL:
+        return hit[1]
+    total = query.order_by(None).count()
+    with _count_lock:
+        cache.pop(key, None)
+        cache[key] = (now, total)
+        while len(cache) > COUNT_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+    return total
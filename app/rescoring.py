@@ -0,0 +1,116 @@
+import time
+
+import numpy as np
+from sqlalchemy import select, update
+
+from . import db
+from .models import Match, Prediction
+from .scoring import RULES, SCORING, rebuild_totals, score_matches, unscored_match_ids
+
+RESCORE_CHUNK_SIZE = 10000
+
+
+class RescoreResult:
+    """Predictions checked and changed by rescore_predictions, and how fast."""
+
+    def __init__(self, rows=0, changed=0, seconds=0.0):
+        self.rows = rows
+        self.changed = changed
+        self.seconds = seconds
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'changed': self.changed,
+            'seconds': round(self.seconds, 3),
+            'rows_per_second': round(self.rows_per_second),
+        }
+
+    def __repr__(self):
+        return (f"<RescoreResult rows={self.rows} changed={self.changed} "
+                f"seconds={self.seconds:.2f} rows/s={self.rows_per_second:.0f}>")
+
+
+def vector_points(ph, pa, h, a, rules=SCORING):
+    """
+    Points for arrays of predicted (ph, pa) and actual (h, a) goals: the
+    NumPy twin of the CASE score_match runs in SQL, built from the same
+    rule predicates. Missing goals are -1 and score 0.
+    """
+    if not rules:
+        return np.zeros(len(ph), dtype=np.int64)
+    known = (ph >= 0) & (pa >= 0)
+    return np.select(
+        [known & RULES[name](ph, pa, h, a) for name, _ in rules],
+        [points for _, points in rules],
+        default=0,
+    )
+
+
+def rescore_predictions(rules=SCORING, chunk_size=RESCORE_CHUNK_SIZE, dry_run=False, progress=None):
+    """
+    Rescore every scored prediction with `rules`, e.g. after SCORING_RULES
+    changed.
+
+    Predictions are read in primary-key order, `chunk_size` at a time, into
+    NumPy arrays; points are computed for the whole chunk at once and only
+    the rows whose points changed are written back, as one executemany
+    UPDATE per chunk. Each chunk commits, and users.score and the
+    leaderboard rollups are rebuilt set-based at the end, so an interrupted
+    run is fixed by running it again. `progress` is called with the running
+    RescoreResult after each chunk.
+    """
+    started = time.perf_counter()
+    result = RescoreResult()
+    if not dry_run:
+        # Finished matches nobody has scored yet go through the normal path first
+        score_matches(unscored_match_ids())
+        db.session.commit()
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Prediction.id, Prediction.predicted_home, Prediction.predicted_away,
+                   Prediction.points_awarded, Match.home_score, Match.away_score)
+            .join(Match, Match.id == Prediction.match_id)
+            .where(Prediction.scored_at.isnot(None), Prediction.id > last_id)
+            .order_by(Prediction.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        ids, ph, pa, current, h, a = _arrays(rows)
+        points = vector_points(ph, pa, h, a, rules)
+        # A match whose result has since been cleared keeps the points it had
+        changed = (h >= 0) & (points != current)
+        if not dry_run and changed.any():
+            db.session.execute(
+                update(Prediction),
+                [{'id': int(i), 'points_awarded': int(p)} for i, p in zip(ids[changed], points[changed])],
+            )
+            db.session.commit()
+        result.rows += len(rows)
+        result.changed += int(changed.sum())
+        result.seconds = time.perf_counter() - started
+        if progress:
+            progress(result)
+    if not dry_run:
+        rebuild_totals()
+        db.session.commit()
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def _arrays(rows):
+    """Columns of a chunk as int64 arrays, with -1 for missing goals."""
+    ids, ph, pa, current, h, a = zip(*rows)
+    return np.array(ids, dtype=np.int64), _ints(ph), _ints(pa), _ints(current, missing=0), _ints(h), _ints(a)
+
+
+def _ints(values, missing=-1):
+    # None becomes NaN in a float array, then `missing`
+    return np.nan_to_num(np.array(values, dtype=np.float64), nan=missing).astype(np.int64)
@@ -0,0 +1,233 @@
+import datetime
+
+from sqlalchemy import Integer, String, and_, case, delete, func, insert, literal, or_, select, true, union_all, update
+
+from . import db
+from .leaderboard import ALL_LEAGUES, ALL_TIME, match_week, note_scores, note_stale
+from .models import User, Team, Match, Prediction, LeaderboardRollup, parse_score
+from .upsert import _dialect_insert
+from settings import SCORING_RULES
+
+
+# Rule predicates compare predicted goals (ph, pa) with the result (h, a).
+# They only use operators, so the same function builds a SQL condition
+# (columns against ints) or a boolean mask (NumPy arrays against arrays).
+def exact(ph, pa, h, a):
+    return (ph == h) & (pa == a)
+
+
+def goal_difference(ph, pa, h, a):
+    return (ph - pa) == (h - a)
+
+
+def outcome(ph, pa, h, a):
+    return ((ph > pa) & (h > a)) | ((ph < pa) & (h < a)) | ((ph == pa) & (h == a))
+
+
+RULES = {'exact': exact, 'goal_difference': goal_difference, 'outcome': outcome}
+
+
+def parse_rules(spec):
+    """Rule tiers from 'exact=3,outcome=1' as ((name, points), ...), best tier first."""
+    rules = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        name, _, points = part.partition('=')
+        name = name.strip()
+        if name not in RULES:
+            raise ValueError(f"Unknown scoring rule {name!r}, expected one of {', '.join(RULES)}")
+        try:
+            rules.append((name, int(points)))
+        except ValueError:
+            raise ValueError(f"Scoring rule {name!r} needs integer points, got {points!r}") from None
+    return tuple(rules)
+
+
+SCORING = parse_rules(SCORING_RULES)
+ROLLUP_COLUMNS = ['user_id', 'league_id', 'period', 'points', 'predictions', 'exact']
+
+
+def score_match(match_id, result, user_id=None, scored_at=None, scope=None, rules=SCORING):
+    """
+    Score every prediction for `match_id` against `result`, the (home, away)
+    goals or an 'H-A' string, in one UPDATE. Each prediction earns the
+    points of the first tier in `rules` it meets (SCORING_RULES by default)
+    and 0 otherwise, and exact-score hits are flagged whatever the rules
+    award. Predictions made after kickoff are left unscored. Scoring is
+    idempotent, so a corrected result simply rescores the match. Pass
+    user_id to score one user's prediction only. Returns the number of
+    predictions scored; the caller commits.
+
+    User.score is kept equal to the sum of each user's scored points: the
+    points previously awarded for this match are retracted and the new
+    ones applied, two set-based UPDATEs in the same transaction. The
+    leaderboard_rollups rows for the match's league and ISO week are kept
+    the same way; `scope` is (league_id, date) of the match, looked up
+    when not given.
+    """
+    score = result if isinstance(result, tuple) else parse_score(result)
+    if score is None or None in score:
+        return 0
+    home, away = score
+    tiers = [
+        (RULES[name](Prediction.predicted_home, Prediction.predicted_away, home, away), awarded)
+        for name, awarded in rules
+    ]
+    points = case(*tiers, else_=0) if tiers else literal(0)
+    hit = case((exact(Prediction.predicted_home, Prediction.predicted_away, home, away), True), else_=False)
+    kickoff = select(Match.kickoff).where(Match.id == match_id).scalar_subquery()
+    stmt = update(Prediction).where(Prediction.match_id == match_id, on_time(kickoff))
+    if user_id is not None:
+        stmt = stmt.where(Prediction.user_id == user_id)
+    league_id, date = scope if scope is not None else _match_scope(match_id)
+    stmt = stmt.values(
+        points_awarded=points,
+        exact=hit,
+        scored_at=scored_at or datetime.datetime.utcnow(),
+        scored_league_id=league_id,
+        scored_week=match_week(date),
+    )
+    _adjust_user_scores(match_id, user_id, -1)
+    _adjust_rollups(match_id, user_id, -1)
+    scored = db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    _adjust_user_scores(match_id, user_id, 1)
+    _adjust_rollups(match_id, user_id, 1)
+    return scored
+
+
+def on_time(kickoff):
+    """Condition for predictions made before `kickoff`; rows without created_at count as on time."""
+    return or_(Prediction.created_at.is_(None), kickoff.is_(None), Prediction.created_at < kickoff)
+
+
+def _match_scope(match_id):
+    """(league_id, date) of a match; its league is the home team's."""
+    return db.session.execute(
+        select(Team.league_id, Match.date)
+        .select_from(Match)
+        .outerjoin(Team, Team.id == Match.home_team_id)
+        .where(Match.id == match_id)
+    ).one_or_none() or (None, None)
+
+
+def _adjust_user_scores(match_id, user_id, sign):
+    """Add (sign=1) or remove (sign=-1) the points users hold from scored predictions on a match."""
+    scored = and_(Prediction.match_id == match_id, Prediction.scored_at.isnot(None))
+    if user_id is not None:
+        scored = and_(scored, Prediction.user_id == user_id)
+    held = (
+        select(func.coalesce(func.sum(Prediction.points_awarded), 0))
+        .where(scored, Prediction.user_id == User.id)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(User)
+        .where(User.id.in_(select(Prediction.user_id).where(scored)))
+        .values(score=func.coalesce(User.score, 0) + sign * held)
+        .execution_options(synchronize_session=False)
+    )
+    if sign < 0:
+        db.session.execute(stmt)
+    elif db.session.get_bind().dialect.update_returning:
+        # Hand the new totals to the in-process rank index, no extra query needed
+        note_scores(db.session.execute(stmt.returning(User.id, User.score)).all())
+    else:
+        db.session.execute(stmt)
+        note_stale()
+
+
+def _adjust_rollups(match_id, user_id, sign):
+    """
+    Add (sign=1) or remove (sign=-1) a match's scored predictions in
+    leaderboard_rollups, in the buckets recorded on each prediction:
+    (league, week), (league, all time) and (every league, week). One
+    INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+    """
+    scored = [Prediction.match_id == match_id, Prediction.scored_at.isnot(None)]
+    if user_id is not None:
+        scored.append(Prediction.user_id == user_id)
+    rows = _rollup_rows(scored, sign)
+    table = LeaderboardRollup.__table__
+    upsert = _dialect_insert(table)
+    if upsert is None:
+        for row in db.session.execute(rows).mappings().all():
+            key = and_(*[table.c[c] == row[c] for c in ROLLUP_COLUMNS[:3]])
+            values = {c: table.c[c] + row[c] for c in ROLLUP_COLUMNS[3:]}
+            if not db.session.execute(update(table).where(key).values(**values)).rowcount:
+                db.session.execute(table.insert().values(**row))
+        return
+    upsert = upsert.from_select(ROLLUP_COLUMNS, rows)
+    db.session.execute(upsert.on_conflict_do_update(
+        index_elements=ROLLUP_COLUMNS[:3],
+        set_={c: table.c[c] + upsert.excluded[c] for c in ROLLUP_COLUMNS[3:]},
+    ))
+
+
+def _rollup_rows(scored, sign):
+    """SELECT of (ROLLUP_COLUMNS) totals, times `sign`, for the predictions matching `scored`."""
+    league, week = Prediction.scored_league_id, Prediction.scored_week
+    # (league, period, grouped by): constants stay out of GROUP BY, PostgreSQL reads integer literals there as positions
+    buckets = (
+        (league, week, (league, week)),
+        (league, literal(ALL_TIME, String), (league,)),
+        (literal(ALL_LEAGUES, Integer), week, (week,)),
+    )
+    source = union_all(*[
+        select(
+            Prediction.user_id.label('user_id'),
+            bucket_league.label('league_id'),
+            period.label('period'),
+            (sign * func.sum(func.coalesce(Prediction.points_awarded, 0))).label('points'),
+            (sign * func.count()).label('predictions'),
+            (sign * func.count(case((Prediction.exact.is_(True), 1)))).label('exact'),
+        )
+        .where(*scored, *[c.isnot(None) for c in grouped])
+        .group_by(Prediction.user_id, *grouped)
+        for bucket_league, period, grouped in buckets
+    ]).subquery()
+    # WHERE true keeps SQLite from reading ON CONFLICT as a join constraint
+    return select(*[source.c[c] for c in ROLLUP_COLUMNS]).where(true())
+
+
+def rebuild_totals():
+    """
+    Recompute users.score and every leaderboard_rollups row from the scored
+    predictions, for after a bulk rescore. Set-based; the caller commits.
+    """
+    scored = Prediction.scored_at.isnot(None)
+    held = (
+        select(func.coalesce(func.sum(Prediction.points_awarded), 0))
+        .where(scored, Prediction.user_id == User.id)
+        .scalar_subquery()
+    )
+    db.session.execute(update(User).values(score=held).execution_options(synchronize_session=False))
+    db.session.execute(delete(LeaderboardRollup).execution_options(synchronize_session=False))
+    db.session.execute(insert(LeaderboardRollup).from_select(ROLLUP_COLUMNS, _rollup_rows([scored], 1)))
+    note_stale()
+
+
+def score_matches(match_ids):
+    """Score the predictions of every finished match in `match_ids`. Returns predictions scored."""
+    match_ids = list(set(match_ids))
+    if not match_ids:
+        return 0
+    scored_at = datetime.datetime.utcnow()
+    scored = 0
+    for start in range(0, len(match_ids), 500):
+        rows = db.session.execute(
+            select(Match.id, Match.home_score, Match.away_score, Team.league_id, Match.date)
+            .outerjoin(Team, Team.id == Match.home_team_id)
+            .where(Match.id.in_(match_ids[start:start + 500]), Match.home_score.isnot(None), Match.away_score.isnot(None))
+        ).all()
+        for match_id, home, away, league_id, date in rows:
+            scored += score_match(match_id, (home, away), scored_at=scored_at, scope=(league_id, date))
+    return scored
+
+
+def unscored_match_ids():
+    """Finished matches that still have on-time predictions nobody has scored."""
+    return db.session.execute(
+        select(Prediction.match_id).distinct()
+        .join(Match, Match.id == Prediction.match_id)
+        .where(Prediction.scored_at.is_(None), on_time(Match.kickoff),
+               Match.home_score.isnot(None), Match.away_score.isnot(None))
+    ).scalars().all()
@@ -0,0 +1,224 @@
+import math
+import re
+
+from sqlalchemy import DDL, Integer, cast, column, event, func, literal_column, or_, select, table
+
+from . import db
+from .models import Team
+
+# Default and largest number of suggestions from autocomplete()
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX = 50
+# Names fetched from the SQLite full-text index before re-ranking by similarity
+CANDIDATES = 100
+# Fuzzy search reads the names containing its rarest trigrams up to about this many,
+# and re-ranks the best FUZZY_CANDIDATES of them; together they keep a typo inside
+# the 10 ms autocomplete budget on 100k teams (tests/test_search.py)
+FUZZY_POSTINGS = 1000
+FUZZY_CANDIDATES = 30
+# Same default as pg_trgm's similarity_threshold, which the % operator uses
+SIMILARITY_THRESHOLD = 0.3
+# Trigram indexes can't answer shorter terms; those are a prefix range on lower(name)
+MIN_TRIGRAM_TERM = 3
+# relevance() sorts on similarity in whole steps of 1/SIMILARITY_STEPS: the float4 from
+# pg_trgm doesn't survive a JSON cursor and a float8 comparison exactly, an integer does
+SIMILARITY_STEPS = 100000
+
+# SQLite: an FTS5 trigram index over teams.name, kept in step by triggers.
+# PostgreSQL: a pg_trgm GIN index, which also serves ILIKE '%term%'.
+# The migration creates the same objects for existing databases.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS teams_fts USING fts5("
+    "name, content='teams', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS teams_fts_insert AFTER INSERT ON teams BEGIN"
+    " INSERT INTO teams_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS teams_fts_delete AFTER DELETE ON teams BEGIN"
+    " INSERT INTO teams_fts(teams_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS teams_fts_update AFTER UPDATE OF id, name ON teams BEGIN"
+    " INSERT INTO teams_fts(teams_fts, rowid, name) VALUES ('delete', old.id, old.name);"
+    " INSERT INTO teams_fts(rowid, name) VALUES (new.id, new.name); END",
+    # How many names each trigram is in, so fuzzy search can start from the rare ones
+    "CREATE VIRTUAL TABLE IF NOT EXISTS teams_fts_vocab USING fts5vocab(teams_fts, 'row')",
+]
+POSTGRESQL_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_teams_name_trgm ON teams USING gin (name gin_trgm_ops)",
+]
+
+for statement in SQLITE_DDL:
+    event.listen(Team.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRESQL_DDL:
+    event.listen(Team.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+# Dropping teams takes its triggers with it, but not the virtual tables
+for name in ('teams_fts_vocab', 'teams_fts'):
+    event.listen(Team.__table__, 'after_drop', DDL(f"DROP TABLE IF EXISTS {name}").execute_if(dialect='sqlite'))
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Alembic autogenerate filter (migrations/env.py): the search objects above
+    aren't in the models, so without it the next migration would drop them.
+    FTS5 keeps its index in teams_fts_* shadow tables.
+    """
+    if reflected and compare_to is None and name is not None:
+        if type_ == 'table' and (name == 'teams_fts' or name.startswith('teams_fts_')):
+            return False
+        if type_ == 'index' and name == 'ix_teams_name_trgm':
+            return False
+    return True
+
+
+teams_fts = table('teams_fts', column('rowid'), column('name'))
+teams_fts_vocab = table('teams_fts_vocab', column('term'), column('doc'))
+
+
+def trigrams(text):
+    """pg_trgm's trigrams: each lower-cased word padded with two spaces in front and one behind."""
+    grams = set()
+    for word in re.findall(r'[^\W_]+', text.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """pg_trgm's similarity(a, b): shared trigrams over all trigrams, 0 to 1."""
+    return _similarity(trigrams(a), b)
+
+
+def _similarity(grams, name):
+    other = trigrams(name)
+    if not grams or not other:
+        return 0.0
+    return len(grams & other) / len(grams | other)
+
+
+def team_filter(term):
+    """
+    Condition for teams whose name contains `term`, case-insensitively, in a
+    form the dialect's search index can answer.
+    """
+    if _dialect() == 'sqlite' and len(term) >= MIN_TRIGRAM_TERM:
+        return Team.id.in_(select(teams_fts.c.rowid).where(literal_column('teams_fts').op('MATCH')(_phrase(term))))
+    return Team.name.ilike(f'%{_escape_like(term)}%', escape='\\')
+
+
+def relevance(term, dialect=None):
+    """
+    Sort keys, as (expression, descending) pairs, putting the closest names
+    first. PostgreSQL sorts on similarity(), as an integer so keyset cursors
+    compare exactly; elsewhere an exact match, then a prefix match, then the
+    shortest name stands in for it, which is the same order for names that
+    contain the term. `dialect` defaults to the session's.
+    """
+    if (dialect or _dialect()) == 'postgresql':
+        return [(cast(func.similarity(Team.name, term) * SIMILARITY_STEPS, Integer), True), (Team.name, False)]
+    lowered = func.lower(Team.name)
+    return [
+        (lowered == term.lower(), True),
+        (lowered.like(f'{_escape_like(term.lower())}%', escape='\\'), True),
+        (func.length(Team.name), False),
+        (Team.name, False),
+    ]
+
+
+def autocomplete(term, limit=AUTOCOMPLETE_LIMIT, league_id=None):
+    """
+    Up to `limit` teams for a search box, best match first: names containing
+    `term` and, for terms of MIN_TRIGRAM_TERM characters or more, names within
+    SIMILARITY_THRESHOLD of it, so small typos still match. Scores are
+    pg_trgm similarity on every database.
+    """
+    term = term.strip()
+    if not term:
+        return []
+    query = select(Team.id, Team.name, Team.logo_url, Team.league_id)
+    if league_id is not None:
+        query = query.where(Team.league_id == league_id)
+    dialect = _dialect()
+    if len(term) < MIN_TRIGRAM_TERM:
+        rows = db.session.execute(_prefix(query, term).order_by(func.length(Team.name), Team.name).limit(limit)).all()
+    elif dialect == 'postgresql':
+        query = query.where(or_(Team.name.ilike(f'%{_escape_like(term)}%', escape='\\'), Team.name.op('%')(term)))
+        rows = db.session.execute(query.order_by(func.similarity(Team.name, term).desc(), Team.name).limit(limit)).all()
+    elif dialect == 'sqlite':
+        rows = _sqlite_candidates(query, term, limit)
+    else:
+        query = query.where(Team.name.ilike(f'%{_escape_like(term)}%', escape='\\'))
+        order = [expr.desc() if descending else expr for expr, descending in relevance(term)]
+        rows = db.session.execute(query.order_by(*order).limit(CANDIDATES)).all()
+    lowered, grams = term.lower(), trigrams(term)
+    results = []
+    for team_id, name, logo_url, team_league_id in rows:
+        score = _similarity(grams, name)
+        if score >= SIMILARITY_THRESHOLD or lowered in name.lower() or len(term) < MIN_TRIGRAM_TERM:
+            results.append({'id': team_id, 'name': name, 'logo_url': logo_url, 'league_id': team_league_id,
+                            'score': round(score, 3)})
+    results.sort(key=lambda r: (-r['score'], r['name']))
+    return results[:limit]
+
+
+def _sqlite_candidates(query, term, limit):
+    # Every step reads a bounded number of rows in index order, so the cost
+    # doesn't grow with the number of names containing a common word: the
+    # names starting with the term, any names containing it and, only when
+    # those don't fill `limit` (e.g. a typo), names sharing its rarest
+    # trigrams. The caller re-ranks them all by similarity.
+    fts = literal_column('teams_fts')
+    matching = query.join(teams_fts, teams_fts.c.rowid == Team.id).limit(CANDIDATES)
+    rows = db.session.execute(_prefix(query, term).order_by(func.lower(Team.name)).limit(CANDIDATES)).all()
+    rows += db.session.execute(matching.where(fts.op('MATCH')(_phrase(term)))).all()
+    rows = list({row[0]: row for row in rows}.values())
+    if len(rows) >= limit:
+        return rows
+    grams = _rare_trigrams(term)
+    if not grams:
+        return rows
+    match = ' OR '.join(_phrase(g) for g in grams)
+    # Rank inside the full-text index and join only the best FUZZY_CANDIDATES
+    best = (select(teams_fts.c.rowid.label('id'), literal_column('rank').label('rank'))
+            .where(fts.op('MATCH')(match)).order_by(literal_column('rank')).limit(FUZZY_CANDIDATES).subquery())
+    fuzzy = db.session.execute(query.join(best, best.c.id == Team.id).order_by(best.c.rank))
+    seen = {row[0] for row in rows}
+    return rows + [row for row in fuzzy if row[0] not in seen]
+
+
+def _rare_trigrams(term):
+    # A name within SIMILARITY_THRESHOLD shares at least that fraction of the
+    # term's trigrams, so it contains one of the rarest len(found) - shared + 1
+    # of those that occur at all. Common trigrams past FUZZY_POSTINGS names are
+    # left out: they say little about a match and cost the most to rank.
+    grams = {term.lower()[i:i + 3] for i in range(len(term) - 2)}
+    counts = dict(db.session.execute(
+        select(teams_fts_vocab.c.term, teams_fts_vocab.c.doc).where(teams_fts_vocab.c.term.in_(grams))
+    ).all())
+    found = sorted((g for g in grams if counts.get(g)), key=counts.get)
+    shared = math.ceil(SIMILARITY_THRESHOLD * len(grams))
+    rare, postings = [], 0
+    for gram in found[:max(len(found) - shared + 1, 0)]:
+        postings += counts[gram]
+        if rare and postings > FUZZY_POSTINGS:
+            break
+        rare.append(gram)
+    return rare
+
+
+def _prefix(query, term):
+    # A range on the lower(name) index rather than LIKE, which neither
+    # database will run against an expression index
+    lowered = term.lower()
+    upper = lowered[:-1] + chr(ord(lowered[-1]) + 1)
+    return query.where(func.lower(Team.name) >= lowered, func.lower(Team.name) < upper)
+
+
+def _phrase(text):
+    # An FTS5 string: the whole term, quotes doubled, no query syntax
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
@@ -0,0 +1,95 @@
+import datetime
+
+from sqlalchemy.orm import joinedload
+
+from .models import Team, Match, Prediction
+
+
+class Serializer:
+    """
+    JSON payload for one model.
+
+    `fields` maps each output key to a column name or a function of the
+    object; `load` lists the loader options that fetch every relationship
+    those functions touch in the same query as the objects themselves, so a
+    list costs the same number of queries whatever its length. Apply them
+    with query() before running the query, then dump() the rows.
+    """
+
+    def __init__(self, fields, load=()):
+        self.fields = fields
+        self.load = tuple(load)
+
+    def query(self, query):
+        """`query` with this payload's relationships eager-loaded."""
+        return query.options(*self.load)
+
+    def dump(self, obj, **extra):
+        """Payload for one object; `extra` adds or overrides keys."""
+        payload = {
+            key: getattr(obj, field) if isinstance(field, str) else field(obj)
+            for key, field in self.fields.items()
+        }
+        payload.update(extra)
+        return payload
+
+    def dump_all(self, objs):
+        return [self.dump(obj) for obj in objs]
+
+
+def kickoff_iso(kickoff):
+    if kickoff is None:
+        return None
+    if kickoff.tzinfo is None:
+        # SQLite returns the stored UTC value without its offset
+        kickoff = kickoff.replace(tzinfo=datetime.timezone.utc)
+    return kickoff.isoformat().replace('+00:00', 'Z')
+
+
+def _team_name(team):
+    return team.name if team else None
+
+
+def _with_teams(path=None):
+    # Both sides of a match, under `path` if given, with just the columns the payload shows
+    options = []
+    for side in (Match.home_team, Match.away_team):
+        option = path.joinedload(side) if path is not None else joinedload(side)
+        options.append(option.load_only(Team.id, Team.name))
+    return options
+
+
+TEAM = Serializer({
+    'id': 'id',
+    'name': 'name',
+    'logo_url': 'logo_url',
+    'stadium': 'stadium',
+    'league_id': 'league_id',
+})
+
+MATCH = Serializer(
+    {
+        'id': 'id',
+        'home_team': lambda m: _team_name(m.home_team),
+        'away_team': lambda m: _team_name(m.away_team),
+        'date': 'date',
+        'kickoff': lambda m: kickoff_iso(m.kickoff),
+        'result': 'result',
+    },
+    load=_with_teams(),
+)
+
+PREDICTION = Serializer(
+    {
+        'id': 'id',
+        'match_id': 'match_id',
+        'home_team': lambda p: _team_name(p.match.home_team) if p.match else None,
+        'away_team': lambda p: _team_name(p.match.away_team) if p.match else None,
+        'date': lambda p: p.match.date if p.match else None,
+        'predicted_result': 'predicted_result',
+        'actual_result': lambda p: p.match.result if p.match else None,
+        'points': lambda p: p.points_awarded or 0,
+        'correct': lambda p: bool(p.exact),
+    },
+    load=_with_teams(joinedload(Prediction.match)),
+)
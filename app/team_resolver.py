@@ -0,0 +1,121 @@
+import difflib
+import re
+import threading
+import time
+import unicodedata
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+
+from . import db
+from .models import Team
+
+# Club-type affixes that scraped names add or drop ("Arsenal FC" vs "Arsenal")
+AFFIXES = {'fc', 'afc', 'cf', 'sc', 'ac', 'as', 'ssc', 'ss', 'sv', 'vfb', 'vfl', 'tsg', 'bv', 'rc', 'cd', 'ud', 'club', 'de', 'calcio', '1'}
+# Rebuild at least this often, so team changes made by other processes show up
+RESOLVER_TTL = 300
+# How close a fuzzy match must be, and how far ahead of the runner-up
+FUZZY_CUTOFF = 0.85
+FUZZY_MARGIN = 0.05
+
+
+def normalize(name):
+    """Lower-case, accent-free, punctuation-free form of a team name."""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(c for c in name if not unicodedata.combining(c)).casefold()
+    name = name.replace('&', ' and ')
+    return ' '.join(re.findall(r'[a-z0-9]+', name))
+
+
+def aliases(name):
+    """Every lookup key a team name is known by."""
+    full = normalize(name)
+    keys = {full, full.replace(' ', '')}
+    core = ' '.join(t for t in full.split() if t not in AFFIXES)
+    if core:
+        keys.update({core, core.replace(' ', '')})
+    return keys
+
+
+class TeamResolver:
+    """
+    In-memory index mapping scraped team names to team ids.
+
+    Built once from the teams table: the Football-Data.org id, the normalized
+    name and its aliases (no accents, no "FC"/"AFC"-style affixes, no spaces)
+    are all dict keys, so exact lookups are O(1). A key shared by two teams is
+    ambiguous and never used. Names that miss every key fall back to a fuzzy
+    match against the normalized names, accepted only when it is close and
+    clearly better than the runner-up.
+    """
+
+    def __init__(self, teams):
+        self.ids = set()
+        self._keys = {}
+        self._names = {}
+        ambiguous = set()
+        for team_id, name in teams:
+            self.ids.add(team_id)
+            self._names[normalize(name)] = team_id
+            for key in aliases(name):
+                if self._keys.get(key, team_id) != team_id:
+                    ambiguous.add(key)
+                self._keys[key] = team_id
+        for key in ambiguous:
+            del self._keys[key]
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def from_db(cls):
+        return cls(db.session.execute(select(Team.id, Team.name)).all())
+
+    def resolve(self, name=None, team_id=None):
+        """Team id for a Football-Data.org id and/or a scraped name, or None."""
+        if team_id in self.ids:
+            return team_id
+        if not name:
+            return None
+        for key in aliases(name):
+            if key in self._keys:
+                return self._keys[key]
+        return self._fuzzy(normalize(name))
+
+    def _fuzzy(self, key):
+        scored = sorted(
+            ((difflib.SequenceMatcher(None, key, candidate).ratio(), candidate)
+             for candidate in difflib.get_close_matches(key, self._names, n=2, cutoff=FUZZY_CUTOFF)),
+            reverse=True,
+        )
+        if not scored:
+            return None
+        if len(scored) > 1 and scored[0][0] - scored[1][0] < FUZZY_MARGIN:
+            return None
+        return self._names[scored[0][1]]
+
+
+_lock = threading.Lock()
+
+
+def get_resolver():
+    """The current app's TeamResolver, rebuilt after team changes or once it is RESOLVER_TTL old."""
+    state = current_app.extensions.setdefault('team_resolver', {'resolver': None})
+    resolver = state['resolver']
+    if resolver is None or time.monotonic() - resolver.built_at > RESOLVER_TTL:
+        with _lock:
+            resolver = state['resolver']
+            if resolver is None or time.monotonic() - resolver.built_at > RESOLVER_TTL:
+                resolver = state['resolver'] = TeamResolver.from_db()
+    return resolver
+
+
+def invalidate():
+    """Drop the current app's index; the next get_resolver() rebuilds it."""
+    if has_app_context():
+        current_app.extensions.setdefault('team_resolver', {})['resolver'] = None
+
+
+@event.listens_for(Team, 'after_insert')
+@event.listens_for(Team, 'after_update')
+@event.listens_for(Team, 'after_delete')
+def _team_changed(mapper, connection, target):
+    invalidate()
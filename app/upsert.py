@@ -0,0 +1,116 @@
+import datetime
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+
+
+class UpsertResult:
+    """
+    Row counts returned by bulk_upsert, plus the keys of the rows it inserted
+    or updated. Results can be added together.
+    """
+
+    def __init__(self, inserted=0, updated=0, unchanged=0, changed=None):
+        self.inserted = inserted
+        self.updated = updated
+        self.unchanged = unchanged
+        self.changed = changed if changed is not None else []
+
+    def __add__(self, other):
+        return UpsertResult(
+            self.inserted + other.inserted,
+            self.updated + other.updated,
+            self.unchanged + other.unchanged,
+            self.changed + other.changed,
+        )
+
+    def as_dict(self):
+        return {'inserted': self.inserted, 'updated': self.updated, 'unchanged': self.unchanged}
+
+    def __repr__(self):
+        return f"<UpsertResult inserted={self.inserted} updated={self.updated} unchanged={self.unchanged}>"
+
+
+def _dialect_insert(table):
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert(table)
+    if dialect == 'sqlite':
+        return sqlite.insert(table)
+    return None
+
+
+def _same(new, stored):
+    # SQLite hands timezone-aware columns back naive; those values are UTC
+    if isinstance(new, datetime.datetime) and isinstance(stored, datetime.datetime):
+        if new.tzinfo is None:
+            new = new.replace(tzinfo=datetime.timezone.utc)
+        if stored.tzinfo is None:
+            stored = stored.replace(tzinfo=datetime.timezone.utc)
+    return new == stored
+
+
+def bulk_upsert(model, rows, key='id', update_columns=None, chunk_size=500):
+    """
+    Insert or update `rows` (a list of dicts keyed by column name) in chunks.
+
+    Each chunk costs one SELECT to find which keys already exist and whether
+    their values differ, then one INSERT ... ON CONFLICT DO UPDATE carrying
+    only the new and changed rows (PostgreSQL and SQLite). Other dialects fall
+    back to an executemany INSERT plus an executemany UPDATE by primary key.
+    Unchanged rows are never written. The caller owns the transaction and
+    must commit.
+    """
+    table = model.__table__
+    key_column = table.c[key]
+    # Last occurrence wins when the same key appears twice in the input
+    unique_rows = list({row[key]: row for row in rows}.values())
+    result = UpsertResult()
+    if not unique_rows:
+        return result
+    if update_columns is None:
+        update_columns = [c for c in unique_rows[0] if c != key]
+
+    for start in range(0, len(unique_rows), chunk_size):
+        chunk = unique_rows[start:start + chunk_size]
+        existing = {
+            r[0]: r[1:]
+            for r in db.session.execute(
+                select(key_column, *[table.c[c] for c in update_columns])
+                .where(key_column.in_([row[key] for row in chunk]))
+            )
+        }
+        new_rows, changed_rows = [], []
+        for row in chunk:
+            current = existing.get(row[key])
+            if current is None:
+                new_rows.append(row)
+            elif any(not _same(row.get(c), value) for c, value in zip(update_columns, current)):
+                changed_rows.append(row)
+        result.inserted += len(new_rows)
+        result.updated += len(changed_rows)
+        result.unchanged += len(chunk) - len(new_rows) - len(changed_rows)
+
+        to_write = new_rows + changed_rows
+        if not to_write:
+            continue
+        result.changed.extend(row[key] for row in to_write)
+        stmt = _dialect_insert(table)
+        if stmt is not None:
+            stmt = stmt.values(to_write)
+            if update_columns:
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[key_column],
+                    set_={c: stmt.excluded[c] for c in update_columns},
+                )
+            else:
+                stmt = stmt.on_conflict_do_nothing(index_elements=[key_column])
+            db.session.execute(stmt)
+        else:
+            if new_rows:
+                db.session.execute(insert(table), new_rows)
+            if changed_rows:
+                db.session.execute(update(model), changed_rows)
+    return result
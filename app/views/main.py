@@ -1,5 +1,7 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from ..models import Team, Match, Prediction
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from ..models import Team, Match
+from ..pagination import paginate
+from ..search import relevance, team_filter
 import requests
 from sqlalchemy import desc
 # from ..api.v1 import jwt_required  # No longer needed for page routes
@@ -25,15 +27,18 @@ def teams():
                 flash(f"Could not add team: {resp.json().get('error', 'Unknown error')}", 'danger')
         return redirect(url_for('main.teams'))
 
-    # Classic pagination and search
-    page = int(request.args.get('page', 1))
-    per_page = int(request.args.get('per_page', 5))
+    # Cursor pagination and search
     search = request.args.get('search', '').strip()
     query = Team.query
+    # Order by favourite first, then closest match or name ascending
+    keys = [(Team.name, False)]
     if search:
-        query = query.filter(Team.name.ilike(f'%{search}%'))
-    # Order by favourite first, then name ascending
-    pagination = query.order_by(desc(Team.favourite), Team.name).paginate(page=page, per_page=per_page, error_out=False)
+        query = query.filter(team_filter(search))
+        keys = relevance(search)
+    try:
+        pagination = paginate(query, [(Team.favourite, True)] + keys + [(Team.id, False)], request.args, per_page=5)
+    except ValueError:
+        abort(400)
     teams = pagination.items
     return render_template('teams.html', teams=teams, pagination=pagination, search=search)
 
@@ -45,9 +50,8 @@ def matches():
 
 @main.route('/leaderboard')
 def leaderboard():
-    predictions = Prediction.query.all()
-    # Leaderboard logic placeholder
-    return render_template('leaderboard.html', predictions=predictions)
+    # Rows are fetched by the page from /api/v1/leaderboard
+    return render_template('leaderboard.html')
 
 @main.route('/your-predictions')
 def your_predictions():
@@ -0,0 +1,89 @@
+"""Index hot query paths
+
+Revision ID: 6a1f0c9d3e52
+Revises: 9e3b5a8c1f07
+Create Date: 2026-10-18 18:31:26.118405
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1f0c9d3e52'
+down_revision = '9e3b5a8c1f07'
+branch_labels = None
+depends_on = None
+
+EXACT_POINTS = 3
+
+# (name, table, columns, unique), matched to the queries in app/api/v1.py and app/scoring.py
+INDEXES = [
+    # Team fixtures and stats: home_team_id = ? OR away_team_id = ?, ordered by kickoff
+    ('ix_matches_home_team_kickoff', 'matches', ['home_team_id', 'kickoff'], False),
+    ('ix_matches_away_team_kickoff', 'matches', ['away_team_id', 'kickoff'], False),
+    # A user's predictions, and the one-prediction-per-match check
+    ('uq_predictions_user_match', 'predictions', ['user_id', 'match_id'], True),
+    # Scoring works match by match
+    ('ix_predictions_match_id', 'predictions', ['match_id'], False),
+    # A user's favourites, and the already-favourited check
+    ('uq_favourite_teams_user_team', 'favourite_teams', ['user_id', 'team_id'], True),
+    # Teams by league, and the league join in /matches and standings
+    ('ix_teams_league_id', 'teams', ['league_id'], False),
+]
+
+
+def upgrade():
+    # Unique indexes can't be built over duplicates: keep the first row of each pair
+    _drop_duplicate_predictions()
+    op.execute(
+        "DELETE FROM favourite_teams WHERE id NOT IN"
+        " (SELECT MIN(id) FROM favourite_teams GROUP BY user_id, team_id)"
+    )
+    # Build online on PostgreSQL: CREATE INDEX CONCURRENTLY doesn't block writes
+    # but can't run inside a transaction. If a concurrent build fails it leaves
+    # an INVALID index behind; drop it before running this again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+
+
+def _drop_duplicate_predictions():
+    conn = op.get_bind()
+    duplicates = conn.execute(sa.text(
+        "SELECT id, user_id, points_awarded, scored_at, scored_league_id, scored_week FROM predictions"
+        " WHERE id NOT IN (SELECT MIN(id) FROM predictions GROUP BY user_id, match_id)"
+    )).all()
+    if not duplicates:
+        return
+    # Take the points of scored duplicates back out of the rollups they were counted in
+    adjust = sa.text(
+        "UPDATE leaderboard_rollups SET points = points - :points, predictions = predictions - 1,"
+        " exact = exact - :exact WHERE user_id = :user_id AND league_id = :league_id AND period = :period"
+    )
+    for _, user_id, points, scored_at, league_id, week in duplicates:
+        if scored_at is None:
+            continue
+        points = points or 0
+        for bucket_league, period in ((league_id, week), (league_id, 'all'), (0, week)):
+            if bucket_league is not None and period is not None:
+                conn.execute(adjust, {'points': points, 'exact': int(points == EXACT_POINTS), 'user_id': user_id,
+                                      'league_id': bucket_league, 'period': period})
+    ids = [row[0] for row in duplicates]
+    for start in range(0, len(ids), 500):
+        conn.execute(sa.text("DELETE FROM predictions WHERE id IN :ids").bindparams(sa.bindparam('ids', expanding=True)),
+                     {'ids': ids[start:start + 500]})
+    users = sorted({row[1] for row in duplicates if row[1] is not None})
+    conn.execute(
+        sa.text(
+            "UPDATE users SET score = (SELECT COALESCE(SUM(points_awarded), 0) FROM predictions"
+            " WHERE predictions.user_id = users.id AND predictions.scored_at IS NOT NULL) WHERE id IN :ids"
+        ).bindparams(sa.bindparam('ids', expanding=True)),
+        {'ids': users},
+    )
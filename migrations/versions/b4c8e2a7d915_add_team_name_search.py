@@ -0,0 +1,66 @@
+"""Add team name search
+
+Revision ID: b4c8e2a7d915
+Revises: 6a1f0c9d3e52
+Create Date: 2026-10-18 19:12:44.507382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4c8e2a7d915'
+down_revision = '6a1f0c9d3e52'
+branch_labels = None
+depends_on = None
+
+# Same objects app/search.py creates alongside a new teams table
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE teams_fts USING fts5(name, content='teams', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER teams_fts_insert AFTER INSERT ON teams BEGIN"
+    " INSERT INTO teams_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER teams_fts_delete AFTER DELETE ON teams BEGIN"
+    " INSERT INTO teams_fts(teams_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER teams_fts_update AFTER UPDATE OF id, name ON teams BEGIN"
+    " INSERT INTO teams_fts(teams_fts, rowid, name) VALUES ('delete', old.id, old.name);"
+    " INSERT INTO teams_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE VIRTUAL TABLE teams_fts_vocab USING fts5vocab(teams_fts, 'row')",
+    # Index the names already there
+    "INSERT INTO teams_fts(teams_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS teams_fts_update",
+    "DROP TRIGGER IF EXISTS teams_fts_delete",
+    "DROP TRIGGER IF EXISTS teams_fts_insert",
+    "DROP TABLE IF EXISTS teams_fts_vocab",
+    "DROP TABLE IF EXISTS teams_fts",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Built online on PostgreSQL, as in 6a1f0c9d3e52
+    with op.get_context().autocommit_block():
+        op.create_index('ix_teams_name_lower', 'teams', [sa.text('lower(name)')], unique=False,
+                        postgresql_concurrently=True)
+        if dialect == 'postgresql':
+            op.create_index('ix_teams_name_trgm', 'teams', ['name'], unique=False, postgresql_using='gin',
+                            postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    with op.get_context().autocommit_block():
+        if dialect == 'postgresql':
+            op.drop_index('ix_teams_name_trgm', table_name='teams', postgresql_concurrently=True)
+        op.drop_index('ix_teams_name_lower', table_name='teams', postgresql_concurrently=True)
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(statement)
+    # pg_trgm stays installed: other objects may depend on it
@@ -0,0 +1,30 @@
+import argparse
+
+from app import create_app
+from app.rescoring import RESCORE_CHUNK_SIZE, rescore_predictions
+from app.scoring import SCORING
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rescore every scored prediction with the current SCORING_RULES.")
+    parser.add_argument('--chunk-size', type=int, default=RESCORE_CHUNK_SIZE,
+                        help=f"Predictions read and scored per chunk (default: {RESCORE_CHUNK_SIZE})")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Count the predictions whose points would change without writing anything")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        print("Scoring rules: " + ', '.join(f"{name}={points}" for name, points in SCORING))
+
+        def progress(result):
+            print(f"  {result.rows} predictions checked, {result.changed} changed, {result.rows_per_second:.0f} rows/s")
+
+        result = rescore_predictions(chunk_size=args.chunk_size, dry_run=args.dry_run, progress=progress)
+    verb = "would change" if args.dry_run else "changed"
+    print(f"Rescored {result.rows} predictions in {result.seconds:.2f}s ({result.rows_per_second:.0f} rows/s), "
+          f"{result.changed} {verb}.")
+
+
+if __name__ == "__main__":
+    main()
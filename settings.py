@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load .env file if it exists (won't fail if missing)
@@ -8,3 +9,33 @@ load_dotenv()
 SECRET_KEY = os.environ.get("SECRET_KEY", "ci-secret-key-for-testing-only")
 SQLALCHEMY_DATABASE_URI = os.environ.get("SQLALCHEMY_DATABASE_URI", "sqlite:///:memory:")
 FOOTBALL_DATA_API_KEY = os.environ.get("FOOTBALL_DATA_API_KEY", "")
+# Football-Data.org free tier allows 10 requests per minute
+FOOTBALL_DATA_REQUESTS_PER_MINUTE = int(os.environ.get("FOOTBALL_DATA_REQUESTS_PER_MINUTE", "10"))
+# Shared HTTP client for Football-Data.org (timeouts in seconds)
+FOOTBALL_DATA_CONNECT_TIMEOUT = float(os.environ.get("FOOTBALL_DATA_CONNECT_TIMEOUT", "3.05"))
+FOOTBALL_DATA_READ_TIMEOUT = float(os.environ.get("FOOTBALL_DATA_READ_TIMEOUT", "10"))
+FOOTBALL_DATA_MAX_RETRIES = int(os.environ.get("FOOTBALL_DATA_MAX_RETRIES", "3"))
+FOOTBALL_DATA_POOL_SIZE = int(os.environ.get("FOOTBALL_DATA_POOL_SIZE", "10"))
+# On-disk cache of Football-Data.org responses, shared by every process on the box
+FOOTBALL_DATA_CACHE_ENABLED = os.environ.get("FOOTBALL_DATA_CACHE_ENABLED", "1") == "1"
+FOOTBALL_DATA_CACHE_PATH = os.environ.get(
+    "FOOTBALL_DATA_CACHE_PATH", os.path.join(tempfile.gettempdir(), "futbolista", "football-data-cache.sqlite3")
+)
+FOOTBALL_DATA_CACHE_MAX_BYTES = int(os.environ.get("FOOTBALL_DATA_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# Circuit breaker around Football-Data.org: consecutive failures to open, seconds before probing again
+FOOTBALL_DATA_BREAKER_FAILURES = int(os.environ.get("FOOTBALL_DATA_BREAKER_FAILURES", "5"))
+FOOTBALL_DATA_BREAKER_RESET = float(os.environ.get("FOOTBALL_DATA_BREAKER_RESET", "30"))
+# Cross-process outbound quota: bucket file shared by every worker, burst size and longest blocking wait in seconds
+FOOTBALL_DATA_QUOTA_ENABLED = os.environ.get("FOOTBALL_DATA_QUOTA_ENABLED", "1") == "1"
+FOOTBALL_DATA_QUOTA_PATH = os.environ.get(
+    "FOOTBALL_DATA_QUOTA_PATH", os.path.join(tempfile.gettempdir(), "futbolista", "football-data-quota.sqlite3")
+)
+FOOTBALL_DATA_QUOTA_BURST = int(os.environ.get("FOOTBALL_DATA_QUOTA_BURST", "1"))
+FOOTBALL_DATA_QUOTA_MAX_WAIT = float(os.environ.get("FOOTBALL_DATA_QUOTA_MAX_WAIT", "60"))
+# Background scrape jobs: worker threads per process, jobs allowed to wait for a worker, seconds before an in-flight job counts as abandoned
+SCRAPE_JOB_WORKERS = int(os.environ.get("SCRAPE_JOB_WORKERS", "2"))
+SCRAPE_JOB_QUEUE_SIZE = int(os.environ.get("SCRAPE_JOB_QUEUE_SIZE", "20"))
+SCRAPE_JOB_TIMEOUT = int(os.environ.get("SCRAPE_JOB_TIMEOUT", "600"))
+
+# Prediction scoring tiers as name=points, first match wins (exact, goal_difference, outcome); rescore_predictions.py after changing them
+SCORING_RULES = os.environ.get("SCORING_RULES", "exact=3,outcome=1")
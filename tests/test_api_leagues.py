@@ -87,4 +87,30 @@ class LeaguesAPITestCase(unittest.TestCase):
     def test_get_leagues_success(self):
         print("Running test_get_leagues_success...")
 
-        print("test_get_leagues_success passed.")
\ No newline at end of file
+        print("test_get_leagues_success passed.")
+
+    def test_league_standings(self):
+        print("Running test_league_standings...")
+        with self.app.app_context():
+            db.session.add_all([
+                Team(id=5, name='Liverpool', league_id=1),
+                Match(id=3, home_team_id=5, away_team_id=2, date='2025-01-08', result='1-1'),
+                Match(id=4, home_team_id=5, away_team_id=1, date='2025-01-15', result='3-0'),
+                Match(id=5, home_team_id=1, away_team_id=5, date='2025-02-01', result=None),
+                # Against a team from another league: not part of the table
+                Match(id=6, home_team_id=1, away_team_id=3, date='2025-02-08', result='5-0'),
+            ])
+            db.session.commit()
+        headers = {'Authorization': f'Bearer {self.get_auth_token()}'}
+        response = self.client.get('/api/v1/leagues/1/standings', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        table = json.loads(response.data)
+        self.assertEqual([(t['team_name'], t['played'], t['points'], t['goal_difference']) for t in table], [
+            ('Liverpool', 2, 4, 3), ('Chelsea', 2, 3, -2), ('Arsenal', 2, 1, -1),
+        ])
+        self.assertEqual(table[0], {
+            'position': 1, 'team_id': 5, 'team_name': 'Liverpool', 'played': 2, 'won': 1, 'drawn': 1,
+            'lost': 0, 'goals_for': 4, 'goals_against': 1, 'goal_difference': 3, 'points': 4,
+        })
+        self.assertEqual(self.client.get('/api/v1/leagues/9/standings', headers=headers).status_code, 404)
+        print("test_league_standings passed.")
\ No newline at end of file
@@ -2,17 +2,44 @@ import unittest
 import sys
 import os
 import json
+import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
-from app.models import User, Team, Match, League
+from app.jobs import ScrapeJobRunner
+from app.models import User, Team, Match, League, ScrapeJob
 from werkzeug.security import generate_password_hash
 
+class FakeScraper:
+    """Stands in for FootballDataOrgScraper, so scrape jobs never call the real API"""
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.teams = []
+        self.stale = False
+        self.upstream_available = True
+
+    def fetch_matches_for_team(self, team_name):
+        self.teams.append(team_name)
+        return self.matches
+
+
 class MatchesAPITestCase(unittest.TestCase):
+    # One fixture the scraper finds for the first time, one whose result came in
+    SCRAPED = [
+        {'id': 100, 'home_team': 'Chelsea FC', 'home_team_id': 1, 'away_team': 'Liverpool FC', 'away_team_id': 4,
+         'date': '2025-02-01', 'result': None},
+        {'id': 3, 'home_team': 'Chelsea FC', 'home_team_id': 1, 'away_team': 'Manchester United FC',
+         'away_team_id': 3, 'date': '2025-01-03', 'result': '1-0'},
+    ]
+
     def setUp(self):
         self.app = create_app(testing=True)
         self.app.config['WTF_CSRF_ENABLED'] = False
         self.client = self.app.test_client()
+        # Jobs run inline under testing; hand them canned fixtures instead of Football-Data.org
+        self.scraper = FakeScraper(self.SCRAPED)
+        self.app.extensions['scrape_jobs'] = ScrapeJobRunner(self.app, inline=True, scraper_factory=lambda: self.scraper)
         
         with self.app.app_context():
             db.create_all()
@@ -125,6 +152,31 @@ class MatchesAPITestCase(unittest.TestCase):
         self.assertEqual(data['per_page'], 2)
         print("test_get_matches_pagination passed.")
 
+    def test_get_matches_cursor_pagination(self):
+        """Test walking the matches by next_cursor and back by prev_cursor"""
+        print("Running test_get_matches_cursor_pagination...")
+        token = self.get_auth_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        data = json.loads(self.client.get('/api/v1/matches?per_page=3', headers=headers).data)
+        self.assertEqual([m['id'] for m in data['matches']], [1, 2, 3])
+        self.assertEqual((data['total'], data['pages'], data['prev_cursor']), (4, 2, None))
+
+        response = self.client.get(f"/api/v1/matches?per_page=3&cursor={data['next_cursor']}", headers=headers)
+        data = json.loads(response.data)
+        self.assertEqual([m['id'] for m in data['matches']], [4])
+        self.assertEqual((data['page'], data['next_cursor']), (2, None))
+        self.assertNotIn('total', data)
+
+        response = self.client.get(f"/api/v1/matches?per_page=3&cursor={data['prev_cursor']}", headers=headers)
+        data = json.loads(response.data)
+        self.assertEqual([m['id'] for m in data['matches']], [1, 2, 3])
+        self.assertEqual(data['page'], 1)
+        self.assertIsNone(data['prev_cursor'])
+
+        response = self.client.get('/api/v1/matches?cursor=garbage', headers=headers)
+        self.assertEqual(response.status_code, 400)
+        print("test_get_matches_cursor_pagination passed.")
+
     def test_get_matches_data_structure(self):
         """Test that matches have correct data structure"""
         print("Running test_get_matches_data_structure...")
@@ -143,30 +195,42 @@ class MatchesAPITestCase(unittest.TestCase):
         self.assertIn('result', match)
         print("test_get_matches_data_structure passed.")
 
+    def add_upcoming_matches(self):
+        """Three fixtures in the coming days, ids 5-7; the setUp matches are all in the past"""
+        today = datetime.date.today()
+        with self.app.app_context():
+            db.session.add_all([
+                Match(id=4 + days, home_team_id=days, away_team_id=days + 1,
+                      date=(today + datetime.timedelta(days=days)).isoformat())
+                for days in (1, 2, 3)
+            ])
+            db.session.commit()
+
     def test_get_relevant_matches_success(self):
-        """Test successful relevant matches retrieval"""
+        """Test relevant matches are the upcoming ones, soonest first"""
         print("Running test_get_relevant_matches_success...")
         token = self.get_auth_token()
+        self.add_upcoming_matches()
         response = self.client.get('/api/v1/matches/relevant',
             headers={'Authorization': f'Bearer {token}'})
         
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
-        self.assertIsInstance(data, list)
-        # Should return matches with no predictions yet
-        self.assertEqual(len(data), 4)
+        self.assertEqual([m['id'] for m in data['matches']], [5, 6, 7])
+        self.assertEqual(data['total'], 3)
         print("test_get_relevant_matches_success passed.")
 
     def test_get_relevant_matches_with_predictions(self):
-        """Test relevant matches when some matches have predictions"""
+        """Test relevant matches leave out only this user's predictions"""
         print("Running test_get_relevant_matches_with_predictions...")
         token = self.get_auth_token()
-        
-        # Add a prediction for match 1
+        self.add_upcoming_matches()
         from app.models import Prediction
         with self.app.app_context():
-            prediction = Prediction(user_id=self.user_id, match_id=1, predicted_result='2-1')
-            db.session.add(prediction)
+            me = User.query.filter_by(username='testuser_api_matches').one()
+            db.session.add(Prediction(user_id=me.id, match_id=5, predicted_result='2-1'))
+            # Someone else's prediction doesn't hide the match
+            db.session.add(Prediction(user_id=self.user_id, match_id=6, predicted_result='0-0'))
             db.session.commit()
         
         response = self.client.get('/api/v1/matches/relevant',
@@ -174,26 +238,42 @@ class MatchesAPITestCase(unittest.TestCase):
         
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
-        # Should return matches without predictions
-        self.assertEqual(len(data), 3)
+        self.assertEqual([m['id'] for m in data['matches']], [6, 7])
         print("test_get_relevant_matches_with_predictions passed.")
 
+    def test_get_relevant_matches_pagination(self):
+        """Test relevant matches page by cursor"""
+        print("Running test_get_relevant_matches_pagination...")
+        token = self.get_auth_token()
+        self.add_upcoming_matches()
+        headers = {'Authorization': f'Bearer {token}'}
+        data = json.loads(self.client.get('/api/v1/matches/relevant?per_page=2', headers=headers).data)
+        self.assertEqual([m['id'] for m in data['matches']], [5, 6])
+        response = self.client.get(f"/api/v1/matches/relevant?per_page=2&cursor={data['next_cursor']}", headers=headers)
+        data = json.loads(response.data)
+        self.assertEqual([m['id'] for m in data['matches']], [7])
+        self.assertIsNone(data['next_cursor'])
+        print("test_get_relevant_matches_pagination passed.")
+
     def test_get_relevant_matches_data_structure(self):
         """Test that relevant matches have correct data structure"""
         print("Running test_get_relevant_matches_data_structure...")
         token = self.get_auth_token()
+        self.add_upcoming_matches()
         response = self.client.get('/api/v1/matches/relevant',
             headers={'Authorization': f'Bearer {token}'})
         
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
-        if data:
-            match = data[0]
-            self.assertIn('id', match)
-            self.assertIn('home_team', match)
-            self.assertIn('away_team', match)
-            self.assertIn('date', match)
-            self.assertIn('result', match)
+        for key in ('page', 'per_page', 'next_cursor', 'prev_cursor'):
+            self.assertIn(key, data)
+        match = data['matches'][0]
+        self.assertIn('id', match)
+        self.assertIn('home_team', match)
+        self.assertIn('away_team', match)
+        self.assertIn('date', match)
+        self.assertIn('kickoff', match)
+        self.assertIn('result', match)
         print("test_get_relevant_matches_data_structure passed.")
 
     def test_scrape_matches_success(self):
@@ -204,10 +284,22 @@ class MatchesAPITestCase(unittest.TestCase):
             json={'team_name': 'Chelsea'},
             headers={'Authorization': f'Bearer {token}'})
         
-        # Should return 200 even if no matches found
-        self.assertIn(response.status_code, [200, 400, 404])
+        # Scraping runs as a background job: the POST only hands back its id
+        self.assertEqual(response.status_code, 202)
         data = json.loads(response.data)
         self.assertIsInstance(data, dict)
+        self.assertEqual(data['team_id'], 1)
+        job = self.client.get(response.headers['Location'], headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(job.status_code, 200)
+        job = json.loads(job.data)
+        self.assertEqual(self.scraper.teams, ['Chelsea'])
+        self.assertEqual((job['status'], job['error']), ('done', None))
+        self.assertEqual((job['found'], job['inserted'], job['updated'], job['unchanged']), (2, 1, 1, 0))
+        with self.app.app_context():
+            self.assertEqual(db.session.get(ScrapeJob, data['id']).status, 'done')
+            new = db.session.get(Match, 100)
+            self.assertEqual((new.home_team_id, new.away_team_id, new.date, new.result), (1, 4, '2025-02-01', None))
+            self.assertEqual(db.session.get(Match, 3).result, '1-0')
         print("test_scrape_matches_success passed.")
 
     def test_scrape_matches_invalid_team(self):
@@ -235,6 +327,21 @@ class MatchesAPITestCase(unittest.TestCase):
         self.assertIn('error', data)
         print("test_scrape_matches_missing_team_name passed.")
 
+    def test_team_stats_with_and_without_coalescing(self):
+        """Team stats are the same whether or not the request opts out of coalescing"""
+        print("Running test_team_stats_with_and_without_coalescing...")
+        token = self.get_auth_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        shared = json.loads(self.client.get('/api/v1/team/1/stats', headers=headers).data)
+        own = json.loads(self.client.get('/api/v1/team/1/stats?coalesce=0', headers=headers).data)
+        no_cache = json.loads(self.client.get('/api/v1/team/1/stats',
+            headers={**headers, 'Cache-Control': 'no-cache'}).data)
+        self.assertEqual(shared, {'team_id': 1, 'played': 2, 'wins': 1, 'losses': 0, 'draws': 0,
+                                  'goals_for': 2, 'goals_against': 1})
+        self.assertEqual(own, shared)
+        self.assertEqual(no_cache, shared)
+        print("test_team_stats_with_and_without_coalescing passed.")
+
     def test_matches_ordered_by_date(self):
         """Test that matches are ordered by date"""
         print("Running test_matches_ordered_by_date...")
@@ -270,5 +377,41 @@ class MatchesAPITestCase(unittest.TestCase):
         self.assertGreater(len(matches_without_results), 0)
         print("test_matches_with_results passed.")
 
+    def test_kickoff_range_filters(self):
+        """from/to select on kickoff; a bare `to` date covers the whole day"""
+        print("Running test_kickoff_range_filters...")
+        headers = {'Authorization': f'Bearer {self.get_auth_token()}'}
+        with self.app.app_context():
+            db.session.get(Match, 3).kickoff = datetime.datetime(2025, 1, 3, 20, 0, tzinfo=datetime.timezone.utc)
+            db.session.commit()
+        data = json.loads(self.client.get('/api/v1/matches?from=2025-01-02&to=2025-01-03', headers=headers).data)
+        self.assertEqual([m['id'] for m in data['matches']], [2, 3])
+        self.assertEqual(data['matches'][1]['kickoff'], '2025-01-03T20:00:00Z')
+        data = json.loads(self.client.get('/api/v1/matches?to=2025-01-03T19:00:00Z', headers=headers).data)
+        self.assertEqual([m['id'] for m in data['matches']], [1, 2])
+        team = json.loads(self.client.get('/api/v1/teams/1/matches?from=2025-01-02T00:00:00Z', headers=headers).data)
+        self.assertEqual([m['id'] for m in team], [3])
+        response = self.client.get('/api/v1/matches?from=next+week', headers=headers)
+        self.assertEqual(response.status_code, 400)
+        print("test_kickoff_range_filters passed.")
+
+    def test_upcoming_and_finished_filters(self):
+        """upcoming lists unplayed future matches soonest first, finished lists results newest first"""
+        print("Running test_upcoming_and_finished_filters...")
+        headers = {'Authorization': f'Bearer {self.get_auth_token()}'}
+        with self.app.app_context():
+            db.session.add_all([
+                Match(id=5, home_team_id=4, away_team_id=1, date='2099-05-02'),
+                Match(id=6, home_team_id=3, away_team_id=2, date='2099-05-01'),
+            ])
+            db.session.commit()
+        upcoming = json.loads(self.client.get('/api/v1/matches?upcoming=1', headers=headers).data)
+        self.assertEqual([m['id'] for m in upcoming['matches']], [6, 5])
+        finished = json.loads(self.client.get('/api/v1/matches?finished=true', headers=headers).data)
+        self.assertEqual([m['id'] for m in finished['matches']], [2, 1])
+        team = json.loads(self.client.get('/api/v1/teams/1/matches?upcoming=1', headers=headers).data)
+        self.assertEqual([m['id'] for m in team], [5])
+        print("test_upcoming_and_finished_filters passed.")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -4,8 +4,11 @@ import os
 import json
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sqlalchemy import event
+
 from app import create_app, db
 from app.models import User, Team, Match, Prediction, League
+from app.scoring import score_matches
 from werkzeug.security import generate_password_hash
 
 class PredictionsAPITestCase(unittest.TestCase):
@@ -50,8 +53,8 @@ class PredictionsAPITestCase(unittest.TestCase):
         matches = [
             Match(id=2001, home_team_id=2001, away_team_id=2002, date='2025-01-01', result='2-1'),
             Match(id=2002, home_team_id=2003, away_team_id=2004, date='2025-01-02', result='1-1'),
-            Match(id=2003, home_team_id=2001, away_team_id=2003, date='2025-01-03', result=None),
-            Match(id=2004, home_team_id=2002, away_team_id=2004, date='2025-01-04', result=None)
+            Match(id=2003, home_team_id=2001, away_team_id=2003, date='2099-01-03', result=None),
+            Match(id=2004, home_team_id=2002, away_team_id=2004, date='2099-01-04', result=None)
         ]
         db.session.add_all(matches)
         db.session.commit()
@@ -69,6 +72,13 @@ class PredictionsAPITestCase(unittest.TestCase):
             return json.loads(response.data)['token']
         return None
 
+    def finish_match(self, match_id, result):
+        """Record a result and score it, as a sync does"""
+        with self.app.app_context():
+            db.session.get(Match, match_id).result = result
+            score_matches([match_id])
+            db.session.commit()
+
     def test_add_prediction_success(self):
         """Test successful prediction addition"""
         print("Running test_add_prediction_success...")
@@ -129,6 +139,24 @@ class PredictionsAPITestCase(unittest.TestCase):
         self.assertIn('error', data)
         print("test_add_duplicate_prediction passed.")
 
+    def test_add_prediction_after_kickoff(self):
+        """Test that predictions close once a match kicks off or has a result"""
+        print("Running test_add_prediction_after_kickoff...")
+        token = self.get_auth_token()
+        with self.app.app_context():
+            # Kicked off in the past, no result yet
+            db.session.add(Match(id=2005, home_team_id=2003, away_team_id=2004, date='2025-01-05', result=None))
+            db.session.commit()
+        for match_id in (2001, 2005):
+            response = self.client.post('/api/v1/predictions',
+                json={'match_id': match_id, 'home_score': 2, 'away_score': 1},
+                headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(json.loads(response.data)['error'], 'Predictions close at kickoff')
+        with self.app.app_context():
+            self.assertEqual(Prediction.query.count(), 0)
+        print("test_add_prediction_after_kickoff passed.")
+
     def test_get_predictions_success(self):
         """Test successful predictions retrieval"""
         print("Running test_get_predictions_success...")
@@ -193,10 +221,11 @@ class PredictionsAPITestCase(unittest.TestCase):
         print("Running test_prediction_correct_calculation...")
         token = self.get_auth_token()
         
-        # Add prediction for match with known result (2-1)
+        # Predict before kickoff, then the match ends 2-1
         self.client.post('/api/v1/predictions',
-            json={'match_id': 2001, 'home_score': 2, 'away_score': 1},
+            json={'match_id': 2003, 'home_score': 2, 'away_score': 1},
             headers={'Authorization': f'Bearer {token}'})
+        self.finish_match(2003, '2-1')
         
         response = self.client.get('/api/v1/predictions',
             headers={'Authorization': f'Bearer {token}'})
@@ -211,15 +240,32 @@ class PredictionsAPITestCase(unittest.TestCase):
         self.assertTrue(prediction['correct'])
         print("test_prediction_correct_calculation passed.")
 
+    def test_leaderboard_orders_by_awarded_points(self):
+        """Points awarded on a finished match show up in the paged leaderboard"""
+        print("Running test_leaderboard_orders_by_awarded_points...")
+        token = self.get_auth_token()
+        headers = {'Authorization': f'Bearer {token}'}
+        self.client.post('/api/v1/predictions',
+            json={'match_id': 2003, 'home_score': 3, 'away_score': 0}, headers=headers)
+        self.finish_match(2003, '2-1')
+        data = json.loads(self.client.get('/api/v1/leaderboard', headers=headers).data)
+        self.assertEqual([(u['username'], u['score'], u['rank']) for u in data['users']],
+                         [('testuser_api_predictions', 1, 1), ('testuser', 0, 2)])
+        page = json.loads(self.client.get('/api/v1/leaderboard?page=2&per_page=1', headers=headers).data)
+        self.assertEqual([u['username'] for u in page['users']], ['testuser'])
+        self.assertEqual((page['total'], page['pages']), (2, 2))
+        print("test_leaderboard_orders_by_awarded_points passed.")
+
     def test_prediction_incorrect_calculation(self):
         """Test that incorrect predictions are marked as incorrect"""
         print("Running test_prediction_incorrect_calculation...")
         token = self.get_auth_token()
         
-        # Add prediction for match with known result (2-1) but predict different (1-1)
+        # Predict 1-1 before kickoff, then the match ends 2-1
         self.client.post('/api/v1/predictions',
-            json={'match_id': 2001, 'home_score': 1, 'away_score': 1},
+            json={'match_id': 2003, 'home_score': 1, 'away_score': 1},
             headers={'Authorization': f'Bearer {token}'})
+        self.finish_match(2003, '2-1')
         
         response = self.client.get('/api/v1/predictions',
             headers={'Authorization': f'Bearer {token}'})
@@ -294,7 +340,7 @@ class PredictionsAPITestCase(unittest.TestCase):
         data = json.loads(response.data)
         prediction = data[0]
         
-        self.assertEqual(prediction['date'], '2025-01-03')
+        self.assertEqual(prediction['date'], '2099-01-03')
         print("test_prediction_date_format passed.")
 
     def test_multiple_predictions_same_user(self):
@@ -304,12 +350,12 @@ class PredictionsAPITestCase(unittest.TestCase):
         
         # Add first prediction
         self.client.post('/api/v1/predictions',
-            json={'match_id': 2001, 'home_score': 2, 'away_score': 1},
+            json={'match_id': 2003, 'home_score': 2, 'away_score': 1},
             headers={'Authorization': f'Bearer {token}'})
         
         # Add second prediction for different match
         self.client.post('/api/v1/predictions',
-            json={'match_id': 2002, 'home_score': 1, 'away_score': 1},
+            json={'match_id': 2004, 'home_score': 1, 'away_score': 1},
             headers={'Authorization': f'Bearer {token}'})
         
         response = self.client.get('/api/v1/predictions',
@@ -320,5 +366,131 @@ class PredictionsAPITestCase(unittest.TestCase):
         self.assertEqual(len(data), 2, f"Expected 2 predictions, got {len(data)}")
         print("test_multiple_predictions_same_user passed.")
 
+    def post_batch(self, token, predictions):
+        return self.client.post('/api/v1/predictions/batch',
+            json={'predictions': predictions},
+            headers={'Authorization': f'Bearer {token}'})
+
+    def test_batch_predictions_success(self):
+        """Test several predictions saved in one request"""
+        print("Running test_batch_predictions_success...")
+        token = self.get_auth_token()
+        response = self.post_batch(token, [
+            {'match_id': 2003, 'home_score': 2, 'away_score': 1},
+            {'match_id': 2004, 'home_score': 0, 'away_score': 0},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['created'], 2)
+        self.assertEqual([r['match_id'] for r in data['results']], [2003, 2004])
+        self.assertTrue(all(r['success'] and r['prediction_id'] for r in data['results']))
+        response = self.client.get('/api/v1/predictions',
+            headers={'Authorization': f'Bearer {token}'})
+        saved = {p['match_id']: p['predicted_result'] for p in json.loads(response.data)}
+        self.assertEqual(saved, {2003: '2-1', 2004: '0-0'})
+        print("test_batch_predictions_success passed.")
+
+    def test_batch_predictions_item_errors(self):
+        """Test that invalid items are reported without stopping the valid ones"""
+        print("Running test_batch_predictions_item_errors...")
+        token = self.get_auth_token()
+        self.client.post('/api/v1/predictions',
+            json={'match_id': 2004, 'home_score': 1, 'away_score': 1},
+            headers={'Authorization': f'Bearer {token}'})
+        response = self.post_batch(token, [
+            {'match_id': 2003, 'home_score': 2, 'away_score': 1},
+            {'match_id': 999, 'home_score': 2, 'away_score': 1},
+            {'match_id': 2004, 'home_score': 3, 'away_score': 0},
+            {'match_id': 2003, 'home_score': 0, 'away_score': 0},
+            {'match_id': 2002, 'home_score': 2},
+            {'match_id': 2002, 'home_score': 'two', 'away_score': 1},
+            {'match_id': 2002, 'home_score': -1, 'away_score': 1},
+            'nonsense',
+            {'match_id': 2002, 'home_score': 1.7, 'away_score': 1},
+            {'match_id': 2002, 'home_score': True, 'away_score': 0},
+            {'match_id': '2002', 'home_score': 1, 'away_score': 0},
+        ])
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['created'], 1)
+        results = data['results']
+        self.assertEqual([r['index'] for r in results], list(range(11)))
+        self.assertTrue(results[0]['success'])
+        self.assertEqual(results[1]['error'], 'Invalid match_id')
+        self.assertEqual(results[2]['error'], 'Prediction already exists for this match')
+        self.assertEqual(results[3]['error'], 'Duplicate match_id in batch')
+        for result in results[5:6] + results[8:]:
+            self.assertEqual(result['error'], 'match_id, home_score, and away_score must be integers')
+        for result in results[1:]:
+            self.assertFalse(result['success'])
+            self.assertTrue(result['error'])
+        print("test_batch_predictions_item_errors passed.")
+
+    def test_batch_predictions_bad_request(self):
+        """Test rejection of an empty, malformed or oversized batch"""
+        print("Running test_batch_predictions_bad_request...")
+        token = self.get_auth_token()
+        self.assertEqual(self.post_batch(token, []).status_code, 400)
+        self.assertEqual(self.post_batch(token, {'match_id': 2003}).status_code, 400)
+        response = self.client.post('/api/v1/predictions/batch',
+            json=[{'match_id': 2003, 'home_score': 1, 'away_score': 0}],
+            headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 400)
+        item = {'match_id': 2003, 'home_score': 1, 'away_score': 0}
+        self.assertEqual(self.post_batch(token, [item] * 101).status_code, 400)
+        with self.app.app_context():
+            self.assertEqual(Prediction.query.count(), 0)
+        print("test_batch_predictions_bad_request passed.")
+
+    def test_batch_predictions_close_at_kickoff(self):
+        """Test that batch items for started or finished matches are refused"""
+        print("Running test_batch_predictions_close_at_kickoff...")
+        token = self.get_auth_token()
+        with self.app.app_context():
+            db.session.add(Match(id=2005, home_team_id=2003, away_team_id=2004, date='2025-01-05', result=None))
+            db.session.commit()
+        response = self.post_batch(token, [
+            {'match_id': 2001, 'home_score': 2, 'away_score': 1},
+            {'match_id': 2005, 'home_score': 0, 'away_score': 2},
+            {'match_id': 2003, 'home_score': 1, 'away_score': 1},
+        ])
+        data = json.loads(response.data)
+        self.assertEqual(data['created'], 1)
+        self.assertEqual([r['error'] for r in data['results']],
+                         ['Predictions close at kickoff', 'Predictions close at kickoff', None])
+        with self.app.app_context():
+            self.assertEqual([p.match_id for p in Prediction.query], [2003])
+            self.assertIsNotNone(Prediction.query.one().created_at)
+        print("test_batch_predictions_close_at_kickoff passed.")
+
+    def test_batch_predictions_query_count(self):
+        """Test that a batch costs the same statements whatever its size"""
+        print("Running test_batch_predictions_query_count...")
+        token = self.get_auth_token()
+        with self.app.app_context():
+            db.session.add_all([
+                Match(id=3000 + i, home_team_id=2001, away_team_id=2002, date='2099-02-01')
+                for i in range(20)
+            ])
+            db.session.commit()
+            engine = db.engine
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            sizes = []
+            for ids in (range(3000, 3002), range(3002, 3020)):
+                del statements[:]
+                response = self.post_batch(token, [
+                    {'match_id': i, 'home_score': 1, 'away_score': 0} for i in ids
+                ])
+                self.assertEqual(json.loads(response.data)['created'], len(ids))
+                sizes.append(len(statements))
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.assertEqual(sizes[0], sizes[1])
+        print("test_batch_predictions_query_count passed.")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -238,5 +238,49 @@ class TeamsAPITestCase(unittest.TestCase):
         self.assertIsInstance(data, list)
         print("test_team_matches_endpoint passed.")
 
+    def test_get_teams_search_ranked(self):
+        """Test search results come closest match first"""
+        print("Running test_get_teams_search_ranked...")
+        token = self.get_auth_token()
+        response = self.client.get('/api/v1/teams?search=manchester',
+            headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual([t['name'] for t in data['teams']], ['Test Manchester City', 'Test Manchester United'])
+        self.assertEqual(data['total'], 2)
+        print("test_get_teams_search_ranked passed.")
+
+    def test_teams_autocomplete(self):
+        """Test autocomplete suggestions, typos included"""
+        print("Running test_teams_autocomplete...")
+        token = self.get_auth_token()
+        response = self.client.get('/api/v1/teams/autocomplete?q=liverpol',
+            headers={'Authorization': f'Bearer {token}'})
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['teams'][0]['name'], 'Test Liverpool')
+        self.assertEqual(set(data['teams'][0]), {'id', 'name', 'logo_url', 'league_id', 'score'})
+
+        response = self.client.get('/api/v1/teams/autocomplete?q=test&limit=2',
+            headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(len(json.loads(response.data)['teams']), 2)
+
+        response = self.client.get('/api/v1/teams/autocomplete?q=',
+            headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(json.loads(response.data)['teams'], [])
+        print("test_teams_autocomplete passed.")
+
+    def test_teams_autocomplete_bad_limit(self):
+        """Test autocomplete rejects a bad limit"""
+        print("Running test_teams_autocomplete_bad_limit...")
+        token = self.get_auth_token()
+        for limit in ('ten', '0'):
+            response = self.client.get(f'/api/v1/teams/autocomplete?q=test&limit={limit}',
+                headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 400)
+        print("test_teams_autocomplete_bad_limit passed.")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,369 @@
+import json
+import tempfile
+import threading
+import time
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+from utils.thirdparty.FootballData import cache_ttl, FINISHED_MATCHES_TTL
+from utils.thirdparty.CircuitBreaker import CircuitBreaker
+from utils.thirdparty.HttpClient import HttpClient, UpstreamError, CircuitOpenError
+from utils.thirdparty.QuotaGovernor import QuotaGovernor, QuotaExceededError
+from utils.thirdparty.ResponseCache import ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None, headers=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        if isinstance(self._body, str):
+            return self._body
+        return json.dumps(self._body)
+
+    def json(self):
+        if isinstance(self._body, str):
+            return json.loads(self._body)
+        return self._body
+
+
+class FakeSession:
+    """Replays a scripted list of responses (or exceptions to raise)"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.requests.append({'url': url, 'params': params, 'headers': headers, 'timeout': timeout})
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class HttpClientTestCase(unittest.TestCase):
+    def make_client(self, responses, **kwargs):
+        self.slept = []
+        self.session = FakeSession(responses)
+        return HttpClient(session=self.session, sleep=self.slept.append, **kwargs)
+
+    def test_returns_json_and_uses_timeouts(self):
+        print("Running test_returns_json_and_uses_timeouts...")
+        client = self.make_client([FakeResponse(200, {'teams': []})], connect_timeout=2, read_timeout=5)
+        self.assertEqual(client.get_json('https://example.test/teams'), {'teams': []})
+        self.assertEqual(self.session.requests[0]['timeout'], (2, 5))
+        self.assertEqual(client.stats()['calls'], 1)
+        print("test_returns_json_and_uses_timeouts passed.")
+
+    def test_retries_429_honouring_retry_after(self):
+        print("Running test_retries_429_honouring_retry_after...")
+        client = self.make_client([
+            FakeResponse(429, headers={'Retry-After': '7'}),
+            FakeResponse(200, {'ok': True}),
+        ])
+        self.assertEqual(client.get_json('https://example.test/x'), {'ok': True})
+        self.assertEqual(self.slept, [7.0])
+        stats = client.stats()
+        self.assertEqual((stats['calls'], stats['retries'], stats['failures']), (2, 1, 0))
+        print("test_retries_429_honouring_retry_after passed.")
+
+    def test_waits_for_request_counter_reset(self):
+        print("Running test_waits_for_request_counter_reset...")
+        client = self.make_client([
+            FakeResponse(429, headers={'X-Requests-Available-Minute': '0', 'X-RequestCounter-Reset': '20'}),
+            FakeResponse(200, {'ok': True}, headers={'X-Requests-Available-Minute': '9'}),
+        ])
+        client.get_json('https://example.test/x')
+        self.assertGreaterEqual(self.slept[0], 20)
+        self.assertEqual(client.stats()['requests_available'], 9)
+        print("test_waits_for_request_counter_reset passed.")
+
+    def test_backoff_grows_exponentially_then_gives_up(self):
+        print("Running test_backoff_grows_exponentially_then_gives_up...")
+        client = self.make_client([requests.ConnectionError('down')] * 4, max_retries=3, backoff_base=1)
+        with self.assertRaises(UpstreamError):
+            client.get_json('https://example.test/x')
+        self.assertEqual(len(self.slept), 3)
+        for attempt, delay in enumerate(self.slept):
+            self.assertGreaterEqual(delay, 2 ** attempt / 2)
+            self.assertLessEqual(delay, 2 ** attempt)
+        self.assertEqual(client.stats()['failures'], 1)
+        print("test_backoff_grows_exponentially_then_gives_up passed.")
+
+    def test_identical_concurrent_requests_are_coalesced(self):
+        print("Running test_identical_concurrent_requests_are_coalesced...")
+        release = threading.Event()
+
+        class SlowSession(FakeSession):
+            def get(self, *args, **kwargs):
+                release.wait(5)
+                return super().get(*args, **kwargs)
+
+        session = SlowSession([FakeResponse(200, {'matches': [1, 2]}), FakeResponse(200, {'matches': []})])
+        client = HttpClient(session=session, sleep=lambda s: None)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.get_json('https://example.test/m')))
+                   for _ in range(3)]
+        for t in threads:
+            t.start()
+        while client._flights.in_flight() < 1:
+            time.sleep(0.01)
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [{'matches': [1, 2]}] * 3)
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(client.stats()['coalesced'], 2)
+        # Opting out always makes a request of its own
+        self.assertEqual(client.fetch('https://example.test/m', coalesce=False).data, {'matches': []})
+        print("test_identical_concurrent_requests_are_coalesced passed.")
+
+    def test_invalid_json_is_an_upstream_error(self):
+        print("Running test_invalid_json_is_an_upstream_error...")
+        client = self.make_client([FakeResponse(200, '<html>Bad gateway</html>')])
+        with self.assertRaises(UpstreamError) as ctx:
+            client.get_json('https://example.test/x')
+        self.assertEqual(ctx.exception.status_code, 200)
+        self.assertEqual(client.stats()['failures'], 1)
+        print("test_invalid_json_is_an_upstream_error passed.")
+
+    def test_client_errors_are_not_retried(self):
+        print("Running test_client_errors_are_not_retried...")
+        client = self.make_client([FakeResponse(404)])
+        with self.assertRaises(UpstreamError) as ctx:
+            client.get_json('https://example.test/missing')
+        self.assertEqual(ctx.exception.status_code, 404)
+        self.assertEqual(self.slept, [])
+        print("test_client_errors_are_not_retried passed.")
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    def test_opens_after_threshold_and_probes_once(self):
+        print("Running test_opens_after_threshold_and_probes_once...")
+        now = [0.0]
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0])
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+        now[0] = 31
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        now[0] = 62
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        print("test_opens_after_threshold_and_probes_once passed.")
+
+    def test_open_circuit_fails_fast_without_calling_upstream(self):
+        print("Running test_open_circuit_fails_fast_without_calling_upstream...")
+        session = FakeSession([requests.ConnectionError('down')])
+        client = HttpClient(session=session, sleep=lambda s: None, max_retries=0,
+                            breaker=CircuitBreaker(failure_threshold=1))
+        with self.assertRaises(UpstreamError):
+            client.get_json('https://example.test/x')
+        with self.assertRaises(CircuitOpenError):
+            client.get_json('https://example.test/x')
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(client.stats()['breaker_state'], CircuitBreaker.OPEN)
+        print("test_open_circuit_fails_fast_without_calling_upstream passed.")
+
+    def test_quota_refusing_the_probe_reopens_the_circuit(self):
+        print("Running test_quota_refusing_the_probe_reopens_the_circuit...")
+        now = [0.0]
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        governor = QuotaGovernor(path=os.path.join(tmp.name, 'quota.sqlite3'), calls_per_minute=10,
+                                 clock=lambda: now[0], sleep=lambda s: None)
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=lambda: now[0])
+        session = FakeSession([requests.ConnectionError('down'), FakeResponse(200, {'ok': True})])
+        client = HttpClient(session=session, sleep=lambda s: None, max_retries=0, breaker=breaker, quota=governor)
+        with self.assertRaises(UpstreamError):
+            client.get_json('https://example.test/x')
+        now[0] = 31
+        # Other callers have booked every slot: the half-open probe is refused before going upstream
+        for _ in range(10):
+            governor.acquire()
+        with self.assertRaises(QuotaExceededError):
+            client.get_json('https://example.test/x', max_wait=0)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        # Once a slot is free the probe goes through and closes the circuit
+        self.assertEqual(client.get_json('https://example.test/x'), {'ok': True})
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(len(session.requests), 2)
+        print("test_quota_refusing_the_probe_reopens_the_circuit passed.")
+
+
+class QuotaGovernorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'quota.sqlite3')
+        self.now = [0.0]
+        self.slept = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_governor(self, **kwargs):
+        return QuotaGovernor(path=self.path, calls_per_minute=10, clock=lambda: self.now[0],
+                             sleep=self.slept.append, **kwargs)
+
+    def test_paces_calls_evenly(self):
+        print("Running test_paces_calls_evenly...")
+        governor = self.make_governor()
+        waits = [governor.acquire() for _ in range(3)]
+        # First call uses the initial token, the rest queue up 6s apart
+        self.assertEqual(waits, [0.0, 6.0, 12.0])
+        self.now[0] = 60.0
+        self.assertEqual(governor.acquire(), 0.0)
+        print("test_paces_calls_evenly passed.")
+
+    def test_bucket_is_shared_between_instances(self):
+        print("Running test_bucket_is_shared_between_instances...")
+        # Two governors on the same file stand in for two processes
+        first, second = self.make_governor(), self.make_governor()
+        self.assertEqual(first.acquire(), 0.0)
+        self.assertEqual(second.acquire(), 6.0)
+        self.assertEqual(first.acquire(), 12.0)
+        print("test_bucket_is_shared_between_instances passed.")
+
+    def test_fails_fast_past_max_wait_without_reserving(self):
+        print("Running test_fails_fast_past_max_wait_without_reserving...")
+        governor = self.make_governor(max_wait=5)
+        governor.acquire()
+        with self.assertRaises(QuotaExceededError) as ctx:
+            governor.acquire()
+        self.assertEqual(ctx.exception.wait, 6.0)
+        self.assertTrue(isinstance(ctx.exception, UpstreamError))
+        # The refused call did not push later callers further back
+        self.assertEqual(governor.acquire(max_wait=10), 6.0)
+        print("test_fails_fast_past_max_wait_without_reserving passed.")
+
+    def test_upstream_quota_headers_drain_the_bucket(self):
+        print("Running test_upstream_quota_headers_drain_the_bucket...")
+        governor = self.make_governor(burst=10)
+        session = FakeSession([
+            FakeResponse(200, {'ok': True}, headers={'X-Requests-Available-Minute': '0', 'X-RequestCounter-Reset': '42'}),
+        ])
+        client = HttpClient(session=session, sleep=lambda s: None, quota=governor)
+        client.get_json('https://example.test/x')
+        # Another process on this key spent the quota: the next slot is at the upstream reset
+        self.assertAlmostEqual(governor.acquire(), 42.0)
+        print("test_upstream_quota_headers_drain_the_bucket passed.")
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.now = [1000.0]
+        self.cache = ResponseCache(path=os.path.join(self.tmp.name, 'cache.sqlite3'), clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_client(self, responses):
+        self.session = FakeSession(responses)
+        return HttpClient(session=self.session, sleep=lambda s: None, cache=self.cache)
+
+    def test_fresh_entries_are_served_from_disk(self):
+        print("Running test_fresh_entries_are_served_from_disk...")
+        client = self.make_client([FakeResponse(200, {'name': 'Premier League'})])
+        for _ in range(3):
+            self.assertEqual(client.get_json('https://example.test/c', ttl=60), {'name': 'Premier League'})
+        self.assertEqual(len(self.session.requests), 1)
+        self.assertEqual(client.stats()['cache_hits'], 2)
+        print("test_fresh_entries_are_served_from_disk passed.")
+
+    def test_expired_entries_are_revalidated(self):
+        print("Running test_expired_entries_are_revalidated...")
+        client = self.make_client([
+            FakeResponse(200, {'v': 1}, headers={'ETag': '"abc"', 'Last-Modified': 'Sat, 18 Oct 2026 10:00:00 GMT'}),
+            FakeResponse(304),
+        ])
+        client.get_json('https://example.test/m', params={'season': 2025}, ttl=60)
+        self.now[0] += 61
+        self.assertEqual(client.get_json('https://example.test/m', params={'season': 2025}, ttl=60), {'v': 1})
+        conditional = self.session.requests[1]['headers']
+        self.assertEqual(conditional['If-None-Match'], '"abc"')
+        self.assertEqual(conditional['If-Modified-Since'], 'Sat, 18 Oct 2026 10:00:00 GMT')
+        self.assertEqual(client.stats()['not_modified'], 1)
+        # The 304 renewed the entry
+        self.assertTrue(self.cache.get(ResponseCache.key_for('https://example.test/m', {'season': 2025})).fresh)
+        print("test_expired_entries_are_revalidated passed.")
+
+    def wait_for_refresh(self, client):
+        deadline = time.monotonic() + 5
+        while client._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_stale_entry_is_served_and_refreshed_in_background(self):
+        print("Running test_stale_entry_is_served_and_refreshed_in_background...")
+        client = self.make_client([FakeResponse(200, {'v': 1}), FakeResponse(200, {'v': 2})])
+        client.get_json('https://example.test/m', ttl=60)
+        self.now[0] += 61
+        result = client.fetch('https://example.test/m', ttl=60, allow_stale=True)
+        self.assertEqual(result, ({'v': 1}, True))
+        self.wait_for_refresh(client)
+        self.assertEqual(client.fetch('https://example.test/m', ttl=60, allow_stale=True), ({'v': 2}, False))
+        self.assertEqual(client.stats()['stale_served'], 1)
+        print("test_stale_entry_is_served_and_refreshed_in_background passed.")
+
+    def test_stale_entry_is_served_while_circuit_is_open(self):
+        print("Running test_stale_entry_is_served_while_circuit_is_open...")
+        client = self.make_client([FakeResponse(200, {'v': 1})])
+        client.breaker = CircuitBreaker(failure_threshold=1)
+        client.get_json('https://example.test/m', ttl=60)
+        client.breaker.record_failure()
+        self.now[0] += 61
+        with self.assertRaises(CircuitOpenError):
+            client.get_json('https://example.test/m', ttl=60)
+        self.assertEqual(client.fetch('https://example.test/m', ttl=60, allow_stale=True).data, {'v': 1})
+        # No refresh was attempted while the circuit is open
+        self.assertEqual(len(self.session.requests), 1)
+        print("test_stale_entry_is_served_while_circuit_is_open passed.")
+
+    def test_invalid_json_is_not_cached(self):
+        print("Running test_invalid_json_is_not_cached...")
+        client = self.make_client([FakeResponse(200, '{"v": '), FakeResponse(200, {'v': 1})])
+        with self.assertRaises(UpstreamError):
+            client.get_json('https://example.test/x', ttl=60)
+        self.assertIsNone(self.cache.get(ResponseCache.key_for('https://example.test/x', None)))
+        self.assertEqual(client.get_json('https://example.test/x', ttl=60), {'v': 1})
+        print("test_invalid_json_is_not_cached passed.")
+
+    def test_least_recently_used_entries_are_evicted(self):
+        print("Running test_least_recently_used_entries_are_evicted...")
+        self.cache.max_bytes = 40
+        for key in ['a', 'b', 'c']:
+            self.now[0] += 1
+            self.cache.put(key, json.dumps({'body': 'x' * 5}), ttl=60)
+            if key == 'b':
+                self.now[0] += 1
+                self.cache.get('a')
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('c'))
+        print("test_least_recently_used_entries_are_evicted passed.")
+
+    def test_ttl_rules(self):
+        print("Running test_ttl_rules...")
+        self.assertEqual(cache_ttl('/competitions/PL'), 24 * 3600)
+        self.assertEqual(cache_ttl('/competitions/PL/matches'), 300)
+        self.assertEqual(cache_ttl('/teams/57/matches', {'dateTo': '2020-01-01'}), FINISHED_MATCHES_TTL)
+        print("test_ttl_rules passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
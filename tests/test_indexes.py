@@ -0,0 +1,106 @@
+import datetime
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func, select, text
+
+from app import create_app, db
+from app.models import Team, Match, Prediction, FavouriteTeam
+
+
+class IndexPlanTestCase(unittest.TestCase):
+    """EXPLAIN QUERY PLAN for the hot queries, with each index in place and after dropping it."""
+
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def plan(self, stmt, label='plan'):
+        compiled = stmt.compile(dialect=db.engine.dialect)
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+        # The label keeps sqlite3's statement cache from replaying a plan prepared before DROP INDEX
+        sql = f'EXPLAIN QUERY PLAN {compiled} -- {label}'
+        rows = db.session.connection().exec_driver_sql(sql, params).all()
+        return ' | '.join(row[-1] for row in rows)
+
+    def assert_uses_index(self, stmt, *indexes):
+        before = self.plan(stmt, 'before')
+        for index in indexes:
+            self.assertIn(index, before)
+        for index in indexes:
+            db.session.execute(text(f'DROP INDEX {index}'))
+        after = self.plan(stmt, 'after')
+        for index in indexes:
+            self.assertNotIn(index, after)
+        self.assertIn('SCAN', after)
+
+    def test_team_fixtures(self):
+        print("Running test_team_fixtures...")
+        stmt = (select(Match).where((Match.home_team_id == 1) | (Match.away_team_id == 1))
+                .order_by(Match.kickoff))
+        self.assert_uses_index(stmt, 'ix_matches_home_team_kickoff', 'ix_matches_away_team_kickoff')
+        print("test_team_fixtures passed.")
+
+    def test_kickoff_range(self):
+        print("Running test_kickoff_range...")
+        start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        stmt = select(Match).where(Match.kickoff >= start).order_by(Match.kickoff)
+        self.assert_uses_index(stmt, 'ix_matches_kickoff')
+        print("test_kickoff_range passed.")
+
+    def test_user_predictions(self):
+        print("Running test_user_predictions...")
+        self.assert_uses_index(select(Prediction).where(Prediction.user_id == 1), 'uq_predictions_user_match')
+        print("test_user_predictions passed.")
+
+    def test_duplicate_prediction_check(self):
+        print("Running test_duplicate_prediction_check...")
+        stmt = select(Prediction).where(Prediction.user_id == 1, Prediction.match_id == 2)
+        self.assertIn('uq_predictions_user_match', self.plan(stmt))
+        print("test_duplicate_prediction_check passed.")
+
+    def test_predictions_by_match(self):
+        print("Running test_predictions_by_match...")
+        self.assert_uses_index(select(Prediction).where(Prediction.match_id == 1), 'ix_predictions_match_id')
+        print("test_predictions_by_match passed.")
+
+    def test_unpredicted_matches(self):
+        print("Running test_unpredicted_matches...")
+        start = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        predicted = select(Prediction.id).where(Prediction.user_id == 1, Prediction.match_id == Match.id)
+        stmt = select(Match).where(Match.kickoff >= start, ~predicted.exists()).order_by(Match.kickoff)
+        plan = self.plan(stmt)
+        self.assertIn('ix_matches_kickoff', plan)
+        self.assertIn('uq_predictions_user_match', plan)
+        print("test_unpredicted_matches passed.")
+
+    def test_favourite_lookup(self):
+        print("Running test_favourite_lookup...")
+        stmt = select(FavouriteTeam).where(FavouriteTeam.user_id == 1, FavouriteTeam.team_id == 2)
+        self.assert_uses_index(stmt, 'uq_favourite_teams_user_team')
+        print("test_favourite_lookup passed.")
+
+    def test_teams_by_league(self):
+        print("Running test_teams_by_league...")
+        self.assert_uses_index(select(Team).where(Team.league_id == 1), 'ix_teams_league_id')
+        print("test_teams_by_league passed.")
+
+    def test_team_name_prefix(self):
+        print("Running test_team_name_prefix...")
+        stmt = (select(Team).where(func.lower(Team.name) >= 'ch', func.lower(Team.name) < 'ci')
+                .order_by(func.lower(Team.name)))
+        self.assert_uses_index(stmt, 'ix_teams_name_lower')
+        print("test_team_name_prefix passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,238 @@
+import copy
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.ingest import Ingestor
+from app.models import User, League, Team, Match, Prediction, SyncState, IngestRun, IngestUnit
+
+
+def fd_match(match_id, home_id, away_id, date, home=None, away=None):
+    return {
+        'id': match_id,
+        'homeTeam': {'id': home_id},
+        'awayTeam': {'id': away_id},
+        'utcDate': f'{date}T15:00:00Z',
+        'score': {'fullTime': {'home': home, 'away': away}},
+    }
+
+
+class FakeFootballData:
+    """In-memory stand-in for the Football-Data.org client"""
+
+    COMPETITIONS = {
+        'PL': {'id': 2021, 'name': 'Premier League', 'emblem': 'pl.png', 'area': {'name': 'England'}},
+        'SA': {'id': 2019, 'name': 'Serie A', 'emblem': 'sa.png', 'area': {'name': 'Italy'}},
+    }
+    TEAMS = {
+        'PL': [{'id': 57, 'name': 'Arsenal FC', 'crest': 'ars.png', 'venue': 'Emirates Stadium'},
+               {'id': 61, 'name': 'Chelsea FC', 'crest': 'che.png', 'venue': 'Stamford Bridge'}],
+        'SA': [{'id': 108, 'name': 'FC Internazionale Milano', 'crest': 'int.png', 'venue': 'San Siro'},
+               {'id': 98, 'name': 'AC Milan', 'crest': 'mil.png', 'venue': 'San Siro'}],
+    }
+    MATCHES = {
+        'PL': [fd_match(1, 57, 61, '2025-01-01', 2, 1), fd_match(2, 61, 57, '2025-03-01')],
+        'SA': [fd_match(3, 108, 98, '2025-01-05', 1, 1)],
+    }
+
+    def __init__(self, failing=(), raising=()):
+        self.failing = set(failing)
+        self.raising = set(raising)
+        self.calls = []
+        self.windows = []
+        self.matches = copy.deepcopy(self.MATCHES)
+
+    def fetch_competition(self, code):
+        self.calls.append(('competition', code))
+        if code in self.failing:
+            return None
+        return self.COMPETITIONS.get(code)
+
+    def fetch_teams_for_competition(self, code):
+        self.calls.append(('teams', code))
+        return self.TEAMS.get(code, [])
+
+    def fetch_matches_for_competition(self, code, season=None, date_from=None, date_to=None):
+        self.calls.append(('competition_matches', code))
+        self.windows.append((date_from, date_to))
+        if code in self.raising:
+            raise RuntimeError('429 Too Many Requests')
+        return self.matches.get(code, [])
+
+    def fetch_matches_for_team(self, team_id, date_from=None, date_to=None):
+        self.calls.append(('team_matches', team_id))
+        self.windows.append((date_from, date_to))
+        return [m for matches in self.matches.values() for m in matches
+                if team_id in (m['homeTeam']['id'], m['awayTeam']['id'])]
+
+
+class IngestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_parallel_ingest_writes_leagues_teams_and_matches(self):
+        print("Running test_parallel_ingest_writes_leagues_teams_and_matches...")
+        client = FakeFootballData()
+        ingestor = Ingestor(self.app, client, workers=4).run(['PL', 'SA'])
+        self.assertEqual(ingestor.failures, [])
+        with self.app.app_context():
+            self.assertEqual(League.query.count(), 2)
+            self.assertEqual(Team.query.count(), 4)
+            self.assertEqual(Match.query.count(), 3)
+            match = Match.query.get(1)
+            self.assertEqual(match.result, '2-1')
+            self.assertEqual(match.date, '2025-01-01')
+            self.assertIsNone(Match.query.get(2).result)
+            self.assertEqual(Team.query.get(108).league_id, 2019)
+        print("test_parallel_ingest_writes_leagues_teams_and_matches passed.")
+
+    def test_competition_match_source_fetches_once_per_competition(self):
+        print("Running test_competition_match_source_fetches_once_per_competition...")
+        client = FakeFootballData()
+        Ingestor(self.app, client, workers=2).run(['PL'])
+        match_calls = [c for c in client.calls if c[0] in ('competition_matches', 'team_matches')]
+        self.assertEqual(match_calls, [('competition_matches', 'PL')])
+        print("test_competition_match_source_fetches_once_per_competition passed.")
+
+    def test_team_match_source_skips_duplicate_fixtures(self):
+        print("Running test_team_match_source_skips_duplicate_fixtures...")
+        client = FakeFootballData()
+        ingestor = Ingestor(self.app, client, workers=2, match_source='team').run(['PL'])
+        team_calls = [c for c in client.calls if c[0] == 'team_matches']
+        self.assertEqual(len(team_calls), 2)
+        self.assertEqual(ingestor.failures, [])
+        with self.app.app_context():
+            self.assertEqual(Match.query.count(), 2)
+        print("test_team_match_source_skips_duplicate_fixtures passed.")
+
+    def test_matches_against_unknown_teams_are_skipped(self):
+        print("Running test_matches_against_unknown_teams_are_skipped...")
+        client = FakeFootballData()
+        # A cup tie against a club that isn't in any seeded league
+        client.matches['CL'] = [fd_match(9, 57, 999, '2025-02-01', 3, 0)]
+        ingestor = Ingestor(self.app, client, workers=2, match_source='team').run(['PL'])
+        self.assertEqual(ingestor.skipped_matches, 1)
+        with self.app.app_context():
+            self.assertEqual(Match.query.count(), 2)
+            self.assertIsNone(db.session.get(Match, 9))
+        print("test_matches_against_unknown_teams_are_skipped passed.")
+
+    def test_new_results_score_predictions(self):
+        print("Running test_new_results_score_predictions...")
+        client = FakeFootballData()
+        Ingestor(self.app, client, workers=2).run(['PL'])
+        with self.app.app_context():
+            db.session.add(User(id=1, username='fan', password_hash='x', score=0))
+            db.session.add(Prediction(user_id=1, match_id=2, predicted_result='0-1'))
+            db.session.commit()
+        client.matches['PL'][1]['score']['fullTime'] = {'home': 0, 'away': 1}
+        ingestor = Ingestor(self.app, client, workers=2).run(['PL'])
+        self.assertEqual(ingestor.scored_predictions, 1)
+        with self.app.app_context():
+            prediction = Prediction.query.first()
+            self.assertEqual(prediction.points_awarded, 3)
+            self.assertIsNotNone(prediction.scored_at)
+            self.assertEqual((prediction.match.home_score, prediction.match.away_score), (0, 1))
+            self.assertEqual((prediction.match.kickoff.hour, prediction.match.kickoff.minute), (15, 0))
+        print("test_new_results_score_predictions passed.")
+
+    def test_ingest_records_watermarks(self):
+        print("Running test_ingest_records_watermarks...")
+        Ingestor(self.app, FakeFootballData(), workers=2).run(['PL', 'SA'])
+        with self.app.app_context():
+            keys = {(s.scope, s.key) for s in SyncState.query.all()}
+        self.assertEqual(keys, {('competition', 'PL'), ('competition', 'SA')})
+        print("test_ingest_records_watermarks passed.")
+
+    def test_incremental_run_only_fetches_changed_window(self):
+        print("Running test_incremental_run_only_fetches_changed_window...")
+        Ingestor(self.app, FakeFootballData(), workers=2).run(['PL', 'SA'])
+        client = FakeFootballData()
+        client.matches['PL'][1]['score']['fullTime'] = {'home': 0, 'away': 0}
+        ingestor = Ingestor(self.app, client, workers=2, incremental=True).run(['PL', 'SA'])
+        # Only the match fetches are repeated, each limited to a date window
+        self.assertEqual(sorted(c[0] for c in client.calls), ['competition_matches', 'competition_matches'])
+        self.assertTrue(all(date_from and date_to for date_from, date_to in client.windows))
+        self.assertEqual(ingestor.counts['matches'].updated, 1)
+        self.assertEqual(ingestor.counts['matches'].unchanged, 2)
+        with self.app.app_context():
+            self.assertEqual(Match.query.get(2).result, '0-0')
+        print("test_incremental_run_only_fetches_changed_window passed.")
+
+    def test_incremental_run_without_watermark_does_full_fetch(self):
+        print("Running test_incremental_run_without_watermark_does_full_fetch...")
+        client = FakeFootballData()
+        Ingestor(self.app, client, workers=2, incremental=True).run(['PL'])
+        self.assertIn(('competition', 'PL'), client.calls)
+        self.assertEqual(client.windows, [(None, None)])
+        print("test_incremental_run_without_watermark_does_full_fetch passed.")
+
+    def test_run_and_units_are_checkpointed(self):
+        print("Running test_run_and_units_are_checkpointed...")
+        ingestor = Ingestor(self.app, FakeFootballData(), workers=2).run(['PL'])
+        with self.app.app_context():
+            run = IngestRun.query.get(ingestor.run_id)
+            self.assertEqual(run.status, 'done')
+            self.assertIsNotNone(run.finished_at)
+            units = {(u.kind, u.key, u.status) for u in run.units}
+        self.assertEqual(units, {('competition', 'PL', 'done'), ('teams', 'PL', 'done'),
+                                 ('competition_matches', 'PL', 'done')})
+        print("test_run_and_units_are_checkpointed passed.")
+
+    def test_resume_skips_finished_units(self):
+        print("Running test_resume_skips_finished_units...")
+        first = Ingestor(self.app, FakeFootballData(raising={'SA'}), workers=2).run(['PL', 'SA'])
+        self.assertEqual(len(first.failures), 1)
+        with self.app.app_context():
+            self.assertEqual(IngestRun.query.get(first.run_id).status, 'failed')
+            failed = IngestUnit.query.filter_by(run_id=first.run_id, status='failed').one()
+            self.assertEqual((failed.kind, failed.key), ('competition_matches', 'SA'))
+
+        client = FakeFootballData()
+        resumed = Ingestor(self.app, client, workers=2, resume=True).run(['PL', 'SA'])
+        self.assertEqual(resumed.run_id, first.run_id)
+        self.assertEqual(client.calls, [('competition_matches', 'SA')])
+        with self.app.app_context():
+            self.assertEqual(IngestRun.query.get(first.run_id).status, 'done')
+            self.assertEqual(Match.query.count(), 3)
+        print("test_resume_skips_finished_units passed.")
+
+    def test_resume_without_unfinished_run_starts_fresh(self):
+        print("Running test_resume_without_unfinished_run_starts_fresh...")
+        first = Ingestor(self.app, FakeFootballData(), workers=2).run(['PL'])
+        client = FakeFootballData()
+        second = Ingestor(self.app, client, workers=2, resume=True).run(['PL'])
+        self.assertNotEqual(second.run_id, first.run_id)
+        self.assertIn(('competition', 'PL'), client.calls)
+        print("test_resume_without_unfinished_run_starts_fresh passed.")
+
+    def test_ingest_records_phase_timings(self):
+        print("Running test_ingest_records_phase_timings...")
+        ingestor = Ingestor(self.app, FakeFootballData(), workers=2).run(['PL'])
+        summary = ingestor.summary()
+        for phase in ('competitions', 'teams', 'matches', 'write', 'total'):
+            self.assertIn(phase, summary)
+        print("test_ingest_records_phase_timings passed.")
+
+    def test_failed_competition_is_reported_and_skipped(self):
+        print("Running test_failed_competition_is_reported_and_skipped...")
+        client = FakeFootballData(failing={'SA'})
+        ingestor = Ingestor(self.app, client, workers=2).run(['PL', 'SA'])
+        self.assertEqual(len(ingestor.failures), 1)
+        self.assertNotIn(('teams', 'SA'), client.calls)
+        with self.app.app_context():
+            self.assertEqual(League.query.count(), 1)
+        print("test_failed_competition_is_reported_and_skipped passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
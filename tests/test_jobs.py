@@ -0,0 +1,114 @@
+import datetime
+import json
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.jobs import ScrapeJobRunner
+from app.models import League, Team, Match, ScrapeJob
+
+
+class FakeScraper:
+    """Stands in for FootballDataOrgScraper with canned fixtures"""
+
+    def __init__(self, matches=None, upstream_available=True):
+        self.matches = matches or []
+        self.stale = False
+        self.upstream_available = upstream_available
+
+    def fetch_matches_for_team(self, team_name):
+        return self.matches
+
+
+class ScrapeJobsTestCase(unittest.TestCase):
+    MATCHES = [
+        {'id': 10, 'home_team': 'Chelsea FC', 'home_team_id': 1, 'away_team': 'Arsenal FC', 'away_team_id': 2,
+         'date': '2025-02-01', 'result': '1-0'},
+        {'id': 11, 'home_team': 'Arsenal FC', 'home_team_id': 2, 'away_team': 'Real Madrid CF', 'away_team_id': 86,
+         'date': '2025-02-08', 'result': None},
+    ]
+
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(League(id=1, name='Premier League'))
+            db.session.add_all([Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1)])
+            db.session.commit()
+        self.use_scraper(FakeScraper(self.MATCHES))
+        self.client.post('/api/v1/register', json={'username': 'jobs', 'password': 'pw'})
+        token = json.loads(self.client.post('/api/v1/login', json={'username': 'jobs', 'password': 'pw'}).data)['token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def use_scraper(self, scraper):
+        self.app.extensions['scrape_jobs'] = ScrapeJobRunner(self.app, inline=True, scraper_factory=lambda: scraper)
+
+    def scrape(self, team_name):
+        return self.client.post('/api/v1/matches/scrape', json={'team_name': team_name}, headers=self.headers)
+
+    def test_scrape_job_runs_and_reports_counts(self):
+        print("Running test_scrape_job_runs_and_reports_counts...")
+        response = self.scrape('Chelsea')
+        self.assertEqual(response.status_code, 202)
+        job = json.loads(self.client.get(response.headers['Location'], headers=self.headers).data)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual((job['found'], job['inserted']), (2, 1))
+        self.assertIsNotNone(job['run_seconds'])
+        with self.app.app_context():
+            # The fixture against an unknown club was skipped
+            self.assertEqual([m.id for m in Match.query.all()], [10])
+        print("test_scrape_job_runs_and_reports_counts passed.")
+
+    def test_identical_in_flight_jobs_are_merged(self):
+        print("Running test_identical_in_flight_jobs_are_merged...")
+        with self.app.app_context():
+            job = ScrapeJob(team_id=1, status='running', created_at=datetime.datetime.utcnow(),
+                            started_at=datetime.datetime.utcnow())
+            db.session.add(job)
+            db.session.commit()
+            job_id = job.id
+        data = json.loads(self.scrape('chelsea').data)
+        self.assertEqual(data['id'], job_id)
+        self.assertTrue(data['merged'])
+        with self.app.app_context():
+            self.assertEqual(ScrapeJob.query.count(), 1)
+        print("test_identical_in_flight_jobs_are_merged passed.")
+
+    def test_abandoned_job_does_not_block_new_ones(self):
+        print("Running test_abandoned_job_does_not_block_new_ones...")
+        with self.app.app_context():
+            long_ago = datetime.datetime.utcnow() - datetime.timedelta(days=1)
+            db.session.add(ScrapeJob(team_id=1, status='running', created_at=long_ago, started_at=long_ago))
+            db.session.commit()
+        data = json.loads(self.scrape('Chelsea').data)
+        self.assertFalse(data['merged'])
+        self.assertEqual(data['status'], 'done')
+        with self.app.app_context():
+            self.assertEqual(ScrapeJob.query.filter_by(status='failed').count(), 1)
+        print("test_abandoned_job_does_not_block_new_ones passed.")
+
+    def test_upstream_outage_fails_the_job(self):
+        print("Running test_upstream_outage_fails_the_job...")
+        self.use_scraper(FakeScraper(upstream_available=False))
+        data = json.loads(self.scrape('Arsenal').data)
+        self.assertEqual(data['status'], 'failed')
+        self.assertIn('unavailable', data['error'])
+        print("test_upstream_outage_fails_the_job passed.")
+
+    def test_unknown_team_and_job(self):
+        print("Running test_unknown_team_and_job...")
+        self.assertEqual(self.scrape('NonExistentTeamXYZ').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/jobs/999', headers=self.headers).status_code, 404)
+        print("test_unknown_team_and_job passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,217 @@
+import json
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+from app import create_app, db
+from app.leaderboard import RankIndex, get_rank_index, match_week
+from app.models import User, League, Team, Match, Prediction, LeaderboardRollup
+from app.scoring import score_match
+
+
+class RankIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = RankIndex([(1, 'ana', 10), (2, 'ben', 7), (3, 'cat', 7), (4, 'dan', 3), (5, 'eve', None)])
+
+    def test_ranks_share_ties(self):
+        print("Running test_ranks_share_ties...")
+        self.assertEqual([self.index.rank(u) for u in range(1, 6)], [1, 2, 2, 4, 5])
+        self.assertIsNone(self.index.rank(99))
+        print("test_ranks_share_ties passed.")
+
+    def test_pages_and_neighbours(self):
+        print("Running test_pages_and_neighbours...")
+        self.assertEqual([u['username'] for u in self.index.page(2, 2)], ['cat', 'dan'])
+        self.assertEqual([u['id'] for u in self.index.around(1, 1)], [1, 2])
+        self.assertEqual([u['id'] for u in self.index.around(4, 1)], [3, 4, 5])
+        print("test_pages_and_neighbours passed.")
+
+    def test_updates_move_users(self):
+        print("Running test_updates_move_users...")
+        self.index.update(4, 12)
+        self.index.update(6, 0, 'fay')
+        self.assertEqual(self.index.rank(4), 1)
+        self.assertEqual(self.index.rank(1), 2)
+        self.assertEqual(len(self.index), 6)
+        self.assertEqual([u['username'] for u in self.index.page(1, 6)], ['dan', 'ana', 'ben', 'cat', 'eve', 'fay'])
+        print("test_updates_move_users passed.")
+
+
+class LeaderboardAPITestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(League(id=1, name='Premier League'))
+            db.session.add_all([Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1)])
+            db.session.add(Match(id=1, home_team_id=1, away_team_id=2, date='2025-01-01'))
+            db.session.add_all([User(id=i, username=f'user{i}', password_hash='x', score=0) for i in range(1, 4)])
+            db.session.add_all([
+                Prediction(user_id=1, match_id=1, predicted_result='1-0'),
+                Prediction(user_id=2, match_id=1, predicted_result='2-0'),
+            ])
+            db.session.commit()
+        self.client.post('/api/v1/register', json={'username': 'me', 'password': 'pw'})
+        login = json.loads(self.client.post('/api/v1/login', json={'username': 'me', 'password': 'pw'}).data)
+        self.user_id = login['user_id']
+        self.headers = {'Authorization': f"Bearer {login['token']}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_index_follows_scoring_without_rebuilding(self):
+        print("Running test_index_follows_scoring_without_rebuilding...")
+        with self.app.app_context():
+            index = get_rank_index()
+            score_match(1, '2-0')
+            db.session.commit()
+            self.assertIs(get_rank_index(), index)
+            self.assertEqual((index.rank(2), index.rank(1)), (1, 2))
+        print("test_index_follows_scoring_without_rebuilding passed.")
+
+    def test_my_rank_with_neighbours(self):
+        print("Running test_my_rank_with_neighbours...")
+        with self.app.app_context():
+            score_match(1, '1-0')
+            db.session.commit()
+        me = json.loads(self.client.get('/api/v1/leaderboard/me?around=1', headers=self.headers).data)
+        # user1 has 3 points, user2 1, user3 and me 0
+        self.assertEqual((me['rank'], me['total']), (3, 4))
+        self.assertEqual([u['id'] for u in me['neighbours']], [3, self.user_id])
+        print("test_my_rank_with_neighbours passed.")
+
+    def test_registered_users_join_the_index(self):
+        print("Running test_registered_users_join_the_index...")
+        first = json.loads(self.client.get('/api/v1/leaderboard', headers=self.headers).data)
+        self.client.post('/api/v1/register', json={'username': 'late', 'password': 'pw'})
+        second = json.loads(self.client.get('/api/v1/leaderboard', headers=self.headers).data)
+        self.assertEqual(second['total'], first['total'] + 1)
+        self.assertIn('late', [u['username'] for u in second['users']])
+        print("test_registered_users_join_the_index passed.")
+
+    def test_me_registered_by_another_worker(self):
+        print("Running test_me_registered_by_another_worker...")
+        with self.app.app_context():
+            # An index built before this user registered, as another process would hold
+            self.app.extensions['rank_index'] = {'index': RankIndex([(1, 'user1', 5), (2, 'user2', 0)])}
+            token = jwt.encode({'user_id': 999}, self.app.config['SECRET_KEY'], algorithm='HS256')
+        me = json.loads(self.client.get('/api/v1/leaderboard/me', headers=self.headers).data)
+        self.assertEqual((me['id'], me['rank'], me['total']), (self.user_id, 2, 3))
+        response = self.client.get('/api/v1/leaderboard/me', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 404)
+        print("test_me_registered_by_another_worker passed.")
+
+    def test_bad_paging_arguments(self):
+        print("Running test_bad_paging_arguments...")
+        for url in ('/api/v1/leaderboard?page=two', '/api/v1/leaderboard?per_page=x', '/api/v1/leaderboard/me?around=x'):
+            response = self.client.get(url, headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error', json.loads(response.data))
+        print("test_bad_paging_arguments passed.")
+
+
+class LeaderboardRollupTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([League(id=1, name='Premier League'), League(id=2, name='La Liga')])
+            db.session.add_all([
+                Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1),
+                Team(id=3, name='Sevilla', league_id=2), Team(id=4, name='Valencia', league_id=2),
+            ])
+            db.session.add_all([
+                Match(id=1, home_team_id=1, away_team_id=2, date='2025-01-04'),
+                Match(id=2, home_team_id=3, away_team_id=4, date='2025-01-05'),
+                Match(id=3, home_team_id=2, away_team_id=1, date='2025-01-11'),
+            ])
+            db.session.add_all([User(id=i, username=f'user{i}', password_hash='x', score=0) for i in (1, 2)])
+            db.session.add_all([
+                Prediction(user_id=1, match_id=1, predicted_result='1-0'),
+                Prediction(user_id=2, match_id=1, predicted_result='2-0'),
+                Prediction(user_id=1, match_id=2, predicted_result='0-0'),
+                Prediction(user_id=2, match_id=2, predicted_result='1-1'),
+                Prediction(user_id=1, match_id=3, predicted_result='0-2'),
+            ])
+            db.session.commit()
+        self.client.post('/api/v1/register', json={'username': 'me', 'password': 'pw'})
+        login = json.loads(self.client.post('/api/v1/login', json={'username': 'me', 'password': 'pw'}).data)
+        self.headers = {'Authorization': f"Bearer {login['token']}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def rollups(self, league_id, period):
+        return {
+            r.user_id: (r.points, r.predictions, r.exact)
+            for r in LeaderboardRollup.query.filter_by(league_id=league_id, period=period)
+        }
+
+    def test_match_week(self):
+        print("Running test_match_week...")
+        self.assertEqual(match_week('2025-01-04'), '2025-W01')
+        self.assertEqual(match_week('2024-12-30'), '2025-W01')
+        self.assertEqual(match_week('2025-01-11T15:00:00Z'), '2025-W02')
+        self.assertIsNone(match_week('TBD'))
+        self.assertIsNone(match_week(None))
+        print("test_match_week passed.")
+
+    def test_scoring_keeps_rollups_current(self):
+        print("Running test_scoring_keeps_rollups_current...")
+        with self.app.app_context():
+            score_match(1, '1-0')
+            score_match(2, '1-1')
+            db.session.commit()
+            self.assertEqual(self.rollups(1, '2025-W01'), {1: (3, 1, 1), 2: (1, 1, 0)})
+            self.assertEqual(self.rollups(2, 'all'), {1: (1, 1, 0), 2: (3, 1, 1)})
+            self.assertEqual(self.rollups(0, '2025-W01'), {1: (4, 2, 1), 2: (4, 2, 1)})
+            # A corrected result retracts the old points before applying the new ones
+            score_match(1, '2-0')
+            db.session.commit()
+            self.assertEqual(self.rollups(1, '2025-W01'), {1: (1, 1, 0), 2: (3, 1, 1)})
+            self.assertEqual(self.rollups(0, '2025-W01'), {1: (2, 2, 0), 2: (6, 2, 2)})
+        print("test_scoring_keeps_rollups_current passed.")
+
+    def test_rescheduled_match_moves_between_weeks(self):
+        print("Running test_rescheduled_match_moves_between_weeks...")
+        with self.app.app_context():
+            score_match(1, '1-0')
+            db.session.commit()
+            db.session.get(Match, 1).date = '2025-01-12'
+            score_match(1, '1-0')
+            db.session.commit()
+            self.assertEqual(self.rollups(1, '2025-W01'), {1: (0, 0, 0), 2: (0, 0, 0)})
+            self.assertEqual(self.rollups(1, '2025-W02'), {1: (3, 1, 1), 2: (1, 1, 0)})
+            self.assertEqual(self.rollups(1, 'all'), {1: (3, 1, 1), 2: (1, 1, 0)})
+        print("test_rescheduled_match_moves_between_weeks passed.")
+
+    def test_league_and_week_boards(self):
+        print("Running test_league_and_week_boards...")
+        with self.app.app_context():
+            score_match(1, '1-0')
+            score_match(2, '1-1')
+            score_match(3, '0-2')
+            db.session.commit()
+        league = json.loads(self.client.get('/api/v1/leaderboard?league_id=1', headers=self.headers).data)
+        self.assertEqual([(u['id'], u['score'], u['rank']) for u in league['users']], [(1, 6, 1), (2, 1, 2)])
+        self.assertEqual((league['total'], league['league_id'], league['week']), (2, 1, None))
+        week = json.loads(self.client.get('/api/v1/leaderboard?week=2025-W01', headers=self.headers).data)
+        self.assertEqual([(u['id'], u['score'], u['rank']) for u in week['users']], [(1, 4, 1), (2, 4, 1)])
+        both = json.loads(self.client.get('/api/v1/leaderboard?league_id=1&week=2025-W02&per_page=1', headers=self.headers).data)
+        self.assertEqual(([u['id'] for u in both['users']], both['total'], both['pages']), ([1], 1, 1))
+        response = self.client.get('/api/v1/leaderboard?week=january', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        print("test_league_and_week_boards passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -101,6 +101,9 @@ class ModelTestCase(unittest.TestCase):
             self.assertEqual(match.home_team.name, 'Chelsea')
             self.assertEqual(match.away_team.name, 'Arsenal')
             self.assertEqual(match.result, '2-1')
+            self.assertEqual((match.home_score, match.away_score), (2, 1))
+            match.result = None
+            self.assertEqual((match.home_score, match.away_score), (None, None))
             print("test_match_creation passed.")
 
     def test_prediction_creation(self):
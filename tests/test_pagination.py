@@ -0,0 +1,169 @@
+import datetime
+import struct
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import Team, Match
+from app.pagination import decode_cursor, encode_cursor, paginate
+from sqlalchemy.dialects import postgresql
+
+from app.search import relevance, similarity, team_filter
+
+
+class PaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([Team(id=i, name=f'Team {i:02d}', favourite=i % 4 == 0) for i in range(1, 24)])
+        # Two matches per day, and some whose date never parsed
+        db.session.add_all([Match(id=i, home_team_id=1, away_team_id=2, date=f'2025-01-{i // 2 + 1:02d}')
+                            for i in range(1, 20)])
+        db.session.add_all([Match(id=i, home_team_id=1, away_team_id=2, date='TBC') for i in range(20, 24)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def walk(self, query, keys, per_page=5, **args):
+        """Every page forwards by next_cursor, then back by prev_cursor."""
+        forward, backward = [], []
+        page = paginate(query, keys, dict(args, per_page=per_page))
+        self.assertIsNone(page.prev_cursor)
+        while True:
+            forward.append([item.id for item in page.items])
+            if not page.next_cursor:
+                break
+            page = paginate(query, keys, dict(args, per_page=per_page, cursor=page.next_cursor))
+            self.assertEqual(page.page, len(forward) + 1)
+        while True:
+            backward.insert(0, [item.id for item in page.items])
+            if not page.prev_cursor:
+                break
+            page = paginate(query, keys, dict(args, per_page=per_page, cursor=page.prev_cursor))
+        self.assertEqual(page.page, 1)
+        self.assertEqual(forward, backward)
+        return [i for ids in forward for i in ids]
+
+    def expected(self, query, keys):
+        return [item.id for item in query.order_by(*(e.desc() if d else e for e, d in keys))]
+
+    def test_walk_teams_by_name(self):
+        print("Running test_walk_teams_by_name...")
+        keys = [(Team.name, False), (Team.id, False)]
+        self.assertEqual(self.walk(Team.query, keys), list(range(1, 24)))
+        print("test_walk_teams_by_name passed.")
+
+    def test_walk_mixed_directions(self):
+        print("Running test_walk_mixed_directions...")
+        keys = [(Team.favourite, True), (Team.name, True), (Team.id, False)]
+        ids = self.walk(Team.query, keys, per_page=4)
+        self.assertEqual(ids, self.expected(Team.query, keys))
+        self.assertEqual(ids[:5], [20, 16, 12, 8, 4])
+        print("test_walk_mixed_directions passed.")
+
+    def test_walk_null_kickoffs(self):
+        print("Running test_walk_null_kickoffs...")
+        for descending in (False, True):
+            keys = [(Match.kickoff, descending), (Match.id, False)]
+            ids = self.walk(Match.query, keys, per_page=3)
+            self.assertEqual(ids, self.expected(Match.query, keys))
+            self.assertEqual(sorted(ids), list(range(1, 24)))
+        print("test_walk_null_kickoffs passed.")
+
+    def test_walk_search_relevance(self):
+        print("Running test_walk_search_relevance...")
+        db.session.add_all([Team(id=30, name='Team'), Team(id=31, name='A Team')])
+        db.session.commit()
+        query = Team.query.filter(team_filter('team'))
+        keys = relevance('team') + [(Team.id, False)]
+        ids = self.walk(query, keys, per_page=4)
+        self.assertEqual(ids, self.expected(query, keys))
+        self.assertEqual(ids[0], 30)
+        self.assertEqual(ids[-1], 31)
+        print("test_walk_search_relevance passed.")
+
+    def test_walk_search_relevance_postgresql(self):
+        print("Running test_walk_search_relevance_postgresql...")
+        db.session.add_all([Team(id=30, name='Team'), Team(id=31, name='A Team')])
+        db.session.commit()
+        # pg_trgm's similarity() as SQLite sees it: a float4, so most names tie on it
+        float4 = lambda a, b: struct.unpack('f', struct.pack('f', similarity(a, b)))[0]
+        db.session.connection().connection.driver_connection.create_function('similarity', 2, float4)
+        query = Team.query.filter(team_filter('team'))
+        keys = relevance('team', dialect='postgresql') + [(Team.id, False)]
+        ids = self.walk(query, keys, per_page=4)
+        self.assertEqual(ids, self.expected(query, keys))
+        self.assertEqual(sorted(ids), [t.id for t in Team.query.order_by(Team.id)])
+        self.assertEqual(ids[0], 30)
+        # The similarity key is a whole number in the cursor and in the SQL
+        page = paginate(query, keys, {'per_page': 4})
+        rank = decode_cursor(page.next_cursor, keys)[0][0]
+        self.assertIsInstance(rank, int)
+        sql = str(query.filter(keys[0][0] <= rank).statement.compile(dialect=postgresql.dialect()))
+        self.assertIn('CAST(similarity(teams.name, %(similarity_1)s) * %(similarity_2)s AS INTEGER)', sql)
+        print("test_walk_search_relevance_postgresql passed.")
+
+    def test_rows_inserted_ahead_of_the_first_page(self):
+        print("Running test_rows_inserted_ahead_of_the_first_page...")
+        keys = [(Team.name, False), (Team.id, False)]
+        second = paginate(Team.query, keys, {'per_page': 5, 'cursor': paginate(Team.query, keys, {'per_page': 5}).next_cursor})
+        db.session.add_all([Team(id=50, name='A Team'), Team(id=51, name='B Team')])
+        db.session.commit()
+        first = paginate(Team.query, keys, {'per_page': 5, 'cursor': second.prev_cursor})
+        self.assertEqual((first.page, [t.id for t in first.items]), (1, [1, 2, 3, 4, 5]))
+        # Still a valid cursor, back to the new rows
+        ahead = paginate(Team.query, keys, {'per_page': 5, 'cursor': first.prev_cursor})
+        self.assertEqual((ahead.page, [t.id for t in ahead.items]), (1, [50, 51]))
+        self.assertIsNone(ahead.prev_cursor)
+        print("test_rows_inserted_ahead_of_the_first_page passed.")
+
+    def test_legacy_page_numbers(self):
+        print("Running test_legacy_page_numbers...")
+        keys = [(Team.name, False), (Team.id, False)]
+        page = paginate(Team.query, keys, {'page': '3', 'per_page': '5'})
+        self.assertEqual([t.id for t in page.items], list(range(11, 16)))
+        self.assertEqual((page.page, page.total, page.pages), (3, 23, 5))
+        previous = paginate(Team.query, keys, {'cursor': page.prev_cursor, 'per_page': '5'})
+        self.assertEqual([t.id for t in previous.items], list(range(6, 11)))
+        self.assertEqual(previous.page, 2)
+        print("test_legacy_page_numbers passed.")
+
+    def test_total_is_optional_and_cached(self):
+        print("Running test_total_is_optional_and_cached...")
+        keys = [(Team.name, False), (Team.id, False)]
+        first = paginate(Team.query, keys, {'per_page': '5'})
+        self.assertEqual(first.envelope()['total'], 23)
+        self.assertEqual(first.envelope()['pages'], 5)
+        later = paginate(Team.query, keys, {'per_page': '5', 'cursor': first.next_cursor})
+        self.assertNotIn('total', later.envelope())
+        self.assertIsNone(paginate(Team.query, keys, {'count': '0'}).total)
+        db.session.add(Team(id=99, name='Team 99'))
+        db.session.commit()
+        self.assertEqual(paginate(Team.query, keys, {'count': '1', 'cursor': first.next_cursor}).total, 23)
+        self.app.extensions['count_cache'].clear()
+        self.assertEqual(paginate(Team.query, keys, {'count': '1'}).total, 24)
+        print("test_total_is_optional_and_cached passed.")
+
+    def test_cursor_round_trip(self):
+        print("Running test_cursor_round_trip...")
+        keys = [(Match.kickoff, False), (Match.id, False)]
+        kickoff = datetime.datetime(2025, 1, 4, 15, 0)
+        self.assertEqual(decode_cursor(encode_cursor([kickoff, 7], 3), keys), ([kickoff, 7], False, 3))
+        self.assertEqual(decode_cursor(encode_cursor([None, 7], 2, backwards=True), keys), ([None, 7], True, 2))
+        for bad in ('nope', encode_cursor([1], 2), encode_cursor([None, 1], 0), '!!!'):
+            with self.assertRaises(ValueError):
+                decode_cursor(bad, keys)
+        with self.assertRaises(ValueError):
+            paginate(Team.query, [(Team.id, False)], {'per_page': 'ten'})
+        print("test_cursor_round_trip passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import itertools
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from app import create_app, db
+from app.models import User, League, Team, Match, Prediction, LeaderboardRollup
+from app.rescoring import rescore_predictions, vector_points
+from app.scoring import parse_rules, score_match
+
+RULES = parse_rules('exact=5,goal_difference=3,outcome=1')
+GRID = list(itertools.product(range(4), repeat=2))
+
+
+class RulesTestCase(unittest.TestCase):
+    def test_parse_rules(self):
+        print("Running test_parse_rules...")
+        self.assertEqual(parse_rules(' exact=3, outcome=1 '), (('exact', 3), ('outcome', 1)))
+        self.assertEqual(parse_rules(''), ())
+        with self.assertRaises(ValueError):
+            parse_rules('exact=3,bonus=2')
+        with self.assertRaises(ValueError):
+            parse_rules('exact=three')
+        print("test_parse_rules passed.")
+
+    def test_vector_points(self):
+        print("Running test_vector_points...")
+        ph, pa = np.array([2, 3, 1, 0, -1]), np.array([1, 2, 0, 2, -1])
+        h, a = np.full(5, 2), np.full(5, 1)
+        self.assertEqual(vector_points(ph, pa, h, a, RULES).tolist(), [5, 3, 3, 0, 0])
+        self.assertEqual(vector_points(ph, pa, h, a, parse_rules('outcome=1')).tolist(), [1, 1, 1, 0, 0])
+        self.assertEqual(vector_points(ph, pa, h, a, ()).tolist(), [0] * 5)
+        print("test_vector_points passed.")
+
+
+class RescoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(League(id=1, name='Premier League'))
+        db.session.add_all([Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1)])
+        db.session.add_all([User(id=i, username=f'user{i}', password_hash='x', score=0) for i in range(1, len(GRID) + 2)])
+        results = ['0-0', '2-1', '1-3']
+        db.session.add_all([
+            Match(id=m, home_team_id=1, away_team_id=2, date=f'2025-01-0{m}', result=result)
+            for m, result in enumerate(results, 1)
+        ])
+        # Every user predicts one grid score for every match
+        db.session.add_all([
+            Prediction(user_id=u, match_id=m, predicted_result=f'{home}-{away}')
+            for u, (home, away) in enumerate(GRID, 1)
+            for m in range(1, len(results) + 1)
+        ])
+        db.session.add(Prediction(user_id=len(GRID) + 1, match_id=1, predicted_result='no idea'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def points(self):
+        db.session.expire_all()
+        return {p.id: p.points_awarded for p in Prediction.query}
+
+    def test_matches_sql_scoring(self):
+        print("Running test_matches_sql_scoring...")
+        for match in Match.query.all():
+            score_match(match.id, match.result, rules=RULES)
+        db.session.commit()
+        expected = self.points()
+        Prediction.query.update({'points_awarded': 0})
+        db.session.commit()
+        result = rescore_predictions(rules=RULES, chunk_size=7)
+        self.assertEqual(self.points(), expected)
+        self.assertEqual(result.rows, len(expected))
+        self.assertEqual(result.changed, sum(1 for p in expected.values() if p))
+        self.assertGreater(result.rows_per_second, 0)
+        print("test_matches_sql_scoring passed.")
+
+    def test_totals_follow_the_new_rules(self):
+        print("Running test_totals_follow_the_new_rules...")
+        for match in Match.query.all():
+            score_match(match.id, match.result)
+        db.session.commit()
+        checked = []
+        rescore_predictions(rules=RULES, chunk_size=10, progress=lambda r: checked.append(r.rows))
+        self.assertEqual(checked[-1], Prediction.query.count())
+        self.assertEqual(len(checked), -(-checked[-1] // 10))
+        db.session.expire_all()
+        for user in User.query.all():
+            points = sum(p.points_awarded for p in user.predictions)
+            self.assertEqual(user.score, points)
+            rollup = LeaderboardRollup.query.filter_by(user_id=user.id, league_id=1, period='all').one()
+            self.assertEqual((rollup.points, rollup.predictions), (points, len(user.predictions)))
+        print("test_totals_follow_the_new_rules passed.")
+
+    def test_dry_run_writes_nothing(self):
+        print("Running test_dry_run_writes_nothing...")
+        for match in Match.query.all():
+            score_match(match.id, match.result)
+        db.session.commit()
+        before = self.points()
+        result = rescore_predictions(rules=RULES, dry_run=True)
+        self.assertGreater(result.changed, 0)
+        self.assertEqual(self.points(), before)
+        print("test_dry_run_writes_nothing passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
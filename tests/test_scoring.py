@@ -0,0 +1,141 @@
+import datetime
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import User, League, Team, Match, Prediction, LeaderboardRollup
+from app.scoring import parse_rules, score_match, score_matches, unscored_match_ids
+
+# The default SCORING_RULES, spelled out so the expected points don't depend on the environment
+RULES = parse_rules('exact=3,outcome=1')
+
+
+class ScoringTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(League(id=1, name='Premier League'))
+        db.session.add_all([Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1)])
+        db.session.add_all([User(id=i, username=f'user{i}', password_hash='x', score=0) for i in range(1, 5)])
+        db.session.add(Match(id=1, home_team_id=1, away_team_id=2, date='2025-01-01', result=None))
+        db.session.add_all([
+            Prediction(user_id=1, match_id=1, predicted_result='2-1'),
+            Prediction(user_id=2, match_id=1, predicted_result='1-0'),
+            Prediction(user_id=3, match_id=1, predicted_result='1-1'),
+            Prediction(user_id=4, match_id=1, predicted_result='not a score'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def points(self):
+        db.session.expire_all()
+        return {p.user_id: p.points_awarded for p in Prediction.query.order_by(Prediction.user_id)}
+
+    def test_predicted_result_is_split_into_goals(self):
+        print("Running test_predicted_result_is_split_into_goals...")
+        prediction = Prediction.query.filter_by(user_id=1).first()
+        self.assertEqual((prediction.predicted_home, prediction.predicted_away), (2, 1))
+        self.assertIsNone(Prediction.query.filter_by(user_id=4).first().predicted_home)
+        print("test_predicted_result_is_split_into_goals passed.")
+
+    def test_exact_outcome_and_wrong_predictions(self):
+        print("Running test_exact_outcome_and_wrong_predictions...")
+        self.assertEqual(score_match(1, '2-1', rules=RULES), 4)
+        db.session.commit()
+        self.assertEqual(self.points(), {1: 3, 2: 1, 3: 0, 4: 0})
+        self.assertEqual(Prediction.query.filter(Prediction.scored_at.is_(None)).count(), 0)
+        print("test_exact_outcome_and_wrong_predictions passed.")
+
+    def test_exact_hits_do_not_depend_on_the_rules(self):
+        print("Running test_exact_hits_do_not_depend_on_the_rules...")
+        for rules in ('outcome=1', 'exact=1,outcome=1', ''):
+            score_match(1, '2-1', rules=parse_rules(rules))
+            db.session.commit()
+            db.session.expire_all()
+            flags = {p.user_id: p.exact for p in Prediction.query}
+            self.assertEqual(flags, {1: True, 2: False, 3: False, 4: False})
+            exact = {r.user_id: r.exact for r in LeaderboardRollup.query.filter_by(league_id=1, period='all')}
+            self.assertEqual(exact, {1: 1, 2: 0, 3: 0, 4: 0})
+        print("test_exact_hits_do_not_depend_on_the_rules passed.")
+
+    def test_corrected_result_rescores(self):
+        print("Running test_corrected_result_rescores...")
+        score_match(1, '2-1', rules=RULES)
+        score_match(1, '1-1', rules=RULES)
+        db.session.commit()
+        self.assertEqual(self.points(), {1: 0, 2: 0, 3: 3, 4: 0})
+        print("test_corrected_result_rescores passed.")
+
+    def test_unscored_finished_matches_are_found(self):
+        print("Running test_unscored_finished_matches_are_found...")
+        self.assertEqual(unscored_match_ids(), [])
+        db.session.get(Match, 1).result = '0-2'
+        db.session.commit()
+        self.assertEqual(unscored_match_ids(), [1])
+        self.assertEqual(score_matches(unscored_match_ids()), 4)
+        db.session.commit()
+        self.assertEqual(unscored_match_ids(), [])
+        print("test_unscored_finished_matches_are_found passed.")
+
+    def test_predictions_made_after_kickoff_are_not_scored(self):
+        print("Running test_predictions_made_after_kickoff_are_not_scored...")
+        kickoff = db.session.get(Match, 1).kickoff
+        db.session.add(User(id=5, username='user5', password_hash='x', score=0))
+        db.session.add_all([
+            Prediction(user_id=5, match_id=1, predicted_result='0-2', created_at=kickoff + datetime.timedelta(minutes=90)),
+            Prediction(user_id=2, match_id=2, predicted_result='0-2', created_at=kickoff),
+        ])
+        db.session.add(Match(id=2, home_team_id=1, away_team_id=2, date='2025-01-01', result='0-2'))
+        db.session.get(Match, 1).result = '0-2'
+        db.session.commit()
+        # The catch-up pass skips match 2, whose only prediction came in late
+        self.assertEqual(unscored_match_ids(), [1])
+        self.assertEqual(score_matches([1, 2]), 4)
+        db.session.commit()
+        self.assertEqual(unscored_match_ids(), [])
+        late = Prediction.query.filter_by(user_id=5).one()
+        self.assertEqual((late.scored_at, late.points_awarded), (None, 0))
+        self.assertEqual(self.scores()[5], 0)
+        print("test_predictions_made_after_kickoff_are_not_scored passed.")
+
+    def scores(self):
+        db.session.expire_all()
+        return {u.id: u.score for u in User.query.order_by(User.id)}
+
+    def test_user_scores_follow_scoring_and_rescoring(self):
+        print("Running test_user_scores_follow_scoring_and_rescoring...")
+        score_match(1, '2-1')
+        db.session.commit()
+        self.assertEqual(self.scores(), {1: 3, 2: 1, 3: 0, 4: 0})
+        # Scoring the same result again changes nothing
+        score_match(1, '2-1')
+        db.session.commit()
+        self.assertEqual(self.scores(), {1: 3, 2: 1, 3: 0, 4: 0})
+        # A corrected result moves points, it does not stack them
+        score_match(1, '1-1')
+        db.session.commit()
+        self.assertEqual(self.scores(), {1: 0, 2: 0, 3: 3, 4: 0})
+        print("test_user_scores_follow_scoring_and_rescoring passed.")
+
+    def test_scoring_one_user_leaves_others_alone(self):
+        print("Running test_scoring_one_user_leaves_others_alone...")
+        score_match(1, '2-1', user_id=2)
+        db.session.commit()
+        self.assertEqual(self.scores(), {1: 0, 2: 1, 3: 0, 4: 0})
+        score_match(1, '2-1')
+        db.session.commit()
+        self.assertEqual(self.scores(), {1: 3, 2: 1, 3: 0, 4: 0})
+        print("test_scoring_one_user_leaves_others_alone passed.")
+
+
+
+if __name__ == '__main__':
+    unittest.main()
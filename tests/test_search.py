@@ -0,0 +1,212 @@
+import unittest
+import sys
+import os
+import random
+import time
+from itertools import product
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models import League, Team
+from app.search import autocomplete, include_object, similarity, team_filter, trigrams
+
+
+class SimilarityTestCase(unittest.TestCase):
+    def test_trigrams(self):
+        print("Running test_trigrams...")
+        # Matches pg_trgm's show_trgm('cat')
+        self.assertEqual(trigrams('Cat'), {'  c', ' ca', 'cat', 'at '})
+        self.assertEqual(trigrams('a-b'), {'  a', ' a ', '  b', ' b '})
+        self.assertEqual(trigrams(''), set())
+        print("test_trigrams passed.")
+
+    def test_similarity(self):
+        print("Running test_similarity...")
+        self.assertEqual(similarity('word', 'two words'), 4 / 11)
+        self.assertEqual(similarity('Chelsea', 'chelsea'), 1.0)
+        self.assertEqual(similarity('', 'Chelsea'), 0.0)
+        self.assertGreater(similarity('chelsae', 'Chelsea'), similarity('chelsae', 'Chester'))
+        print("test_similarity passed.")
+
+
+class SearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add_all([League(id=1, name='Premier League'), League(id=2, name='Bundesliga')])
+        names = ['Chelsea FC', 'Manchester United FC', 'Manchester City FC', 'Liverpool FC', 'Chester City',
+                 'Borussia Dortmund', 'Borussia Mönchengladbach', '100% Athletic']
+        db.session.add_all([Team(id=i, name=name, league_id=2 if 'Borussia' in name else 1)
+                            for i, name in enumerate(names, 1)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_autogenerate_keeps_search_index(self):
+        print("Running test_autogenerate_keeps_search_index...")
+        context = MigrationContext.configure(db.session.connection(), opts={'include_object': include_object})
+        removed = [diff[1].name for diff in compare_metadata(context, db.metadata) if diff[0] == 'remove_table']
+        self.assertEqual(removed, [])
+        self.assertFalse(include_object(None, 'ix_teams_name_trgm', 'index', True, None))
+        self.assertTrue(include_object(None, 'teams', 'table', True, None))
+        print("test_autogenerate_keeps_search_index passed.")
+
+    def names(self, term, **kwargs):
+        return [t['name'] for t in autocomplete(term, **kwargs)]
+
+    def test_substring_matches_ranked(self):
+        print("Running test_substring_matches_ranked...")
+        self.assertEqual(self.names('manchester')[:2], ['Manchester City FC', 'Manchester United FC'])
+        self.assertEqual(self.names('manchester', limit=2), ['Manchester City FC', 'Manchester United FC'])
+        self.assertEqual(self.names('BORUSSIA'), ['Borussia Dortmund', 'Borussia Mönchengladbach'])
+        self.assertEqual(self.names('dortmund', league_id=1), [])
+        print("test_substring_matches_ranked passed.")
+
+    def test_typos(self):
+        print("Running test_typos...")
+        self.assertEqual(self.names('chelsae')[0], 'Chelsea FC')
+        self.assertEqual(self.names('liverpol'), ['Liverpool FC'])
+        self.assertEqual(self.names('borusia dortmund')[0], 'Borussia Dortmund')
+        self.assertEqual(self.names('xyzzy'), [])
+        print("test_typos passed.")
+
+    def test_short_terms_are_prefixes(self):
+        print("Running test_short_terms_are_prefixes...")
+        self.assertEqual(self.names('ch'), ['Chelsea FC', 'Chester City'])
+        self.assertEqual(self.names('m', limit=1), ['Manchester City FC'])
+        self.assertEqual(self.names('l'), ['Liverpool FC'])
+        print("test_short_terms_are_prefixes passed.")
+
+    def test_index_follows_team_changes(self):
+        print("Running test_index_follows_team_changes...")
+        db.session.get(Team, 4).name = 'Everton FC'
+        db.session.delete(db.session.get(Team, 1))
+        db.session.add(Team(id=-1, name='Chelsea Women'))
+        db.session.commit()
+        self.assertEqual(self.names('liverpool'), [])
+        self.assertEqual(self.names('everton'), ['Everton FC'])
+        self.assertEqual(self.names('chelsea'), ['Chelsea Women'])
+        print("test_index_follows_team_changes passed.")
+
+    def test_team_filter(self):
+        print("Running test_team_filter...")
+        def matching(term):
+            return sorted(t.name for t in Team.query.filter(team_filter(term)))
+        self.assertEqual(matching('ster'), ['Chester City', 'Manchester City FC', 'Manchester United FC'])
+        self.assertEqual(matching('"'), [])
+        self.assertEqual(matching('0%'), ['100% Athletic'])
+        self.assertEqual(matching('r c'), ['Chester City', 'Manchester City FC'])
+        print("test_team_filter passed.")
+
+
+class AutocompleteBenchmarkTestCase(unittest.TestCase):
+    """autocomplete() has a 10 ms p99 budget on 100k teams, typos included."""
+    TEAMS = 100000
+    RUNS = 20
+    BUDGET_MS = 10
+    REAL_NAMES = ['Chelsea FC', 'Liverpool FC', 'Manchester United FC', 'Borussia Dortmund', 'Real Madrid CF']
+
+    @classmethod
+    def setUpClass(cls):
+        cls.app = create_app(testing=True)
+        cls.ctx = cls.app.app_context()
+        cls.ctx.push()
+        db.create_all()
+        rng = random.Random(0)
+        syllables = [a + b for a, b in product(['b', 'br', 'c', 'ch', 'd', 'g', 'l', 'm', 'n', 'p', 'r', 's', 'st',
+                                                't', 'tr', 'v'], ['a', 'e', 'i', 'o', 'u', 'ou'])]
+        syllables += ['man', 'ches', 'ter', 'liv', 'er', 'pool', 'sea', 'dort', 'mund', 'mad', 'rid', 'us', 'sia']
+        names = set(cls.REAL_NAMES)
+        while len(names) < cls.TEAMS:
+            word = ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 3))).capitalize()
+            names.add(' '.join(filter(None, [rng.choice(['FC', 'AC', 'Real', 'Sporting', 'United', '']), word,
+                                             rng.choice(['', 'Town', 'City', str(rng.randint(1, 999))])])))
+        db.session.execute(Team.__table__.insert(), [{'id': i, 'name': name} for i, name in enumerate(names, 1)])
+        db.session.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        db.session.remove()
+        db.drop_all()
+        cls.ctx.pop()
+
+    def test_p99_within_budget(self):
+        print("Running test_p99_within_budget...")
+        # Prefixes, substrings, common words and typos, which take the fuzzy path
+        terms = ['m', 'ch', 'man', 'real mad', 'sporting', 'town', 'chelsae', 'liverpol', 'manchestr',
+                 'borusia dortmund', 'xyzzy']
+        timings = []
+        for term in terms:
+            autocomplete(term)
+            for _ in range(self.RUNS):
+                start = time.perf_counter()
+                autocomplete(term)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99)]
+        self.assertLess(p99, self.BUDGET_MS, f'p99 {p99:.1f} ms')
+        self.assertEqual(autocomplete('chelsae')[0]['name'], 'Chelsea FC')
+        self.assertEqual(autocomplete('liverpol')[0]['name'], 'Liverpool FC')
+        print("test_p99_within_budget passed.")
+
+
+@unittest.skipUnless(os.environ.get('SQLALCHEMY_DATABASE_URI', '').startswith('postgresql'),
+                     'needs SQLALCHEMY_DATABASE_URI pointing at PostgreSQL')
+class PostgresSearchTestCase(unittest.TestCase):
+    """
+    The pg_trgm path, against the database in SQLALCHEMY_DATABASE_URI. Every
+    table lives in a schema of its own inside one transaction that is rolled
+    back, so a migrated database is left as it was.
+    """
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        connection = db.session.connection()
+        connection.execute(text('CREATE SCHEMA search_test'))
+        # public stays on the path for pg_trgm, if it's already installed there
+        connection.execute(text('SET LOCAL search_path TO search_test, public'))
+        db.metadata.create_all(connection, checkfirst=False)
+        db.session.add_all([Team(id=i, name=name) for i, name in enumerate(
+            ['Chelsea FC', 'Chester City', 'Liverpool FC', 'Manchester United FC', 'Manchester City FC'], 1)])
+        db.session.flush()
+
+    def tearDown(self):
+        db.session.rollback()
+        db.session.remove()
+        self.ctx.pop()
+
+    def names(self, term):
+        return [t['name'] for t in autocomplete(term)]
+
+    def test_autocomplete(self):
+        print("Running test_autocomplete...")
+        self.assertEqual(self.names('manchester')[:2], ['Manchester City FC', 'Manchester United FC'])
+        self.assertEqual(self.names('chelsae')[0], 'Chelsea FC')
+        self.assertEqual(self.names('liverpol'), ['Liverpool FC'])
+        self.assertEqual(self.names('ch'), ['Chelsea FC', 'Chester City'])
+        self.assertEqual(self.names('xyzzy'), [])
+        print("test_autocomplete passed.")
+
+    def test_uses_trigram_index(self):
+        print("Running test_uses_trigram_index...")
+        db.session.execute(text('SET LOCAL enable_seqscan TO off'))
+        # The condition autocomplete() puts on terms of MIN_TRIGRAM_TERM characters or more
+        plan = '\n'.join(row[0] for row in db.session.execute(
+            text('EXPLAIN SELECT id FROM teams WHERE name ILIKE :pattern OR name % :term'),
+            {'pattern': '%chelsae%', 'term': 'chelsae'}))
+        self.assertIn('ix_teams_name_trgm', plan)
+        print("test_uses_trigram_index passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
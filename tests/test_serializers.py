@@ -0,0 +1,116 @@
+import datetime
+import json
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from app import create_app, db
+from app.models import League, Team, Match, Prediction
+from app.serializers import MATCH, PREDICTION, TEAM, kickoff_iso
+
+
+class SerializerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(League(id=1, name='Premier League'))
+            db.session.add_all([Team(id=i, name=f'Team {i}', league_id=1, stadium=f'Ground {i}') for i in range(1, 41)])
+            db.session.add_all([
+                Match(id=i, home_team_id=i, away_team_id=41 - i, date=f'2025-02-{i:02d}', result='1-0' if i < 5 else None)
+                for i in range(1, 21)
+            ])
+            db.session.commit()
+        self.client.post('/api/v1/register', json={'username': 'serializer', 'password': 'password123'})
+        response = self.client.post('/api/v1/login', json={'username': 'serializer', 'password': 'password123'})
+        data = json.loads(response.data)
+        self.user_id, self.headers = data['user_id'], {'Authorization': f"Bearer {data['token']}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def queries(self, url):
+        """Number of SQL statements a GET of `url` runs."""
+        statements = []
+        with self.app.app_context():
+            engine = db.engine
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            response = self.client.get(url, headers=self.headers)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_payloads(self):
+        print("Running test_payloads...")
+        with self.app.app_context():
+            match = db.session.get(Match, 1)
+            self.assertEqual(MATCH.dump(match), {
+                'id': 1, 'home_team': 'Team 1', 'away_team': 'Team 40', 'date': '2025-02-01',
+                'kickoff': '2025-02-01T00:00:00Z', 'result': '1-0',
+            })
+            team = db.session.get(Team, 2)
+            self.assertEqual(TEAM.dump(team, favourite=True), {
+                'id': 2, 'name': 'Team 2', 'logo_url': None, 'stadium': 'Ground 2', 'league_id': 1, 'favourite': True,
+            })
+            prediction = Prediction(id=1, user_id=self.user_id, match_id=1, predicted_result='1-0', points_awarded=3, exact=True)
+            db.session.add(prediction)
+            db.session.flush()
+            self.assertEqual(PREDICTION.dump(prediction), {
+                'id': 1, 'match_id': 1, 'home_team': 'Team 1', 'away_team': 'Team 40', 'date': '2025-02-01',
+                'predicted_result': '1-0', 'actual_result': '1-0', 'points': 3, 'correct': True,
+            })
+        self.assertIsNone(kickoff_iso(None))
+        self.assertEqual(kickoff_iso(datetime.datetime(2025, 1, 4, 15, 0)), '2025-01-04T15:00:00Z')
+        print("test_payloads passed.")
+
+    def test_list_query_count_is_flat(self):
+        print("Running test_list_query_count_is_flat...")
+        # count=0: the cached total would otherwise make the second request cheaper
+        for url in ('/api/v1/matches?count=0&per_page={}', '/api/v1/teams?count=0&per_page={}',
+                    '/api/v1/matches?count=0&finished=1&per_page={}'):
+            self.assertEqual(self.queries(url.format(2)), self.queries(url.format(20)), url)
+        print("test_list_query_count_is_flat passed.")
+
+    def test_team_and_relevant_matches_query_count(self):
+        print("Running test_team_and_relevant_matches_query_count...")
+        # Team 1 plays one match, team 10 two (home and away)
+        self.assertEqual(self.queries('/api/v1/teams/1/matches'), self.queries('/api/v1/teams/10/matches'))
+        upcoming = (datetime.date.today() + datetime.timedelta(days=7)).isoformat()
+        with self.app.app_context():
+            db.session.add(Match(id=21, home_team_id=1, away_team_id=21, date=upcoming))
+            db.session.commit()
+        few = self.queries('/api/v1/matches/relevant?count=0')
+        with self.app.app_context():
+            db.session.add_all([Match(id=i, home_team_id=i - 20, away_team_id=i, date=upcoming) for i in range(22, 41)])
+            db.session.commit()
+        self.assertEqual(self.queries('/api/v1/matches/relevant?count=0'), few)
+        print("test_team_and_relevant_matches_query_count passed.")
+
+    def test_predictions_query_count(self):
+        print("Running test_predictions_query_count...")
+        with self.app.app_context():
+            db.session.add(Prediction(user_id=self.user_id, match_id=1, predicted_result='1-0'))
+            db.session.commit()
+            one = self.queries('/api/v1/predictions')
+            db.session.add_all([Prediction(user_id=self.user_id, match_id=i, predicted_result='2-2') for i in range(2, 21)])
+            db.session.commit()
+        self.assertEqual(self.queries('/api/v1/predictions'), one)
+        data = json.loads(self.client.get('/api/v1/predictions', headers=self.headers).data)
+        self.assertEqual(len(data), 20)
+        self.assertEqual(data[0]['home_team'], 'Team 1')
+        self.assertEqual(data[-1]['away_team'], 'Team 21')
+        print("test_predictions_query_count passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import threading
+import time
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.SingleFlight import SingleFlight
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def run_concurrently(self, flights, key, fn, callers=5):
+        results, errors = [], []
+        self.arrived = 0
+
+        def call():
+            self.arrived += 1
+            try:
+                results.append(flights.do(key, fn))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        for t in threads:
+            t.start()
+        return threads, results, errors
+
+    def test_concurrent_callers_share_one_call(self):
+        print("Running test_concurrent_callers_share_one_call...")
+        flights = SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            # Stay in flight until every caller has arrived
+            deadline = time.monotonic() + 5
+            while self.arrived < 5 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.1)
+            return {'wins': 3}
+
+        threads, results, errors = self.run_concurrently(flights, 'team-stats:1', slow)
+        for t in threads:
+            t.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(errors, [])
+        self.assertEqual([r[0] for r in results], [{'wins': 3}] * 5)
+        self.assertEqual(sum(1 for r in results if not r[1]), 1)
+        self.assertEqual(flights.in_flight(), 0)
+        print("test_concurrent_callers_share_one_call passed.")
+
+    def test_errors_are_shared_and_not_remembered(self):
+        print("Running test_errors_are_shared_and_not_remembered...")
+        flights = SingleFlight()
+
+        def boom():
+            raise RuntimeError('upstream down')
+
+        with self.assertRaises(RuntimeError):
+            flights.do('k', boom)
+        # The next call runs again instead of replaying the failure
+        self.assertEqual(flights.do('k', lambda: 42), (42, False))
+        print("test_errors_are_shared_and_not_remembered passed.")
+
+    def test_different_keys_run_independently(self):
+        print("Running test_different_keys_run_independently...")
+        flights = SingleFlight()
+        self.assertEqual(flights.do('a', lambda: 1), (1, False))
+        self.assertEqual(flights.do('b', lambda: 2), (2, False))
+        print("test_different_keys_run_independently passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import League, Team
+from app.team_resolver import TeamResolver, get_resolver, normalize
+
+
+class TeamResolverTestCase(unittest.TestCase):
+    TEAMS = [
+        (57, 'Arsenal FC'),
+        (65, 'Manchester City FC'),
+        (66, 'Manchester United FC'),
+        (1, '1. FC Köln'),
+        (113, 'SSC Napoli'),
+        (5, 'FC Bayern München'),
+    ]
+
+    def setUp(self):
+        self.resolver = TeamResolver(self.TEAMS)
+
+    def test_normalize_strips_accents_and_punctuation(self):
+        print("Running test_normalize_strips_accents_and_punctuation...")
+        self.assertEqual(normalize('1. FC Köln'), '1 fc koln')
+        self.assertEqual(normalize('Brighton & Hove Albion'), 'brighton and hove albion')
+        print("test_normalize_strips_accents_and_punctuation passed.")
+
+    def test_exact_and_alias_lookups(self):
+        print("Running test_exact_and_alias_lookups...")
+        self.assertEqual(self.resolver.resolve('Arsenal FC'), 57)
+        self.assertEqual(self.resolver.resolve('arsenal'), 57)
+        self.assertEqual(self.resolver.resolve('Koln'), 1)
+        self.assertEqual(self.resolver.resolve('Napoli'), 113)
+        self.assertEqual(self.resolver.resolve('Bayern Munchen'), 5)
+        self.assertEqual(self.resolver.resolve('ManchesterCity'), 65)
+        print("test_exact_and_alias_lookups passed.")
+
+    def test_known_id_wins_over_name(self):
+        print("Running test_known_id_wins_over_name...")
+        self.assertEqual(self.resolver.resolve('Someone Else', 66), 66)
+        self.assertEqual(self.resolver.resolve('Arsenal', 9999), 57)
+        self.assertIsNone(self.resolver.resolve(None, 9999))
+        print("test_known_id_wins_over_name passed.")
+
+    def test_fuzzy_lookup_rejects_ambiguous_names(self):
+        print("Running test_fuzzy_lookup_rejects_ambiguous_names...")
+        self.assertEqual(self.resolver.resolve('Arsenall FC'), 57)
+        # Equally close to City and United
+        self.assertIsNone(self.resolver.resolve('Manchester FC'))
+        self.assertIsNone(self.resolver.resolve('Real Madrid CF'))
+        print("test_fuzzy_lookup_rejects_ambiguous_names passed.")
+
+
+class TeamResolverRefreshTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(League(id=1, name='Premier League'))
+        db.session.add(Team(id=57, name='Arsenal FC', league_id=1))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_index_is_rebuilt_after_team_changes(self):
+        print("Running test_index_is_rebuilt_after_team_changes...")
+        resolver = get_resolver()
+        self.assertIs(get_resolver(), resolver)
+        self.assertIsNone(resolver.resolve('Chelsea'))
+        db.session.add(Team(id=61, name='Chelsea FC', league_id=1))
+        db.session.commit()
+        self.assertEqual(get_resolver().resolve('Chelsea'), 61)
+        db.session.get(Team, 61).name = 'Chelsea Football Club'
+        db.session.commit()
+        self.assertEqual(get_resolver().resolve('Chelsea Football Club'), 61)
+        print("test_index_is_rebuilt_after_team_changes passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
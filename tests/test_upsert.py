@@ -0,0 +1,75 @@
+import unittest
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db
+from app.models import League, Team, Match
+from app.upsert import bulk_upsert
+
+
+class BulkUpsertTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(testing=True)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        db.session.add(League(id=1, name='Premier League'))
+        db.session.add_all([Team(id=1, name='Chelsea', league_id=1), Team(id=2, name='Arsenal', league_id=1)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def match_rows(self, results):
+        return [
+            {'id': i, 'home_team_id': 1, 'away_team_id': 2, 'date': f'2025-01-0{i}', 'result': result}
+            for i, result in enumerate(results, start=1)
+        ]
+
+    def test_inserts_new_rows(self):
+        print("Running test_inserts_new_rows...")
+        result = bulk_upsert(Match, self.match_rows(['1-0', None, None]), chunk_size=2)
+        db.session.commit()
+        self.assertEqual(result.as_dict(), {'inserted': 3, 'updated': 0, 'unchanged': 0})
+        self.assertEqual(Match.query.count(), 3)
+        print("test_inserts_new_rows passed.")
+
+    def test_updates_changed_rows_and_skips_unchanged(self):
+        print("Running test_updates_changed_rows_and_skips_unchanged...")
+        bulk_upsert(Match, self.match_rows(['1-0', None, None]))
+        db.session.commit()
+        result = bulk_upsert(Match, self.match_rows(['1-0', '2-2', None]) + self.match_rows([None] * 4)[3:], chunk_size=2)
+        db.session.commit()
+        self.assertEqual(result.as_dict(), {'inserted': 1, 'updated': 1, 'unchanged': 2})
+        self.assertEqual(db.session.get(Match, 2).result, '2-2')
+        self.assertEqual(Match.query.count(), 4)
+        print("test_updates_changed_rows_and_skips_unchanged passed.")
+
+    def test_duplicate_keys_in_input_are_written_once(self):
+        print("Running test_duplicate_keys_in_input_are_written_once...")
+        rows = self.match_rows([None]) + self.match_rows(['3-1'])
+        result = bulk_upsert(Match, rows)
+        db.session.commit()
+        self.assertEqual(result.inserted, 1)
+        self.assertEqual(db.session.get(Match, 1).result, '3-1')
+        print("test_duplicate_keys_in_input_are_written_once passed.")
+
+    def test_only_listed_columns_are_updated(self):
+        print("Running test_only_listed_columns_are_updated...")
+        db.session.get(Team, 1).favourite = True
+        db.session.commit()
+        result = bulk_upsert(Team, [{'id': 1, 'name': 'Chelsea FC', 'league_id': 1}])
+        db.session.commit()
+        db.session.expire_all()
+        team = db.session.get(Team, 1)
+        self.assertEqual(result.updated, 1)
+        self.assertEqual(team.name, 'Chelsea FC')
+        self.assertTrue(team.favourite)
+        print("test_only_listed_columns_are_updated passed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
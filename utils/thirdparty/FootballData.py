@@ -1,24 +1,87 @@
+import datetime
+import re
+
 from settings import FOOTBALL_DATA_API_KEY
-import requests
+from utils.thirdparty.HttpClient import default_client, UpstreamError
+
+# How long a cached response stays fresh, in seconds. First matching path wins.
+CACHE_TTLS = [
+    (re.compile(r"^/competitions/[^/]+$"), 24 * 3600),  # Competition metadata
+    (re.compile(r"/teams$"), 24 * 3600),  # Team lists and team search
+    (re.compile(r"/matches$"), 5 * 60),  # Fixtures, live and recent results
+]
+DEFAULT_CACHE_TTL = 3600
+# Fixture windows that ended before today only change on rare corrections
+FINISHED_MATCHES_TTL = 24 * 3600
+
+
+def cache_ttl(path, params=None):
+    date_to = (params or {}).get("dateTo")
+    if path.endswith("/matches") and date_to and date_to < datetime.date.today().isoformat():
+        return FINISHED_MATCHES_TTL
+    for pattern, ttl in CACHE_TTLS:
+        if pattern.search(path):
+            return ttl
+    return DEFAULT_CACHE_TTL
+
 
 class FootballData:
-    def __init__(self):
+    def __init__(self, http=None):
         self.api_base_url = "https://api.football-data.org/v4"
         self.api_key = FOOTBALL_DATA_API_KEY
         self.headers = {"X-Auth-Token": self.api_key}
+        self.http = http or default_client()
+
+    def _get(self, url, params=None):
+        """Decoded JSON body, or None once the shared client has given up retrying or the quota is spent."""
+        ttl = cache_ttl(url[len(self.api_base_url):], params)
+        try:
+            return self.http.get_json(url, params=params, headers=self.headers, ttl=ttl)
+        except UpstreamError as e:
+            print(f"Football-Data.org request failed: {e}")
+            return None
 
     def search_team_by_name(self, team_name):
-        url = f"{self.api_base_url}/teams?name={team_name}"
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
+        url = f"{self.api_base_url}/teams"
+        data = self._get(url, params={"name": team_name})
+        if data is not None:
             return data.get("teams", [])
         return []
 
-    def fetch_matches_for_team(self, team_id):
+    def fetch_competition(self, code):
+        url = f"{self.api_base_url}/competitions/{code}"
+        return self._get(url)
+
+    def fetch_teams_for_competition(self, code):
+        url = f"{self.api_base_url}/competitions/{code}/teams"
+        data = self._get(url)
+        if data is not None:
+            return data.get("teams", [])
+        return None
+
+    def fetch_matches_for_competition(self, code, season=None, date_from=None, date_to=None):
+        # One call returns every fixture of the competition, each exactly once
+        url = f"{self.api_base_url}/competitions/{code}/matches"
+        params = {}
+        if season:
+            params["season"] = season
+        if date_from:
+            params["dateFrom"] = date_from
+        if date_to:
+            params["dateTo"] = date_to
+        data = self._get(url, params=params)
+        if data is not None:
+            return data.get("matches", [])
+        return None
+
+    def fetch_matches_for_team(self, team_id, date_from=None, date_to=None):
         url = f"{self.api_base_url}/teams/{team_id}/matches"
-        response = requests.get(url, headers=self.headers)
-        if response.status_code == 200:
-            data = response.json()
+        params = {}
+        if date_from:
+            params["dateFrom"] = date_from
+        if date_to:
+            params["dateTo"] = date_to
+        data = self._get(url, params=params)
+        if data is not None:
             return data.get("matches", [])
-        return [] 
\ No newline at end of file
+        return None
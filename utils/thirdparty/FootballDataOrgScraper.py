@@ -1,18 +1,32 @@
-import os
-import requests
 from settings import FOOTBALL_DATA_API_KEY
+from utils.thirdparty.HttpClient import default_client, UpstreamError
+from utils.thirdparty.CircuitBreaker import CircuitBreaker
+from utils.thirdparty.FootballData import cache_ttl
 from app.models import Team, League  # Add this import
 from app import db  # Add this import
+from app.team_resolver import get_resolver
 
 class FootballDataOrgScraper:
     API_BASE_URL = "https://api.football-data.org/v4"
 
-    def __init__(self):
+    # Interactive callers can't sit through a full retry ladder; a stale cached answer is better
+    MAX_RETRIES = 1
+    # ...nor queue for long behind the seeder on the shared outbound quota
+    MAX_QUOTA_WAIT = 2
+
+    def __init__(self, http=None):
         self.headers = {"X-Auth-Token": FOOTBALL_DATA_API_KEY}
+        self.http = http or default_client()
+        # Set by each fetch: whether the data came from an expired cache entry, and whether upstream answered
+        self.stale = False
+        self.upstream_available = True
 
     def fetch_matches_for_team(self, team_name):
+        self.stale = False
+        self.upstream_available = True
         # 1. Get team from DB
-        team = Team.query.filter(Team.name.ilike(team_name)).first()
+        team_id = get_resolver().resolve(team_name)
+        team = db.session.get(Team, team_id) if team_id else None
         if not team:
             return []
         team_id = team.id  # Use the primary key as the Football-Data.org team ID
@@ -22,13 +36,20 @@ class FootballDataOrgScraper:
         league = League.query.get(team.league_id) if team.league_id else None
         fd_competition = league.fd_competition if league and league.fd_competition else None
         # 3. Build matches URL with competition filter if available
-        matches_url = f"{self.API_BASE_URL}/teams/{team_id}/matches"
-        if fd_competition:
-            matches_url += f"?competitions={fd_competition}"
-        resp = requests.get(matches_url, headers=self.headers)
-        if resp.status_code != 200:
+        path = f"/teams/{team_id}/matches"
+        params = {"competitions": fd_competition} if fd_competition else None
+        try:
+            fetched = self.http.fetch(self.API_BASE_URL + path, params=params, headers=self.headers,
+                                      ttl=cache_ttl(path, params), allow_stale=True, max_retries=self.MAX_RETRIES,
+                                      max_wait=self.MAX_QUOTA_WAIT)
+        except UpstreamError as e:
+            print(f"Football-Data.org request failed: {e}")
+            self.upstream_available = False
             return []
-        matches_data = resp.json().get("matches", [])
+        data = fetched.data
+        self.stale = fetched.stale
+        self.upstream_available = self.http.breaker.state != CircuitBreaker.OPEN
+        matches_data = data.get("matches", [])
         matches = []
         for m in matches_data:
             home_team = m["homeTeam"]["name"]
@@ -40,9 +61,13 @@ class FootballDataOrgScraper:
                 if ft["home"] is not None and ft["away"] is not None:
                     result = f"{ft['home']}-{ft['away']}"
             matches.append({
+                "id": m["id"],
                 "home_team": home_team,
+                "home_team_id": m["homeTeam"].get("id"),
                 "away_team": away_team,
+                "away_team_id": m["awayTeam"].get("id"),
                 "date": date,
+                "kickoff": m["utcDate"],
                 "result": result
             })
         return matches 
\ No newline at end of file
@@ -0,0 +1,325 @@
+import email.utils
+import random
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from settings import (
+    FOOTBALL_DATA_BREAKER_FAILURES,
+    FOOTBALL_DATA_BREAKER_RESET,
+    FOOTBALL_DATA_CACHE_ENABLED,
+    FOOTBALL_DATA_CONNECT_TIMEOUT,
+    FOOTBALL_DATA_READ_TIMEOUT,
+    FOOTBALL_DATA_MAX_RETRIES,
+    FOOTBALL_DATA_POOL_SIZE,
+    FOOTBALL_DATA_QUOTA_ENABLED,
+)
+from utils.SingleFlight import SingleFlight
+from utils.thirdparty.CircuitBreaker import CircuitBreaker
+from utils.thirdparty.ResponseCache import ResponseCache
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream request still fails after all retries."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+UpstreamResult = namedtuple('UpstreamResult', 'data stale')
+
+
+class HttpClient:
+    """
+    Keep-alive HTTP client shared by the Football-Data.org wrappers.
+
+    One requests.Session with a pooled adapter is reused for every call, so
+    TCP and TLS handshakes happen once per connection instead of once per
+    request. 429s, 5xx responses and connection errors are retried with
+    exponential backoff and jitter. A Retry-After header, or an exhausted
+    X-Requests-Available-Minute counter with X-RequestCounter-Reset, sets the
+    wait instead. Call counts, retries and latency are kept for stats().
+
+    With a ResponseCache, get_json(..., ttl=seconds) serves fresh entries from
+    disk without any request. Expired entries are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 is answered from disk.
+
+    With a QuotaGovernor, every attempt that actually goes upstream first takes
+    a slot from the bucket shared by all processes on the box, and the quota
+    headers the API returns are written back to that bucket.
+
+    Identical requests made concurrently by several threads are coalesced:
+    one goes upstream and the others wait for and share its decoded body.
+
+    Transient failures feed a CircuitBreaker. Once it opens, callers that
+    accept stale data get the last good cached body straight away (see fetch)
+    and nobody waits on timeouts against a dead upstream.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=FOOTBALL_DATA_POOL_SIZE, connect_timeout=FOOTBALL_DATA_CONNECT_TIMEOUT,
+                 read_timeout=FOOTBALL_DATA_READ_TIMEOUT, max_retries=FOOTBALL_DATA_MAX_RETRIES,
+                 backoff_base=0.5, backoff_max=60.0, session=None, sleep=time.sleep, cache=None,
+                 breaker=None, quota=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self.cache = cache
+        self.quota = quota
+        self.breaker = breaker or CircuitBreaker(FOOTBALL_DATA_BREAKER_FAILURES, FOOTBALL_DATA_BREAKER_RESET)
+        # Cache keys with a background refresh in flight
+        self._refreshing = set()
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0, 'retries': 0, 'failures': 0, 'cache_hits': 0, 'not_modified': 0,
+            'stale_served': 0, 'short_circuited': 0, 'coalesced': 0,
+            'latency_total': 0.0, 'latency_max': 0.0,
+        }
+        self._requests_available = None
+        # Monotonic time before which nobody in this process should call upstream, used without a QuotaGovernor
+        self._paused_until = 0.0
+
+    def get_json(self, url, params=None, headers=None, ttl=None, max_wait=None):
+        """
+        GET `url` and return the decoded JSON body, retrying transient failures.
+        Pass `ttl` (seconds) to cache the response; ttl=None bypasses the cache.
+        `max_wait` caps how long to block on the quota before QuotaExceededError.
+        """
+        return self.fetch(url, params=params, headers=headers, ttl=ttl, max_wait=max_wait).data
+
+    def fetch(self, url, params=None, headers=None, ttl=None, max_wait=None, allow_stale=False, max_retries=None,
+              coalesce=True):
+        """
+        Like get_json, but returns an UpstreamResult carrying a `stale` flag.
+
+        With allow_stale=True an expired cache entry is returned at once and
+        revalidated on a background thread, one refresh per URL at a time.
+        While the circuit is open that refresh doubles as the breaker's single
+        half-open probe. Without a cached body, an open circuit raises
+        CircuitOpenError immediately instead of waiting on a dead upstream.
+        Pass coalesce=False to always make a request of your own.
+        """
+        cache = self.cache if ttl is not None else None
+        entry = None
+        if cache:
+            entry = cache.get(ResponseCache.key_for(url, params))
+            if entry and entry.fresh:
+                with self._lock:
+                    self._stats['cache_hits'] += 1
+                return UpstreamResult(entry.body, False)
+
+        if allow_stale and entry:
+            if self.breaker.allow():
+                self._refresh_in_background(url, params, headers, ttl, max_wait, entry)
+            with self._lock:
+                self._stats['stale_served'] += 1
+            return UpstreamResult(entry.body, True)
+
+        if not self.breaker.allow():
+            with self._lock:
+                self._stats['short_circuited'] += 1
+            raise CircuitOpenError(f"GET {url} skipped: circuit open after repeated upstream failures")
+        request = lambda: self._request(url, params, headers, ttl, max_wait, entry, max_retries)
+        if not coalesce:
+            return UpstreamResult(request(), False)
+        data, shared = self._flights.do(ResponseCache.key_for(url, params), request)
+        if shared:
+            with self._lock:
+                self._stats['coalesced'] += 1
+        return UpstreamResult(data, False)
+
+    def _request(self, url, params, headers, ttl, max_wait, entry, max_retries=None):
+        cache = self.cache if ttl is not None else None
+        key = ResponseCache.key_for(url, params)
+        if max_retries is None:
+            max_retries = self.max_retries
+        if entry:
+            headers = dict(headers or {})
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        attempt = 0
+        while True:
+            if self.quota:
+                try:
+                    self.quota.acquire(max_wait)
+                except UpstreamError:
+                    # QuotaExceededError: nothing went upstream, so this can't settle a half-open breaker
+                    self.breaker.release()
+                    raise
+            else:
+                self._wait_for_quota()
+            response, error = None, None
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = e
+            self._observe(time.perf_counter() - started, response)
+
+            if response is not None and response.status_code == 304 and entry:
+                self.breaker.record_success()
+                with self._lock:
+                    self._stats['not_modified'] += 1
+                cache.touch(key, ttl)
+                return entry.body
+            if response is not None and response.status_code == 200:
+                try:
+                    data = response.json()
+                except ValueError:
+                    # A truncated or non-JSON body: nothing to cache, and callers only handle UpstreamError
+                    with self._lock:
+                        self._stats['failures'] += 1
+                    self.breaker.record_failure()
+                    raise UpstreamError(f"GET {url} returned a body that is not valid JSON", 200)
+                self.breaker.record_success()
+                if cache:
+                    cache.put(key, response.text, response.headers.get('ETag'),
+                              response.headers.get('Last-Modified'), ttl)
+                return data
+            status = response.status_code if response is not None else None
+            transient = error is not None or status in self.RETRY_STATUSES
+            if not transient or attempt >= max_retries:
+                # A 4xx means the upstream is up and answering, so only transient errors trip the breaker
+                if transient:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                with self._lock:
+                    self._stats['failures'] += 1
+                reason = f"HTTP {status}" if error is None else repr(error)
+                raise UpstreamError(f"GET {url} failed after {attempt + 1} attempt(s): {reason}", status)
+
+            with self._lock:
+                self._stats['retries'] += 1
+            self._sleep(self._retry_delay(response, attempt))
+            attempt += 1
+
+    def _refresh_in_background(self, url, params, headers, ttl, max_wait, entry):
+        key = ResponseCache.key_for(url, params)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._request(url, params, headers, ttl, max_wait, entry, max_retries=0)
+            except UpstreamError as e:
+                print(f"Background refresh failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name='upstream-refresh', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            calls = self._stats['calls']
+            return {
+                'calls': calls,
+                'retries': self._stats['retries'],
+                'failures': self._stats['failures'],
+                'cache_hits': self._stats['cache_hits'],
+                'not_modified': self._stats['not_modified'],
+                'stale_served': self._stats['stale_served'],
+                'short_circuited': self._stats['short_circuited'],
+                'coalesced': self._stats['coalesced'],
+                'breaker_state': self.breaker.state,
+                'latency_avg_ms': round(self._stats['latency_total'] / calls * 1000, 1) if calls else 0.0,
+                'latency_max_ms': round(self._stats['latency_max'] * 1000, 1),
+                'requests_available': self._requests_available,
+            }
+
+    def _observe(self, latency, response):
+        available = reset = None
+        if response is not None:
+            available = _int_header(response, 'X-Requests-Available-Minute')
+            reset = _int_header(response, 'X-RequestCounter-Reset')
+        with self._lock:
+            self._stats['calls'] += 1
+            self._stats['latency_total'] += latency
+            self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            if available is None:
+                return
+            self._requests_available = available
+            if available <= 0 and reset and not self.quota:
+                self._paused_until = max(self._paused_until, time.monotonic() + reset)
+        if self.quota:
+            self.quota.sync(available, reset)
+
+    def _wait_for_quota(self):
+        with self._lock:
+            wait = self._paused_until - time.monotonic()
+        if wait > 0:
+            self._sleep(min(wait, self.backoff_max))
+
+    def _retry_delay(self, response, attempt):
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        if response is not None:
+            retry_after = _retry_after_seconds(response.headers.get('Retry-After'))
+            if retry_after is None and _int_header(response, 'X-Requests-Available-Minute') == 0:
+                retry_after = _int_header(response, 'X-RequestCounter-Reset')
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+        return min(delay, self.backoff_max)
+
+
+def _int_header(response, name):
+    try:
+        return int(response.headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _retry_after_seconds(value):
+    """Retry-After is either a number of seconds or an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def default_client():
+    """The process-wide HttpClient, created on first use."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            # Imported here: QuotaGovernor raises an UpstreamError subclass defined in this module
+            from utils.thirdparty.QuotaGovernor import QuotaGovernor
+            _default_client = HttpClient(
+                cache=ResponseCache() if FOOTBALL_DATA_CACHE_ENABLED else None,
+                quota=QuotaGovernor() if FOOTBALL_DATA_QUOTA_ENABLED else None,
+            )
+        return _default_client
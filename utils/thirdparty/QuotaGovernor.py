@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from settings import (
+    FOOTBALL_DATA_REQUESTS_PER_MINUTE,
+    FOOTBALL_DATA_QUOTA_BURST,
+    FOOTBALL_DATA_QUOTA_MAX_WAIT,
+    FOOTBALL_DATA_QUOTA_PATH,
+)
+from utils.thirdparty.HttpClient import UpstreamError
+
+
+class QuotaExceededError(UpstreamError):
+    """Raised when no request slot frees up within the caller's max_wait."""
+
+    def __init__(self, message, wait):
+        super().__init__(message, 429)
+        self.wait = wait
+
+
+class QuotaGovernor:
+    """
+    Token bucket for outbound Football-Data.org calls, shared by every
+    process on the box (gunicorn workers, cron seeding, shells).
+
+    The bucket lives in a small SQLite file. acquire() reserves the next free
+    slot inside a BEGIN IMMEDIATE transaction, so concurrent processes queue
+    up one after another instead of each spending the whole per-minute quota.
+    A caller that would have to wait longer than `max_wait` gets a
+    QuotaExceededError and its reservation is not taken.
+    """
+
+    def __init__(self, path=FOOTBALL_DATA_QUOTA_PATH, calls_per_minute=FOOTBALL_DATA_REQUESTS_PER_MINUTE,
+                 burst=FOOTBALL_DATA_QUOTA_BURST, max_wait=FOOTBALL_DATA_QUOTA_MAX_WAIT, name='football-data',
+                 clock=time.time, sleep=time.sleep):
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute must be positive")
+        self.path = path
+        self.rate = calls_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_wait = max_wait
+        self.name = name
+        self._clock = clock
+        self._sleep = sleep
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+        finally:
+            conn.close()
+
+    def acquire(self, max_wait=None):
+        """Block until a request slot is ours. Returns the time waited in seconds."""
+        max_wait = self.max_wait if max_wait is None else max_wait
+        with self._bucket() as (tokens, save):
+            # Tokens may go negative: that is a reservation for a future slot
+            tokens -= 1
+            wait = -tokens / self.rate if tokens < 0 else 0.0
+            if wait > max_wait:
+                raise QuotaExceededError(
+                    f"Football-Data.org quota exhausted: next slot in {wait:.1f}s, caller waits at most {max_wait:.1f}s",
+                    wait,
+                )
+            save(tokens)
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def sync(self, available, reset=None):
+        """
+        Align the bucket with the quota the upstream reports. The API key's
+        counter is authoritative: it also counts calls made from other boxes.
+        """
+        with self._bucket() as (tokens, save):
+            target = float(available)
+            if available <= 0 and reset:
+                # Next slot opens exactly when the upstream counter resets
+                target = 1 - reset * self.rate
+            if target < tokens:
+                save(target)
+
+    def available(self):
+        with self._bucket() as (tokens, save):
+            return tokens
+
+    @contextmanager
+    def _bucket(self):
+        """Yield (tokens refilled to now, save) while holding the bucket's write lock."""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = self._clock()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE name = ?", (self.name,)).fetchone()
+            tokens, updated_at = row if row else (float(self.burst), now)
+            tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+
+            def save(value):
+                conn.execute(
+                    "INSERT INTO buckets (name, tokens, updated_at) VALUES (?, ?, ?)"
+                    " ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                    (self.name, value, now),
+                )
+
+            try:
+                yield tokens, save
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def _connect(self):
+        # Autocommit mode so BEGIN IMMEDIATE is ours to issue
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
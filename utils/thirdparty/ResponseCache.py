@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlencode
+
+from settings import FOOTBALL_DATA_CACHE_PATH, FOOTBALL_DATA_CACHE_MAX_BYTES
+
+
+CacheEntry = namedtuple('CacheEntry', 'body etag last_modified fresh')
+
+
+class ResponseCache:
+    """
+    Persistent cache of upstream JSON responses, stored in a SQLite file so it
+    survives restarts and is shared by every process on the box.
+
+    Entries keep their ETag / Last-Modified validators after they expire, so
+    an expired entry can still be revalidated with a conditional request and
+    served again on a 304. When the stored bodies grow past `max_bytes`, the
+    least recently used entries are evicted.
+    """
+
+    def __init__(self, path=FOOTBALL_DATA_CACHE_PATH, max_bytes=FOOTBALL_DATA_CACHE_MAX_BYTES, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, body TEXT NOT NULL, etag TEXT, last_modified TEXT,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at)")
+
+    @staticmethod
+    def key_for(url, params=None):
+        if not params:
+            return url
+        return f"{url}?{urlencode(sorted(params.items()))}"
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = self._clock()
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        body, etag, last_modified, expires_at = row
+        return CacheEntry(json.loads(body), etag, last_modified, expires_at > now)
+
+    def put(self, key, body_text, etag=None, last_modified=None, ttl=0):
+        now = self._clock()
+        size = len(body_text.encode('utf-8'))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO responses (key, body, etag, last_modified, expires_at, accessed_at, size)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET body = excluded.body, etag = excluded.etag,"
+                " last_modified = excluded.last_modified, expires_at = excluded.expires_at,"
+                " accessed_at = excluded.accessed_at, size = excluded.size",
+                (key, body_text, etag, last_modified, now + ttl, now, size),
+            )
+            self._evict(conn)
+
+    def touch(self, key, ttl):
+        """Extend an entry's lifetime after the upstream answered 304 Not Modified."""
+        now = self._clock()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?", (now + ttl, now, key)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM responses")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads and processes
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()